@@ -6,22 +6,29 @@ import os
 
 from app.services.b3_scraper_service import B3Scraper
 from app.utils.extensions import db
+from app.utils.database import configurar_banco
+from app.utils.migrations import aplicar_migracoes
+from app.utils.lock_processo import executar_com_lock
 from app.routes.routes import bp as main_bp
 
 from app.models.ibov_model import IbovAtivo
 from app.models.dados_refinados_model import DadosRefinados
 from app.models.modelo_treinado_model import ModeloTreinado
+from app.models.job_model import Job
+from app.services.job_service import job_manager
 
 # Modelos LSTM - Fase 4
 from app.models.stock_data_model import StockData
 from app.models.lstm_model_info import LSTMModel
+from app.models.lstm_model_symbol import LSTMModelSymbol
+from app.models.lstm_model_lineage import LSTMModelLineage
 
 
 def create_app():
     app = Flask(__name__)
     
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///dados.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # URI via SQLALCHEMY_DATABASE_URI (padrão: instance/dados.db), WAL e pool por processo
+    configurar_banco(app)
 
     SWAGGER_URL = '/swagger'
     API_URL = '/swagger.json'
@@ -33,6 +40,7 @@ def create_app():
     app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
     db.init_app(app)
+    job_manager.init_app(app)
 
     app.register_blueprint(main_bp)
 
@@ -62,7 +70,7 @@ def create_app():
 
 def agendar_scraping(app):
 
-    from app.models.ibov_model import IbovAtivo
+    from app.services.ibov_service import IbovService
     from datetime import datetime
     
     scheduler = BackgroundScheduler()
@@ -71,31 +79,37 @@ def agendar_scraping(app):
         with app.app_context():
             scraper = B3Scraper()
             ativos = scraper.fetch_ibov_data()
-            salvos = 0
-            
-            for ativo in ativos:
-                existe = IbovAtivo.query.filter_by(
-                    codigo=ativo['cod'],  
-                    data=datetime.now().date()
-                ).first()
-                
-                if not existe:
-                    novo = IbovAtivo(
-                        codigo=ativo['cod'],  
-                        nome=ativo['asset'],  
-                        tipo=ativo['type'],  
-                        participacao=ativo['part'],  
-                        theoricalQty=ativo['theoricalQty'],  
-                        data=datetime.now().date()
-                    )
-                    db.session.add(novo)
-                    salvos += 1
-                    
+            salvos = IbovService.salvar_ativos(ativos, datetime.now().date())
             db.session.commit()
             print(f"[APScheduler] IBOV atualizado automaticamente. {salvos} ativos salvos.")
     
     scheduler.add_job(job, 'cron', hour=6, minute=0)
     scheduler.start()
+    return scheduler
+
+
+def iniciar_agendador(app, reagendar_jobs: bool = False):
+    """
+    Inicia o agendamento do scraping em um único processo
+
+    Com vários workers (gunicorn) ou com o reloader do modo debug, só o
+    processo que obtiver o lock em SCHEDULER_LOCK_FILE (padrão:
+    instance/scheduler.lock) agenda o job das 06:00; os demais tentam de novo
+    periodicamente e assumem se o dono terminar.
+
+    Args:
+        app: Aplicação Flask
+        reagendar_jobs: Também coloca na fila deste processo os jobs pendentes
+    """
+    caminho_lock = os.environ.get('SCHEDULER_LOCK_FILE', os.path.join(app.instance_path, 'scheduler.lock'))
+
+    def assumir():
+        agendar_scraping(app)
+        if reagendar_jobs:
+            with app.app_context():
+                job_manager.reagendar_pendentes()
+
+    return executar_com_lock(caminho_lock, assumir)
 
 
 if __name__ == '__main__':
@@ -103,6 +117,10 @@ if __name__ == '__main__':
     
     with app.app_context():
         db.create_all()
+        aplicar_migracoes()
+        # Com o reloader do modo debug o módulo roda duas vezes; só o processo servidor executa jobs
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            job_manager.recuperar()
     
-    agendar_scraping(app)
+    iniciar_agendador(app)
     app.run(debug=True)
@@ -0,0 +1,60 @@
+from flask import jsonify, request
+from app.services.job_service import job_manager
+
+
+class JobController:
+    """
+    Controller para consulta e enfileiramento de jobs em segundo plano
+    """
+
+    @staticmethod
+    def enfileirar(tipo: str, parametros: dict, mensagem: str):
+        """
+        Cria um job e responde imediatamente com 202 e o id para acompanhamento
+        """
+        try:
+            job = job_manager.submeter(tipo, parametros)
+
+            return jsonify({
+                'mensagem': mensagem,
+                'job_id': job.id,
+                'status': job.status,
+                'acompanhar': f'/api/jobs/{job.id}'
+            }), 202
+
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
+
+    @staticmethod
+    def obter_job(job_id):
+        """
+        Endpoint para consultar status, progresso e resultado de um job
+        GET /api/jobs/<job_id>
+        """
+        try:
+            resultado = job_manager.obter(job_id)
+
+            if 'erro' in resultado and 'id' not in resultado:
+                return jsonify(resultado), 404
+
+            return jsonify(resultado), 200
+
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
+
+    @staticmethod
+    def listar_jobs():
+        """
+        Endpoint para listar jobs recentes
+        GET /api/jobs?status=executando&tipo=lstm_treinar&limit=50
+        """
+        try:
+            resultado = job_manager.listar(
+                status=request.args.get('status', None),
+                tipo=request.args.get('tipo', None),
+                limit=request.args.get('limit', 50, type=int)
+            )
+            return jsonify(resultado), 200
+
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
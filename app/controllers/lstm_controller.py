@@ -1,5 +1,19 @@
 from flask import jsonify, request
-from app.services.lstm_service import LSTMService
+from app.services.lstm_inferencia_service import LSTMInferenciaService
+from app.controllers.job_controller import JobController
+
+
+def _lstm_service():
+    # Importado sob demanda: LSTMService carrega TensorFlow/Keras
+    from app.services.lstm_service import LSTMService
+    return LSTMService()
+
+
+def _service_previsao(motor: str):
+    # Motores tflite e numpy (e as consultas) não importam TensorFlow
+    if motor in LSTMInferenciaService.MOTORES_PREVISAO:
+        return LSTMInferenciaService()
+    return _lstm_service()
 
 
 class LSTMController:
@@ -17,8 +31,12 @@ class LSTMController:
             "epochs": 50,
             "batch_size": 32,
             "sequence_length": 60,
-            "units": 50
+            "units": 50,
+            "streaming": false
         }
+        O treinamento roda em segundo plano e a resposta traz o job_id
+        (acompanhar em GET /api/jobs/<job_id>). Com "sincrono": true o
+        resultado é retornado na própria requisição.
         """
         try:
             data = request.get_json()
@@ -33,15 +51,171 @@ class LSTMController:
             batch_size = data.get('batch_size', 32)
             sequence_length = data.get('sequence_length', 60)
             units = data.get('units', 50)
+            streaming = bool(data.get('streaming', False))
             
-            service = LSTMService()
-            resultado = service.treinar_modelo(
-                symbol=symbol,
-                epochs=epochs,
-                batch_size=batch_size,
-                sequence_length=sequence_length,
-                units=units
-            )
+            parametros = {
+                'symbol': symbol,
+                'epochs': epochs,
+                'batch_size': batch_size,
+                'sequence_length': sequence_length,
+                'units': units,
+                'streaming': streaming
+            }
+            
+            if not data.get('sincrono', False):
+                return JobController.enfileirar(
+                    'lstm_treinar', parametros, f'Treinamento de {symbol} enfileirado'
+                )
+            
+            service = _lstm_service()
+            resultado = service.treinar_modelo(**parametros)
+            
+            if 'erro' in resultado:
+                return jsonify(resultado), 400
+            
+            return jsonify(resultado), 201
+            
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
+    
+    @staticmethod
+    def treinar_lote():
+        """
+        Endpoint para treinar um modelo por símbolo em paralelo (pool de processos)
+        POST /api/lstm/treinar-lote
+        Body: {
+            "symbols": ["PETR4.SA", "VALE3.SA", "ITUB4.SA"],
+            "epochs": 50,
+            "batch_size": 32,
+            "sequence_length": 60,
+            "units": 50,
+            "processos": 4,
+            "threads_por_processo": 1
+        }
+        Roda como job (GET /api/jobs/<job_id>); "sincrono": true retorna o resultado direto.
+        """
+        try:
+            data = request.get_json()
+            
+            if not data or not isinstance(data.get('symbols'), list) or not data['symbols']:
+                return jsonify({
+                    'erro': 'Campo obrigatório: symbols (lista)'
+                }), 400
+            
+            parametros = {
+                'symbols': data['symbols'],
+                'epochs': data.get('epochs', 50),
+                'batch_size': data.get('batch_size', 32),
+                'sequence_length': data.get('sequence_length', 60),
+                'units': data.get('units', 50),
+                'streaming': bool(data.get('streaming', False)),
+                'processos': data.get('processos', None),
+                'threads_por_processo': data.get('threads_por_processo', None)
+            }
+            
+            if not data.get('sincrono', False):
+                return JobController.enfileirar(
+                    'lstm_treinar_lote', parametros, f"Treinamento de {len(data['symbols'])} símbolos enfileirado"
+                )
+            
+            service = _lstm_service()
+            resultado = service.treinar_lote(**parametros)
+            
+            if 'erro' in resultado:
+                return jsonify(resultado), 400
+            
+            return jsonify(resultado), 201
+            
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
+    
+    @staticmethod
+    def treinar_modelo_global():
+        """
+        Endpoint para treinar um único modelo LSTM com vários símbolos
+        POST /api/lstm/treinar-global
+        Body: {
+            "symbols": ["PETR4.SA", "VALE3.SA"],   (opcional; padrão: todos com dados)
+            "epochs": 50,
+            "batch_size": 32,
+            "sequence_length": 60,
+            "units": 50,
+            "embedding_dim": 4                     (0 = sem embedding de símbolo)
+        }
+        Roda como job (GET /api/jobs/<job_id>); "sincrono": true retorna o resultado direto.
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            
+            symbols = data.get('symbols', None)
+            if symbols is not None and not isinstance(symbols, list):
+                return jsonify({'erro': 'Campo symbols deve ser uma lista'}), 400
+            
+            parametros = {
+                'symbols': symbols,
+                'epochs': data.get('epochs', 50),
+                'batch_size': data.get('batch_size', 32),
+                'sequence_length': data.get('sequence_length', 60),
+                'units': data.get('units', 50),
+                'embedding_dim': int(data.get('embedding_dim', 0))
+            }
+            
+            if not data.get('sincrono', False):
+                return JobController.enfileirar(
+                    'lstm_treinar_global', parametros, 'Treinamento do modelo global enfileirado'
+                )
+            
+            service = _lstm_service()
+            resultado = service.treinar_modelo_global(**parametros)
+            
+            if 'erro' in resultado:
+                return jsonify(resultado), 400
+            
+            return jsonify(resultado), 201
+            
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
+    
+    @staticmethod
+    def ajustar_modelo():
+        """
+        Endpoint para ajuste fino (warm start) do modelo ativo de um símbolo
+        POST /api/lstm/ajustar
+        Body: {
+            "symbol": "PETR4.SA",
+            "epochs": 5,
+            "janelas": 250,                        (janelas mais recentes: 80% treino, 20% validação)
+            "learning_rate": 0.0001,
+            "batch_size": 32,
+            "model_name": "lstm_PETR4.SA_..."      (opcional; padrão: modelo ativo do símbolo)
+        }
+        Roda como job (GET /api/jobs/<job_id>); "sincrono": true retorna o resultado direto.
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            
+            if not data.get('symbol'):
+                return jsonify({
+                    'erro': 'Campo obrigatório: symbol'
+                }), 400
+            
+            symbol = data['symbol']
+            parametros = {
+                'symbol': symbol,
+                'epochs': int(data.get('epochs', 5)),
+                'janelas': int(data.get('janelas', 250)),
+                'learning_rate': float(data.get('learning_rate', 1e-4)),
+                'batch_size': int(data.get('batch_size', 32)),
+                'model_name': data.get('model_name', None)
+            }
+            
+            if not data.get('sincrono', False):
+                return JobController.enfileirar(
+                    'lstm_ajustar', parametros, f'Ajuste fino de {symbol} enfileirado'
+                )
+            
+            service = _lstm_service()
+            resultado = service.ajustar_modelo(**parametros)
             
             if 'erro' in resultado:
                 return jsonify(resultado), 400
@@ -55,22 +229,25 @@ class LSTMController:
     def prever_precos(symbol):
         """
         Endpoint para fazer previsões de preços
-        GET /api/lstm/prever/<symbol>?dias=5&model_name=lstm_PETR4_20241026
+        GET /api/lstm/prever/<symbol>?dias=5&model_name=lstm_PETR4_20241026&motor=grafo
+        motor: grafo (padrão), keras, tflite ou numpy
         """
         try:
             dias = request.args.get('dias', 5, type=int)
             model_name = request.args.get('model_name', None)
+            motor = request.args.get('motor', 'grafo')
             
             if dias < 1 or dias > 30:
                 return jsonify({
                     'erro': 'Número de dias deve estar entre 1 e 30'
                 }), 400
             
-            service = LSTMService()
+            service = _service_previsao(motor)
             resultado = service.prever_proximos_dias(
                 symbol=symbol,
                 dias=dias,
-                model_name=model_name
+                model_name=model_name,
+                motor=motor
             )
             
             if 'erro' in resultado:
@@ -81,6 +258,57 @@ class LSTMController:
         except Exception as e:
             return jsonify({'erro': str(e)}), 500
     
+    @staticmethod
+    def prever_precos_lote():
+        """
+        Endpoint para previsões de vários símbolos em uma única chamada
+        POST /api/lstm/prever
+        Body: {
+            "symbols": ["PETR4.SA", {"symbol": "VALE3.SA", "dias": 10}],
+            "dias": 5,
+            "motor": "grafo"
+        }
+        motor: grafo (padrão), keras, tflite ou numpy
+        """
+        try:
+            data = request.get_json()
+            
+            if not data or not isinstance(data.get('symbols'), list) or not data['symbols']:
+                return jsonify({
+                    'erro': 'Campo obrigatório: symbols (lista)'
+                }), 400
+            
+            dias_padrao = data.get('dias', 5)
+            motor = data.get('motor', 'grafo')
+            
+            pedidos = []
+            for item in data['symbols']:
+                if isinstance(item, dict):
+                    pedido = {'symbol': item.get('symbol'), 'dias': item.get('dias', dias_padrao)}
+                else:
+                    pedido = {'symbol': item, 'dias': dias_padrao}
+                
+                if not pedido['symbol']:
+                    return jsonify({'erro': 'Cada item de symbols precisa de um symbol'}), 400
+                
+                if not isinstance(pedido['dias'], int) or pedido['dias'] < 1 or pedido['dias'] > 30:
+                    return jsonify({
+                        'erro': f"Número de dias deve estar entre 1 e 30 ({pedido['symbol']})"
+                    }), 400
+                
+                pedidos.append(pedido)
+            
+            service = _service_previsao(motor)
+            resultado = service.prever_lote(pedidos, motor=motor)
+            
+            if 'erro' in resultado:
+                return jsonify(resultado), 400
+            
+            return jsonify(resultado), 200
+            
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
+    
     @staticmethod
     def listar_modelos():
         """
@@ -90,7 +318,7 @@ class LSTMController:
         try:
             symbol = request.args.get('symbol', None)
             
-            service = LSTMService()
+            service = LSTMInferenciaService()
             resultado = service.listar_modelos(symbol)
             
             if 'erro' in resultado:
@@ -108,7 +336,7 @@ class LSTMController:
         GET /api/lstm/metricas/<model_name>
         """
         try:
-            service = LSTMService()
+            service = LSTMInferenciaService()
             resultado = service.obter_metricas_modelo(model_name)
             
             if 'erro' in resultado:
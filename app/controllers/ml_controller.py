@@ -1,96 +1,155 @@
+from flask import jsonify, request
+from app.services.ml_service import MLService
+from app.controllers.job_controller import JobController
+from app.models.dados_refinados_model import DadosRefinados
 
-# from flask import jsonify, request
-# from app.services.ml_service import MLService
-# from app.models.dados_refinados_model import DadosRefinados
 
-
-# class MLController:
+class MLController:
     
-#     @staticmethod
-#     def refinar_dados():
+    @staticmethod
+    def refinar_dados():
        
-#         try:
-#             ml_service = MLService()
-#             resultado = ml_service.refinar_dados()
+        try:
+            # Body opcional: {"incremental": true} processa só as datas novas
+            data = request.get_json(silent=True) or {}
+            incremental = bool(data.get('incremental', False))
+            
+            ml_service = MLService()
+            resultado = ml_service.refinar_dados(incremental=incremental)
             
-#             if 'erro' in resultado:
-#                 return jsonify(resultado), 400
+            if 'erro' in resultado:
+                return jsonify(resultado), 400
             
-#             return jsonify(resultado), 201
+            return jsonify(resultado), 201
             
-#         except Exception as e:
-#             return jsonify({'erro': str(e)}), 500
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
     
-#     def listar_dados_refinados(self):
+    def listar_dados_refinados(self):
         
-#         try:
-#             dados = DadosRefinados.query.all()
-            
-#             resultado = [{
-#                 'codigo': d.codigo,
-#                 'nome': d.nome,
-#                 'participacao_pct': round(d.participacao_pct, 2) if d.participacao_pct else None,
-#                 'qtde_teorica': d.qtde_teorica,
-#                 'variacao_percentual': round(d.variacao_percentual, 2) if d.variacao_percentual else None,
-#                 'media_movel_7d': round(d.media_movel_7d, 2) if d.media_movel_7d else None,
-#                 'volatilidade': round(d.volatilidade, 2) if d.volatilidade else None,
-#                 'recomendacao': 'COMPRAR' if d.recomendacao == 1 else 'VENDER',
-#                 'data_atualizacao': d.data_atualizacao.strftime('%Y-%m-%d %H:%M:%S') if d.data_atualizacao else None
-#             } for d in dados]
-            
-#             return jsonify({
-#                 'total': len(resultado),
-#                 'dados': resultado
-#             }), 200
-            
-#         except Exception as e:
-#             return jsonify({'erro': str(e)}), 500
+        try:
+            dados = DadosRefinados.query.all()
+            
+            resultado = [{
+                'codigo': d.codigo,
+                'nome': d.nome,
+                'participacao_pct': round(d.participacao_pct, 2) if d.participacao_pct else None,
+                'qtde_teorica': d.qtde_teorica,
+                'variacao_percentual': round(d.variacao_percentual, 2) if d.variacao_percentual else None,
+                'media_movel_7d': round(d.media_movel_7d, 2) if d.media_movel_7d else None,
+                'volatilidade': round(d.volatilidade, 2) if d.volatilidade else None,
+                'recomendacao': 'COMPRAR' if d.recomendacao == 1 else 'VENDER',
+                'data_atualizacao': d.data_atualizacao.strftime('%Y-%m-%d %H:%M:%S') if d.data_atualizacao else None
+            } for d in dados]
+            
+            return jsonify({
+                'total': len(resultado),
+                'dados': resultado
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
     
-#     @staticmethod
-#     def treinar_modelo():
-       
-#         try:
-#             # Pode receber parâmetros no body
-#             data = request.get_json() or {}
-#             algoritmo = data.get('algoritmo', 'RandomForest')
-            
-#             ml_service = MLService()
-#             resultado = ml_service.treinar_modelo(algoritmo=algoritmo)
-            
-#             if 'erro' in resultado:
-#                 return jsonify(resultado), 400
-            
-#             return jsonify(resultado), 201
-            
-#         except Exception as e:
-#             return jsonify({'erro': str(e)}), 500
+    @staticmethod
+    def treinar_modelo():
+        """
+        POST /ml/treinar
+        Body (opcional): {"algoritmo": "RandomForest", "motor_gb": "histograma", "otimizar": true, "n_candidatos": 16, "processos": 4}
+        motor_gb: exato (padrão, GradientBoosting) ou histograma (HistGradientBoosting, nulos como NaN)
+        Com "otimizar" o treino roda como job (GET /api/jobs/<job_id>); "sincrono": true retorna o resultado direto.
+        """
+        try:
+            # Pode receber parâmetros no body
+            data = request.get_json(silent=True) or {}
+            parametros = {
+                'algoritmo': data.get('algoritmo', 'RandomForest'),
+                'otimizar': bool(data.get('otimizar', False)),
+                'n_candidatos': int(data.get('n_candidatos', 16)),
+                'processos': data.get('processos', None),
+                'motor_gb': data.get('motor_gb', 'exato')
+            }
+            
+            if parametros['otimizar'] and not data.get('sincrono', False):
+                return JobController.enfileirar(
+                    'ml_treinar', parametros, 'Busca de hiperparâmetros e treinamento enfileirados'
+                )
+            
+            ml_service = MLService()
+            resultado = ml_service.treinar_modelo(**parametros)
+            
+            if 'erro' in resultado:
+                return jsonify(resultado), 400
+            
+            return jsonify(resultado), 201
+            
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
     
-#     @staticmethod
-#     def prever(codigo):
+    @staticmethod
+    def prever(codigo):
         
-#         try:
-#             ml_service = MLService()
-#             resultado = ml_service.prever(codigo.upper())
+        try:
+            ml_service = MLService()
+            resultado = ml_service.prever(codigo.upper())
             
-#             if 'erro' in resultado:
-#                 return jsonify(resultado), 404
+            if 'erro' in resultado:
+                return jsonify(resultado), 404
             
-#             return jsonify(resultado), 200
+            return jsonify(resultado), 200
             
-#         except Exception as e:
-#             return jsonify({'erro': str(e)}), 500
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
+    
+    @staticmethod
+    def prever_lote(codigos):
+        """
+        Predição em lote
+        POST /ml/prever
+        Body: {"codigos": ["PETR4", "VALE3"]} ou {"codigos": "todos"}
+        """
+        try:
+            if codigos == 'todos':
+                codigos = None
+            elif not isinstance(codigos, list):
+                return jsonify({'erro': "Campo 'codigos' deve ser uma lista ou \"todos\""}), 400
+            else:
+                codigos = list(dict.fromkeys(str(c).upper() for c in codigos))
+            
+            ml_service = MLService()
+            resultado = ml_service.prever_lote(codigos)
+            
+            if 'erro' in resultado:
+                return jsonify(resultado), 404
+            
+            return jsonify({
+                'total': resultado['total'],
+                'versao_modelo': resultado['versao_modelo'],
+                'predicoes': [
+                    {
+                        'codigo': p['codigo'],
+                        'predicao': p['recomendacao'],
+                        'confianca': p['confianca'],
+                        'probabilidade': p['probabilidades']['comprar'] / 100
+                    }
+                    for p in resultado['predicoes']
+                ],
+                'erros': resultado['erros']
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
     
-#     @staticmethod
-#     def obter_metricas():
+    @staticmethod
+    def obter_metricas():
         
-#         try:
-#             ml_service = MLService()
-#             resultado = ml_service.obter_metricas()
+        try:
+            ml_service = MLService()
+            resultado = ml_service.obter_metricas()
             
-#             if 'erro' in resultado:
-#                 return jsonify(resultado), 404
+            if 'erro' in resultado:
+                return jsonify(resultado), 404
             
-#             return jsonify(resultado), 200
+            return jsonify(resultado), 200
             
-#         except Exception as e:
-#             return jsonify({'erro': str(e)}), 500
+        except Exception as e:
+            return jsonify({'erro': str(e)}), 500
@@ -1,5 +1,6 @@
 from flask import jsonify, request
 from app.services.stock_data_service import StockDataService
+from app.controllers.job_controller import JobController
 
 
 class StockDataController:
@@ -13,16 +14,26 @@ class StockDataController:
         Endpoint para coletar dados históricos de ações
         POST /api/stock-data/coletar
         Body: {"symbol": "PETR4.SA", "period": "2y"} OU
-              {"symbol": "PETR4.SA", "start_date": "2023-01-01", "end_date": "2025-10-26"}
+              {"symbol": "PETR4.SA", "start_date": "2023-01-01", "end_date": "2025-10-26"} OU
+              {"symbols": ["PETR4.SA", "VALE3.SA"], "period": "2y", "max_workers": 8} OU
+              {"ibov": true, "period": "2y"}  (todos os ativos atuais do IBOV)
+        Opcional: "incremental": true baixa apenas as barras após a última data salva
+        A coleta roda em segundo plano e a resposta traz o job_id
+        (GET /api/jobs/<job_id>); "sincrono": true mantém a resposta direta.
         """
         try:
             data = request.get_json()
             
+            if data and (data.get('symbols') or data.get('ibov')):
+                return StockDataController._coletar_dados_lote(data)
+            
             if not data or 'symbol' not in data:
                 return jsonify({
                     'erro': 'Campo obrigatório: symbol',
                     'exemplo1': '{"symbol": "PETR4.SA", "period": "2y"}',
                     'exemplo2': '{"symbol": "PETR4.SA", "start_date": "2023-01-01"}',
+                    'exemplo3': '{"symbols": ["PETR4.SA", "VALE3.SA"], "period": "2y"}',
+                    'exemplo4': '{"ibov": true, "period": "2y"}',
                     'periodos_validos': ['1mo', '3mo', '6mo', '1y', '2y', '5y', 'max']
                 }), 400
             
@@ -35,13 +46,21 @@ class StockDataController:
             if not period and not start_date:
                 period = '2y'
             
+            parametros = {
+                'symbol': symbol,
+                'start_date': start_date,
+                'end_date': end_date,
+                'period': period,
+                'incremental': bool(data.get('incremental', False))
+            }
+            
+            if not data.get('sincrono', False):
+                return JobController.enfileirar(
+                    'stock_data_coletar', parametros, f'Coleta de {symbol} enfileirada'
+                )
+            
             service = StockDataService()
-            resultado = service.coletar_dados_historicos(
-                symbol=symbol,
-                start_date=start_date,
-                end_date=end_date,
-                period=period
-            )
+            resultado = service.coletar_dados_historicos(**parametros)
             
             if 'erro' in resultado:
                 return jsonify(resultado), 400
@@ -51,6 +70,41 @@ class StockDataController:
         except Exception as e:
             return jsonify({'erro': str(e)}), 500
     
+    @staticmethod
+    def _coletar_dados_lote(data):
+        symbols = data.get('symbols')
+        
+        if symbols is not None and not isinstance(symbols, list):
+            return jsonify({'erro': 'Campo symbols deve ser uma lista'}), 400
+        
+        period = data.get('period', None)
+        start_date = data.get('start_date', None)
+        
+        if not period and not start_date:
+            period = '2y'
+        
+        parametros = {
+            'symbols': symbols,
+            'start_date': start_date,
+            'end_date': data.get('end_date', None),
+            'period': period,
+            'max_workers': data.get('max_workers', 8),
+            'incremental': bool(data.get('incremental', False))
+        }
+        
+        if not data.get('sincrono', False):
+            return JobController.enfileirar(
+                'stock_data_coletar_lote', parametros, 'Coleta em lote enfileirada'
+            )
+        
+        service = StockDataService()
+        resultado = service.coletar_dados_lote(**parametros)
+        
+        if 'erro' in resultado:
+            return jsonify(resultado), 400
+        
+        return jsonify(resultado), 201
+    
     @staticmethod
     def obter_dados(symbol):
         """
@@ -21,10 +21,15 @@ class DadosRefinados(db.Model):
     volatilidade = db.Column(db.Float, nullable=True)         # Desvio padrão
     
     recomendacao = db.Column(db.Integer, nullable=True)
+    score = db.Column(db.Float, nullable=True)              # Score de performance que define a recomendação
     
     data_processamento = db.Column(db.DateTime, default=datetime.now)
     data_referencia = db.Column(db.Date, nullable=False)
     
+    __table_args__ = (
+        db.Index('uix_dados_refinados_codigo_data', 'codigo', 'data_referencia', unique=True),
+    )
+    
     def __repr__(self):
         return f'<DadosRefinados {self.codigo} - {self.data_referencia}>'
     
@@ -10,5 +10,11 @@ class IbovAtivo(db.Model):
     tipo = db.Column(db.String(50), nullable=True)
     participacao = db.Column(db.String(20), nullable=True)  # string para compatibilidade com scraping
     theoricalQty = db.Column(db.String(40), nullable=True)  # novo campo para quantidade teórica
+    participacao_valor = db.Column(db.Float, nullable=True)  # participacao convertida para float
+    qtde_teorica_valor = db.Column(db.Float, nullable=True)  # theoricalQty convertida para float
     data = db.Column(db.Date, nullable=False)
 
+    __table_args__ = (
+        db.Index('uix_ibov_ativos_codigo_data', 'codigo', 'data', unique=True),
+    )
+
@@ -0,0 +1,58 @@
+"""
+Model para jobs executados em segundo plano (treinamento, coletas)
+"""
+import json
+from app.utils.extensions import db
+from datetime import datetime
+
+
+class Job(db.Model):
+
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    tipo = db.Column(db.String(50), nullable=False)  # lstm_treinar, stock_data_coletar, ibov_scrap_historico
+    fila = db.Column(db.String(20), nullable=False)  # pool de workers (treino, coleta)
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente, executando, concluido, erro
+
+    parametros = db.Column(db.Text, nullable=True)  # JSON
+    resultado = db.Column(db.Text, nullable=True)  # JSON
+    erro = db.Column(db.Text, nullable=True)
+
+    progresso_atual = db.Column(db.Integer, nullable=True)
+    progresso_total = db.Column(db.Integer, nullable=True)
+    progresso_descricao = db.Column(db.String(200), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_jobs_status_created', 'status', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.tipo} {self.id} {self.status}>'
+
+    def to_dict(self, incluir_resultado: bool = True):
+        dados = {
+            'id': self.id,
+            'tipo': self.tipo,
+            'fila': self.fila,
+            'status': self.status,
+            'parametros': json.loads(self.parametros) if self.parametros else None,
+            'progresso': {
+                'atual': self.progresso_atual,
+                'total': self.progresso_total,
+                'percentual': round(100 * self.progresso_atual / self.progresso_total, 1)
+                if self.progresso_atual is not None and self.progresso_total else None,
+                'descricao': self.progresso_descricao
+            },
+            'erro': self.erro,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if incluir_resultado:
+            dados['resultado'] = json.loads(self.resultado) if self.resultado else None
+        return dados
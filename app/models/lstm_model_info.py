@@ -0,0 +1,60 @@
+from app.utils.extensions import db
+from datetime import datetime
+
+
+class LSTMModel(db.Model):
+
+    __tablename__ = 'lstm_models'
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(10), nullable=False, index=True)
+    model_name = db.Column(db.String(100), nullable=False, unique=True)
+    model_path = db.Column(db.String(200), nullable=False)
+    sequence_length = db.Column(db.Integer, nullable=False)
+    epochs = db.Column(db.Integer, nullable=False)
+    batch_size = db.Column(db.Integer, nullable=False)
+
+    mae = db.Column(db.Float, nullable=True)
+    rmse = db.Column(db.Float, nullable=True)
+    mape = db.Column(db.Float, nullable=True)
+
+    train_start_date = db.Column(db.Date, nullable=True)
+    train_end_date = db.Column(db.Date, nullable=True)
+    test_start_date = db.Column(db.Date, nullable=True)
+    test_end_date = db.Column(db.Date, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    is_active = db.Column(db.Boolean, default=True)
+
+    __table_args__ = (
+        db.Index('ix_lstm_models_symbol_active_created', 'symbol', 'is_active', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<LSTMModel {self.model_name}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'model_name': self.model_name,
+            'model_path': self.model_path,
+            'sequence_length': self.sequence_length,
+            'epochs': self.epochs,
+            'batch_size': self.batch_size,
+            'metricas': {
+                'mae': self.mae,
+                'rmse': self.rmse,
+                'mape': self.mape
+            },
+            'periodo_treino': {
+                'inicio': self.train_start_date.isoformat() if self.train_start_date else None,
+                'fim': self.train_end_date.isoformat() if self.train_end_date else None
+            },
+            'periodo_teste': {
+                'inicio': self.test_start_date.isoformat() if self.test_start_date else None,
+                'fim': self.test_end_date.isoformat() if self.test_end_date else None
+            },
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'is_active': self.is_active
+        }
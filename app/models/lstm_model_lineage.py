@@ -0,0 +1,37 @@
+from app.utils.extensions import db
+
+
+class LSTMModelLineage(db.Model):
+    """
+    Origem de um modelo LSTM obtido por ajuste fino (warm start) de outro modelo
+    """
+
+    __tablename__ = 'lstm_model_lineage'
+
+    id = db.Column(db.Integer, primary_key=True)
+    model_id = db.Column(db.Integer, db.ForeignKey('lstm_models.id'), nullable=False, unique=True)
+    parent_id = db.Column(db.Integer, db.ForeignKey('lstm_models.id'), nullable=False, index=True)
+
+    # Parâmetros do ajuste fino
+    janelas = db.Column(db.Integer, nullable=False)  # janelas recentes usadas no treino
+    learning_rate = db.Column(db.Float, nullable=False)
+
+    # Métricas do modelo pai na mesma validação do ajuste (comparáveis às do filho)
+    parent_mae = db.Column(db.Float, nullable=True)
+    parent_rmse = db.Column(db.Float, nullable=True)
+    parent_mape = db.Column(db.Float, nullable=True)
+
+    def __repr__(self):
+        return f'<LSTMModelLineage {self.parent_id} -> {self.model_id}>'
+
+    def to_dict(self):
+        return {
+            'parent_id': self.parent_id,
+            'janelas': self.janelas,
+            'learning_rate': self.learning_rate,
+            'metricas_pai': {
+                'mae': self.parent_mae,
+                'rmse': self.parent_rmse,
+                'mape': self.parent_mape
+            }
+        }
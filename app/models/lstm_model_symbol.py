@@ -0,0 +1,37 @@
+from app.utils.extensions import db
+
+
+class LSTMModelSymbol(db.Model):
+    """
+    Símbolos cobertos por um modelo LSTM global (treinado com janelas de vários símbolos)
+    """
+
+    __tablename__ = 'lstm_model_symbols'
+
+    id = db.Column(db.Integer, primary_key=True)
+    model_id = db.Column(db.Integer, db.ForeignKey('lstm_models.id'), nullable=False)
+    symbol = db.Column(db.String(10), nullable=False, index=True)
+    indice = db.Column(db.Integer, nullable=False)  # posição do símbolo na camada de embedding
+
+    # Métricas do modelo global no conjunto de teste deste símbolo
+    mae = db.Column(db.Float, nullable=True)
+    rmse = db.Column(db.Float, nullable=True)
+    mape = db.Column(db.Float, nullable=True)
+
+    __table_args__ = (
+        db.Index('uix_lstm_model_symbols_model_symbol', 'model_id', 'symbol', unique=True),
+    )
+
+    def __repr__(self):
+        return f'<LSTMModelSymbol {self.model_id} {self.symbol}>'
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'indice': self.indice,
+            'metricas': {
+                'mae': self.mae,
+                'rmse': self.rmse,
+                'mape': self.mape
+            }
+        }
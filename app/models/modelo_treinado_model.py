@@ -3,6 +3,7 @@ Model para armazenar informações sobre modelos treinados
 """
 from app.utils.extensions import db
 from datetime import datetime
+import json
 
 
 class ModeloTreinado(db.Model):
@@ -22,6 +23,7 @@ class ModeloTreinado(db.Model):
     total_amostras_treino = db.Column(db.Integer, nullable=True)
     total_amostras_teste = db.Column(db.Integer, nullable=True)
     features_utilizadas = db.Column(db.Text, nullable=True)  # JSON com nomes das features
+    hiperparametros = db.Column(db.Text, nullable=True)  # JSON com a configuração do ensemble e o resumo da busca
     
     caminho_modelo = db.Column(db.String(255), nullable=False)  # Caminho do arquivo .pkl
     
@@ -43,6 +45,7 @@ class ModeloTreinado(db.Model):
             'f1_score': self.f1_score,
             'total_amostras_treino': self.total_amostras_treino,
             'total_amostras_teste': self.total_amostras_teste,
+            'hiperparametros': json.loads(self.hiperparametros) if self.hiperparametros else None,
             'ativo': self.ativo,
             'data_treinamento': self.data_treinamento.isoformat()
         }
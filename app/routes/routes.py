@@ -1,16 +1,7 @@
-
 from flask import Blueprint, jsonify, request
 from app.controllers.ibov_controller import IbovController
-
-# LSTM imports - desabilitado temporariamente até instalar TensorFlow
-try:
-    from app.controllers.stock_data_controller import StockDataController
-    from app.controllers.lstm_controller import LSTMController
-    LSTM_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️  LSTM não disponível: {e}")
-    print("⚠️  Instale TensorFlow: pip install tensorflow==2.15.0")
-    LSTM_AVAILABLE = False
+from app.controllers.job_controller import JobController
+from app.utils.dependencias import modulo_disponivel, requer_modulos, INSTALACAO
 
 import random
 from datetime import datetime
@@ -35,7 +26,19 @@ def scrap_historico():
 
 
 
+@bp.route('/api/jobs', methods=['GET'])
+def listar_jobs():
+    return JobController.listar_jobs()
+
+
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+def obter_job(job_id):
+    return JobController.obter_job(job_id)
+
+
+
 @bp.route('/ml/refinar', methods=['POST'])
+@requer_modulos('sklearn')
 def refinar_dados():
     from app.controllers.ml_controller import MLController
     return MLController.refinar_dados()
@@ -78,11 +81,13 @@ def listar_dados_refinados():
         return jsonify({"error": f"Erro ao buscar dados refinados: {str(e)}"}), 500
 
 @bp.route('/ml/treinar', methods=['POST'])
+@requer_modulos('sklearn')
 def treinar_modelo():
     from app.controllers.ml_controller import MLController
     return MLController.treinar_modelo()
 
 @bp.route('/ml/prever', methods=['POST'])
+@requer_modulos('sklearn')
 def prever():
     from app.controllers.ml_controller import MLController
     data = request.get_json() or {}
@@ -96,55 +101,10 @@ def prever():
     if codigo:
         return MLController.prever(codigo)
     
-    if codigos:
-        try:
-            from app.services.ml_service import MLService
-            from app.models.dados_refinados_model import DadosRefinados
-            from app.models.ibov_model import IbovAtivo
-            
-            total_ativos = IbovAtivo.query.with_entities(IbovAtivo.codigo).distinct().count()
-            total_refinados = DadosRefinados.query.with_entities(DadosRefinados.codigo).distinct().count()
-            
-            print(f"DEBUG - Total de ativos únicos no banco ibov_ativos: {total_ativos}")
-            print(f"DEBUG - Total de códigos únicos com dados refinados: {total_refinados}")
-            
-            codigos_com_dados = DadosRefinados.query.with_entities(DadosRefinados.codigo).distinct().all()
-            codigos_unicos = [c[0] for c in codigos_com_dados]
-            
-            print(f"DEBUG - Códigos únicos com dados refinados: {len(codigos_unicos)}")
-            
-            ml_service = MLService()
-            predicoes = []
-            codigos_com_erro = []
-            
-            for cod in codigos_unicos:
-                try:
-                    resultado = ml_service.prever(cod.upper())
-                    
-                    if 'erro' not in resultado:
-                        predicoes.append({
-                            'codigo': resultado['codigo'],
-                            'predicao': resultado['recomendacao'],
-                            'confianca': resultado['confianca'],
-                            'probabilidade': resultado['probabilidades']['comprar'] / 100
-                        })
-                    else:
-                        codigos_com_erro.append(f"{cod}: {resultado['erro']}")
-                except Exception as e:
-                    codigos_com_erro.append(f"{cod}: {str(e)}")
-                    continue
-            
-            print(f"DEBUG - Total de predições realizadas: {len(predicoes)}")
-            print(f"DEBUG - Total de códigos com erro: {len(codigos_com_erro)}")
-            if codigos_com_erro:
-                print(f"DEBUG - Primeiros 5 erros: {codigos_com_erro[:5]}")
-            
-            return jsonify({"predicoes": predicoes}), 200
-            
-        except Exception as e:
-            return jsonify({"error": f"Erro ao processar predições: {str(e)}"}), 500
+    return MLController.prever_lote(codigos)
 
 @bp.route('/ml/metricas', methods=['GET'])
+@requer_modulos('sklearn')
 def obter_metricas():
     from app.controllers.ml_controller import MLController
     return MLController.obter_metricas()
@@ -153,16 +113,29 @@ def obter_metricas():
 
 @bp.route('/', methods=['GET'])
 def status():
-    lstm_status = "✅ Funcionando (Fase 4)" if LSTM_AVAILABLE else "⚠️ TensorFlow não instalado"
+    # Disponibilidade verificada com find_spec: nenhum módulo pesado é importado aqui
+    tensorflow = modulo_disponivel('tensorflow')
+    sklearn = modulo_disponivel('sklearn')
+    yfinance = modulo_disponivel('yfinance')
+    motores = [m for m, disponivel in (
+        ('grafo', tensorflow),
+        ('keras', tensorflow),
+        ('tflite', tensorflow or modulo_disponivel('tflite_runtime')),
+        ('numpy', modulo_disponivel('h5py'))
+    ) if disponivel]
+    
+    lstm_status = "✅ Funcionando (Fase 4)" if tensorflow and sklearn else \
+        "⚠️ Treino requer TensorFlow e scikit-learn (previsão: " + (", ".join(motores) or "nenhum motor") + ")"
     return {
         "status": "API FIAP Tech Challenge - Fase 4",
         "version": "2.0",
         "projeto": "Deep Learning - Predição de Preços com LSTM",
         "funcionalidades": {
             "scraping_ibovespa": "✅ Funcionando (Fase 3)",
-            "ml_tradicional": "✅ Funcionando (Fase 3)",
+            "ml_tradicional": "✅ Funcionando (Fase 3)" if sklearn else "⚠️ scikit-learn não instalado",
             "lstm_deep_learning": lstm_status,
-            "yahoo_finance": "✅ Integrado (yfinance)" if LSTM_AVAILABLE else "⚠️ Requer TensorFlow"
+            "lstm_motores_previsao": motores,
+            "yahoo_finance": "✅ Integrado (yfinance)" if yfinance else "⚠️ yfinance não instalado"
         },
         "endpoints": {
             "fase_3": {
@@ -172,6 +145,10 @@ def status():
                 "ml_treinar": "/ml/treinar (POST)",
                 "ml_prever": "/ml/prever (POST)"
             },
+            "jobs": {
+                "listar": "/api/jobs (GET)",
+                "status": "/api/jobs/<job_id> (GET)"
+            },
             "fase_4": {
                 "stock_data": {
                     "coletar": "/api/stock-data/coletar (POST)",
@@ -179,16 +156,20 @@ def status():
                     "obter_dados": "/api/stock-data/<symbol> (GET)",
                     "info_empresa": "/api/stock-data/<symbol>/info (GET)",
                     "deletar": "/api/stock-data/<symbol> (DELETE)"
-                } if LSTM_AVAILABLE else "⚠️ Requer TensorFlow",
+                },
                 "lstm": {
                     "treinar": "/api/lstm/treinar (POST)",
+                    "treinar_lote": "/api/lstm/treinar-lote (POST)",
+                    "treinar_global": "/api/lstm/treinar-global (POST)",
+                    "ajustar": "/api/lstm/ajustar (POST)",
                     "prever": "/api/lstm/prever/<symbol> (GET)",
+                    "prever_lote": "/api/lstm/prever (POST)",
                     "listar_modelos": "/api/lstm/modelos (GET)",
                     "metricas": "/api/lstm/metricas/<model_name> (GET)"
-                } if LSTM_AVAILABLE else "⚠️ Requer TensorFlow"
+                }
             },
             "documentacao": "/swagger",
-            "instalacao_tensorflow": "pip install tensorflow==2.15.0 protobuf==3.20.3" if not LSTM_AVAILABLE else None
+            "instalacao_tensorflow": INSTALACAO['tensorflow'] if not tensorflow else None
         }
     }
 
@@ -197,59 +178,91 @@ def status():
 # ROTAS FASE 4 - LSTM e Stock Data
 # ========================================
 
-if LSTM_AVAILABLE:
-    # Stock Data Routes
-    @bp.route('/api/stock-data/coletar', methods=['POST'])
-    def coletar_dados_stock():
-        """Coleta dados históricos de ações usando yfinance"""
-        return StockDataController.coletar_dados()
-
-    @bp.route('/api/stock-data/symbols', methods=['GET'])
-    def listar_symbols():
-        """Lista todos os símbolos disponíveis"""
-        return StockDataController.listar_symbols()
-
-    @bp.route('/api/stock-data/<symbol>', methods=['GET'])
-    def obter_dados_stock(symbol):
-        """Obtém dados históricos de um símbolo"""
-        return StockDataController.obter_dados(symbol)
-
-    @bp.route('/api/stock-data/<symbol>/info', methods=['GET'])
-    def obter_info_empresa(symbol):
-        """Obtém informações da empresa"""
-        return StockDataController.obter_info_empresa(symbol)
-
-    @bp.route('/api/stock-data/<symbol>', methods=['DELETE'])
-    def deletar_dados_stock(symbol):
-        """Deleta dados de um símbolo"""
-        return StockDataController.deletar_dados(symbol)
-
-    # LSTM Routes
-    @bp.route('/api/lstm/treinar', methods=['POST'])
-    def treinar_lstm():
-        """Treina modelo LSTM para predição de preços"""
-        return LSTMController.treinar_modelo()
-
-    @bp.route('/api/lstm/prever/<symbol>', methods=['GET'])
-    def prever_lstm(symbol):
-        """Faz previsões de preços usando LSTM"""
-        return LSTMController.prever_precos(symbol)
-
-    @bp.route('/api/lstm/modelos', methods=['GET'])
-    def listar_modelos_lstm():
-        """Lista modelos LSTM treinados"""
-        return LSTMController.listar_modelos()
-
-    @bp.route('/api/lstm/metricas/<model_name>', methods=['GET'])
-    def obter_metricas_lstm(model_name):
-        """Obtém métricas de um modelo LSTM"""
-        return LSTMController.obter_metricas(model_name)
-else:
-    # Rotas stub quando LSTM não está disponível
-    @bp.route('/api/stock-data/coletar', methods=['POST'])
-    def coletar_dados_stock():
-        return jsonify({"erro": "TensorFlow não instalado. Execute: pip install tensorflow==2.15.0 protobuf==3.20.3"}), 503
-
-    @bp.route('/api/lstm/treinar', methods=['POST'])
-    def treinar_lstm():
-        return jsonify({"erro": "TensorFlow não instalado. Execute: pip install tensorflow==2.15.0 protobuf==3.20.3"}), 503
\ No newline at end of file
+# Controllers de stock data e LSTM são importados na primeira chamada:
+# yfinance e TensorFlow só carregam quando um endpoint que precisa deles é usado
+
+# Stock Data Routes
+@bp.route('/api/stock-data/coletar', methods=['POST'])
+@requer_modulos('yfinance')
+def coletar_dados_stock():
+    """Coleta dados históricos de ações usando yfinance"""
+    from app.controllers.stock_data_controller import StockDataController
+    return StockDataController.coletar_dados()
+
+@bp.route('/api/stock-data/symbols', methods=['GET'])
+def listar_symbols():
+    """Lista todos os símbolos disponíveis"""
+    from app.controllers.stock_data_controller import StockDataController
+    return StockDataController.listar_symbols()
+
+@bp.route('/api/stock-data/<symbol>', methods=['GET'])
+def obter_dados_stock(symbol):
+    """Obtém dados históricos de um símbolo"""
+    from app.controllers.stock_data_controller import StockDataController
+    return StockDataController.obter_dados(symbol)
+
+@bp.route('/api/stock-data/<symbol>/info', methods=['GET'])
+@requer_modulos('yfinance')
+def obter_info_empresa(symbol):
+    """Obtém informações da empresa"""
+    from app.controllers.stock_data_controller import StockDataController
+    return StockDataController.obter_info_empresa(symbol)
+
+@bp.route('/api/stock-data/<symbol>', methods=['DELETE'])
+def deletar_dados_stock(symbol):
+    """Deleta dados de um símbolo"""
+    from app.controllers.stock_data_controller import StockDataController
+    return StockDataController.deletar_dados(symbol)
+
+# LSTM Routes
+@bp.route('/api/lstm/treinar', methods=['POST'])
+@requer_modulos('tensorflow', 'sklearn')
+def treinar_lstm():
+    """Treina modelo LSTM para predição de preços"""
+    from app.controllers.lstm_controller import LSTMController
+    return LSTMController.treinar_modelo()
+
+@bp.route('/api/lstm/treinar-lote', methods=['POST'])
+@requer_modulos('tensorflow', 'sklearn')
+def treinar_lstm_lote():
+    """Treina modelos LSTM de vários símbolos em paralelo"""
+    from app.controllers.lstm_controller import LSTMController
+    return LSTMController.treinar_lote()
+
+@bp.route('/api/lstm/treinar-global', methods=['POST'])
+@requer_modulos('tensorflow', 'sklearn')
+def treinar_lstm_global():
+    """Treina um modelo LSTM global com janelas de vários símbolos"""
+    from app.controllers.lstm_controller import LSTMController
+    return LSTMController.treinar_modelo_global()
+
+@bp.route('/api/lstm/ajustar', methods=['POST'])
+@requer_modulos('tensorflow', 'sklearn')
+def ajustar_lstm():
+    """Ajuste fino do modelo LSTM ativo de um símbolo com as janelas recentes"""
+    from app.controllers.lstm_controller import LSTMController
+    return LSTMController.ajustar_modelo()
+
+@bp.route('/api/lstm/prever/<symbol>', methods=['GET'])
+def prever_lstm(symbol):
+    """Faz previsões de preços usando LSTM"""
+    from app.controllers.lstm_controller import LSTMController
+    return LSTMController.prever_precos(symbol)
+
+@bp.route('/api/lstm/prever', methods=['POST'])
+def prever_lstm_lote():
+    """Faz previsões de preços para vários símbolos em lote"""
+    from app.controllers.lstm_controller import LSTMController
+    return LSTMController.prever_precos_lote()
+
+@bp.route('/api/lstm/modelos', methods=['GET'])
+def listar_modelos_lstm():
+    """Lista modelos LSTM treinados"""
+    from app.controllers.lstm_controller import LSTMController
+    return LSTMController.listar_modelos()
+
+@bp.route('/api/lstm/metricas/<model_name>', methods=['GET'])
+def obter_metricas_lstm(model_name):
+    """Obtém métricas de um modelo LSTM"""
+    from app.controllers.lstm_controller import LSTMController
+    return LSTMController.obter_metricas(model_name)
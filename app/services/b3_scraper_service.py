@@ -14,11 +14,11 @@ logger = logging.getLogger("app.b3scraper")
 
 class B3Scraper:
     
-    def __init__(self, bucket_name: str = None):
+    def __init__(self, bucket_name: str = None, base_api: str = None):
         self.bucket_name = bucket_name
 
         self.base_page = "https://sistemaswebb3-listados.b3.com.br/indexPage/day/IBOV"
-        self.base_api = "https://sistemaswebb3-listados.b3.com.br/indexProxy/indexCall/GetPortfolioDay"
+        self.base_api = base_api or "https://sistemaswebb3-listados.b3.com.br/indexProxy/indexCall/GetPortfolioDay"
 
         self.headers_json = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -51,13 +51,13 @@ class B3Scraper:
             data = self._get_json_ibov(date_str)
             if data and data.get("results"):
                 results = [
-                    {
+                    self._com_valores_numericos({
                         "cod": str(r.get("cod", "")).strip(),
                         "asset": str(r.get("asset", "")).strip(),
                         "type": str(r.get("type", "")).strip(),
                         "theoricalQty": str(r.get("theoricalQty", "")).strip(),
                         "part": str(r.get("part", "")).strip(),
-                    }
+                    })
                     for r in data["results"]
                 ]
                 total = data.get("page", {}).get("totalRecords")
@@ -124,13 +124,13 @@ class B3Scraper:
                     part_str = cells[4].get_text(strip=True)
                     if not cod or not asset or not type_:
                         continue
-                    stocks_data.append({
+                    stocks_data.append(self._com_valores_numericos({
                         "cod": cod,
                         "asset": asset,
                         "type": type_,
                         "theoricalQty": theoricalQty_str,
                         "part": part_str,
-                    })
+                    }))
                 except Exception as e:
                     logger.warning(f"Erro ao processar linha: {e}")
                     continue
@@ -142,7 +142,14 @@ class B3Scraper:
         return stocks_data
 
 
-    def _parse_number(self, value: str) -> Optional[float]:
+    @classmethod
+    def _com_valores_numericos(cls, ativo: Dict) -> Dict:
+        ativo["part_valor"] = cls._parse_percentage(ativo["part"])
+        ativo["theoricalQty_valor"] = cls._parse_number(ativo["theoricalQty"])
+        return ativo
+
+    @staticmethod
+    def _parse_number(value: str) -> Optional[float]:
         if not value or value.strip() == '':
             return None
         try:
@@ -154,7 +161,8 @@ class B3Scraper:
         except (ValueError, AttributeError):
             return None
 
-    def _parse_percentage(self, value: str) -> Optional[float]:
+    @staticmethod
+    def _parse_percentage(value: str) -> Optional[float]:
         if not value or value.strip() == '':
             return None
         try:
@@ -0,0 +1,161 @@
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from app.models.ibov_model import IbovAtivo
+from app.services.b3_scraper_service import B3Scraper
+from app.utils.db_utils import inserir_ignorando_conflitos
+from app.utils.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Limitador de taxa (token bucket) compartilhado entre threads
+
+    Libera até `capacidade` chamadas em rajada e repõe `taxa` tokens por segundo.
+    """
+
+    def __init__(self, taxa: float, capacidade: int = None):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade or max(1, int(taxa)))
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                espera = (1 - self._tokens) / self.taxa
+
+            time.sleep(espera)
+
+
+class IbovService:
+    """
+    Persistência da carteira IBOV e backfill histórico a partir da B3
+    """
+
+    @staticmethod
+    def salvar_ativos(ativos, data) -> int:
+        """
+        Grava a carteira de um dia com um insert em lote; (codigo, data) já existentes são ignorados
+
+        Returns:
+            Número de ativos inseridos
+        """
+        registros = [
+            {
+                'codigo': ativo['cod'],
+                'nome': ativo['asset'],
+                'tipo': ativo['type'],
+                'participacao': ativo['part'],
+                'theoricalQty': ativo['theoricalQty'],
+                'participacao_valor': ativo['part_valor'],
+                'qtde_teorica_valor': ativo['theoricalQty_valor'],
+                'data': data
+            }
+            for ativo in ativos
+        ]
+
+        return inserir_ignorando_conflitos(IbovAtivo, registros, index_elements=['codigo', 'data'])
+
+    @staticmethod
+    def backfill_historico(meses: int = 6, max_workers: int = 4, requisicoes_por_segundo: float = 4.0,
+                           scraper_factory=B3Scraper, progresso=None) -> dict:
+        """
+        Coleta a carteira IBOV dos últimos N meses com concorrência limitada
+
+        Datas já presentes em ibov_ativos são descartadas antes de qualquer
+        requisição; as demais são buscadas por um pool de threads sob um token
+        bucket, e cada dia é gravado com um único insert em lote.
+
+        Args:
+            meses: Quantidade de meses (30 dias corridos cada) a cobrir
+            max_workers: Requisições simultâneas à B3
+            requisicoes_por_segundo: Taxa máxima de requisições
+            scraper_factory: Callable que cria um B3Scraper (um por thread)
+            progresso: Callable progresso(atual, total, descricao) chamado a cada dia (opcional)
+
+        Returns:
+            dict com estatísticas da coleta
+        """
+        inicio = time.perf_counter()
+        hoje = datetime.now().date()
+
+        datas = [
+            hoje - timedelta(days=dias_atras)
+            for dias_atras in range(0, meses * 30)
+            if (hoje - timedelta(days=dias_atras)).weekday() < 5
+        ]
+
+        existentes = {
+            d for (d,) in db.session.query(IbovAtivo.data)
+            .filter(IbovAtivo.data >= min(datas))
+            .distinct()
+            .all()
+        } if datas else set()
+
+        pendentes = [d for d in datas if d not in existentes]
+
+        limitador = TokenBucket(requisicoes_por_segundo, capacidade=max_workers)
+        local = threading.local()
+
+        def buscar(data):
+            if not hasattr(local, 'scraper'):
+                local.scraper = scraper_factory()
+            limitador.adquirir()
+            return local.scraper.fetch_ibov_data(date_str=data.strftime('%d/%m/%y'))
+
+        total_salvos = 0
+        total_dias = 0
+        erros = 0
+
+        if pendentes:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                futuros = {executor.submit(buscar, data): data for data in pendentes}
+
+                for processados, futuro in enumerate(as_completed(futuros), start=1):
+                    data = futuros[futuro]
+                    try:
+                        ativos = futuro.result()
+
+                        if ativos:
+                            salvos_dia = IbovService.salvar_ativos(ativos, data)
+                            db.session.commit()
+                            total_salvos += salvos_dia
+                            total_dias += 1
+                            logger.info(f"[HISTÓRICO] {data.strftime('%d/%m/%y')}: {salvos_dia} ativos")
+                        else:
+                            logger.info(f"[HISTÓRICO] {data.strftime('%d/%m/%y')}: sem dados")
+                            erros += 1
+
+                    except Exception as e_dia:
+                        db.session.rollback()
+                        logger.error(f"[HISTÓRICO] {data.strftime('%d/%m/%y')}: erro {str(e_dia)[:50]}")
+                        erros += 1
+
+                    if progresso is not None:
+                        progresso(processados, len(pendentes), data.strftime('%d/%m/%y'))
+
+        return {
+            'mensagem': 'Coleta histórica concluída!',
+            'dias_coletados': total_dias,
+            'dias_ja_existentes': len(datas) - len(pendentes),
+            'total_registros': total_salvos,
+            'media_por_dia': round(total_salvos / total_dias if total_dias > 0 else 0, 1),
+            'erros': erros,
+            'periodo': f'Últimos {meses} meses',
+            'tempo_segundos': round(time.perf_counter() - inicio, 2)
+        }
@@ -0,0 +1,306 @@
+import os
+import json
+import uuid
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.models.job_model import Job
+from app.utils.extensions import db
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDENTE = 'pendente'
+STATUS_EXECUTANDO = 'executando'
+STATUS_CONCLUIDO = 'concluido'
+STATUS_ERRO = 'erro'
+
+# Filas de workers e concorrência padrão (sobrescrita por app.config / variável de ambiente)
+FILAS_PADRAO = {
+    'treino': 1,
+    'coleta': 2
+}
+
+TAREFAS = {}
+
+
+def tarefa(tipo: str, fila: str):
+    """
+    Registra uma função como tarefa executável em segundo plano
+
+    A função recebe os parâmetros do job como kwargs e um callable
+    `progresso(atual, total, descricao=None)`, e deve retornar um dict
+    no formato dos services ({'erro': ...} em caso de falha).
+    """
+    def decorador(func):
+        TAREFAS[tipo] = {'fila': fila, 'func': func}
+        return func
+    return decorador
+
+
+class JobManager:
+    """
+    Fila local de jobs persistida na tabela `jobs`
+
+    Cada fila tem seu próprio pool de threads, de modo que um treinamento
+    longo não bloqueia as coletas. O estado e o progresso ficam no banco e
+    podem ser consultados por qualquer processo.
+
+    O limite de JOBS_WORKERS_<FILA> vale para todos os processos juntos (cada
+    worker do gunicorn tem seus próprios pools): um job só é reservado se a
+    fila tiver menos jobs executando no banco do que o limite. Quem não
+    consegue a vaga deixa o job pendente, e o processo que terminar um job da
+    fila executa o próximo pendente. No SQLite a reserva é atômica porque o
+    UPDATE toma o lock de escrita antes de contar.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._executores = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        for fila, padrao in FILAS_PADRAO.items():
+            chave = f'JOBS_WORKERS_{fila.upper()}'
+            app.config.setdefault(chave, int(os.environ.get(chave, padrao)))
+
+    def _limite(self, fila: str) -> int:
+        return max(1, int(self.app.config.get(f'JOBS_WORKERS_{fila.upper()}', FILAS_PADRAO.get(fila, 1))))
+
+    def _executor(self, fila: str) -> ThreadPoolExecutor:
+        with self._lock:
+            if fila not in self._executores:
+                self._executores[fila] = ThreadPoolExecutor(
+                    max_workers=self._limite(fila),
+                    thread_name_prefix=f'job-{fila}'
+                )
+            return self._executores[fila]
+
+    def submeter(self, tipo: str, parametros: dict) -> Job:
+        """
+        Cria o job no banco e agenda sua execução
+
+        Args:
+            tipo: Tipo registrado em TAREFAS
+            parametros: kwargs da tarefa (devem ser serializáveis em JSON)
+
+        Returns:
+            Job criado (status pendente)
+        """
+        if tipo not in TAREFAS:
+            raise ValueError(f'Tipo de job desconhecido: {tipo}')
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            tipo=tipo,
+            fila=TAREFAS[tipo]['fila'],
+            status=STATUS_PENDENTE,
+            parametros=json.dumps(parametros)
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        self._executor(job.fila).submit(self._executar, job.id)
+        return job
+
+    def recuperar(self):
+        """
+        Trata jobs deixados por um processo anterior: os que estavam executando
+        são marcados como erro e os pendentes voltam para a fila
+        """
+        self.marcar_interrompidos()
+        self.reagendar_pendentes()
+
+    def marcar_interrompidos(self) -> int:
+        """
+        Marca como erro os jobs que estavam executando quando o servidor parou
+
+        Só deve rodar antes de qualquer worker aceitar jobs (no servidor de
+        produção, no processo master antes do fork).
+        """
+        interrompidos = Job.query.filter_by(status=STATUS_EXECUTANDO).all()
+        for job in interrompidos:
+            job.status = STATUS_ERRO
+            job.erro = 'Job interrompido pelo reinício do servidor'
+            job.finished_at = datetime.now()
+        db.session.commit()
+
+        if interrompidos:
+            logger.info(f"Jobs: {len(interrompidos)} interrompido(s)")
+        return len(interrompidos)
+
+    def reagendar_pendentes(self) -> int:
+        """Coloca na fila deste processo os jobs que ainda estão pendentes"""
+        pendentes = Job.query.filter_by(status=STATUS_PENDENTE).order_by(Job.created_at).all()
+        for job in pendentes:
+            self._executor(job.fila).submit(self._executar, job.id)
+
+        if pendentes:
+            logger.info(f"Jobs: {len(pendentes)} reagendado(s)")
+        return len(pendentes)
+
+    def _reservar(self, job_id: str) -> bool:
+        """
+        Passa o job para executando se ele ainda estiver pendente e a fila
+        tiver vaga (contando os jobs executando em todos os processos)
+        """
+        tabela = Job.__table__
+        fila = db.session.query(Job.fila).filter(Job.id == job_id).scalar()
+        db.session.rollback()
+        if fila is None:
+            return False
+
+        executando = db.select(db.func.count()).select_from(tabela).where(
+            tabela.c.fila == fila, tabela.c.status == STATUS_EXECUTANDO
+        ).scalar_subquery()
+
+        reservado = db.session.execute(
+            tabela.update()
+            .where(tabela.c.id == job_id, tabela.c.status == STATUS_PENDENTE,
+                   executando < self._limite(fila))
+            .values(status=STATUS_EXECUTANDO, started_at=datetime.now())
+        ).rowcount
+        db.session.commit()
+        return bool(reservado)
+
+    def _agendar_proximo(self, fila: str):
+        """Coloca na fila deste processo o pendente mais antigo da fila, se houver"""
+        proximo = db.session.query(Job.id).filter_by(fila=fila, status=STATUS_PENDENTE)\
+            .order_by(Job.created_at).first()
+        if proximo is not None:
+            self._executor(fila).submit(self._executar, proximo.id)
+
+    def _executar(self, job_id: str):
+        with self.app.app_context():
+            # Reserva atômica: com vários processos servindo a API, um job só é
+            # executado por quem conseguir mudar o status dentro do limite da fila
+            if not self._reservar(job_id):
+                return
+
+            job = db.session.get(Job, job_id)
+
+            tarefa_info = TAREFAS[job.tipo]
+            parametros = json.loads(job.parametros or '{}')
+
+            try:
+                resultado = tarefa_info['func'](progresso=self._callback_progresso(job_id), **parametros)
+                db.session.rollback()
+
+                job = db.session.get(Job, job_id)
+                job.resultado = json.dumps(resultado, default=str)
+                if isinstance(resultado, dict) and 'erro' in resultado:
+                    job.status = STATUS_ERRO
+                    job.erro = str(resultado['erro'])
+                else:
+                    job.status = STATUS_CONCLUIDO
+
+            except Exception as e:
+                logger.exception(f"Job {job_id} ({job.tipo}) falhou")
+                db.session.rollback()
+                job = db.session.get(Job, job_id)
+                job.status = STATUS_ERRO
+                job.erro = str(e)
+
+            job.finished_at = datetime.now()
+            db.session.commit()
+
+            # A vaga liberada vai para o próximo pendente, inclusive os
+            # submetidos por outros processos
+            self._agendar_proximo(job.fila)
+
+    def _callback_progresso(self, job_id: str):
+        # Progresso é gravado em uma conexão própria para não interferir
+        # na transação da tarefa
+        tabela = Job.__table__
+
+        def progresso(atual: int, total: int = None, descricao: str = None):
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(
+                        tabela.update()
+                        .where(tabela.c.id == job_id)
+                        .values(progresso_atual=atual, progresso_total=total,
+                                progresso_descricao=descricao[:200] if descricao else None)
+                    )
+            except Exception as e:
+                logger.warning(f"Job {job_id}: falha ao registrar progresso: {e}")
+
+        return progresso
+
+    @staticmethod
+    def obter(job_id: str) -> dict:
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return {'erro': f'Job {job_id} não encontrado'}
+        return job.to_dict()
+
+    @staticmethod
+    def listar(status: str = None, tipo: str = None, limit: int = 50) -> dict:
+        query = Job.query
+        if status:
+            query = query.filter_by(status=status)
+        if tipo:
+            query = query.filter_by(tipo=tipo)
+
+        jobs = query.order_by(Job.created_at.desc()).limit(limit).all()
+        return {
+            'total': len(jobs),
+            'jobs': [job.to_dict(incluir_resultado=False) for job in jobs]
+        }
+
+
+job_manager = JobManager()
+
+
+# ========================================
+# Tarefas
+# ========================================
+
+@tarefa('lstm_treinar', fila='treino')
+def _treinar_lstm(progresso=None, **parametros):
+    from app.services.lstm_service import LSTMService
+    return LSTMService().treinar_modelo(progresso=progresso, **parametros)
+
+
+@tarefa('lstm_treinar_lote', fila='treino')
+def _treinar_lstm_lote(progresso=None, **parametros):
+    from app.services.lstm_service import LSTMService
+    return LSTMService().treinar_lote(progresso=progresso, **parametros)
+
+
+@tarefa('lstm_treinar_global', fila='treino')
+def _treinar_lstm_global(progresso=None, **parametros):
+    from app.services.lstm_service import LSTMService
+    return LSTMService().treinar_modelo_global(progresso=progresso, **parametros)
+
+
+@tarefa('lstm_ajustar', fila='treino')
+def _ajustar_lstm(progresso=None, **parametros):
+    from app.services.lstm_service import LSTMService
+    return LSTMService().ajustar_modelo(progresso=progresso, **parametros)
+
+
+@tarefa('ml_treinar', fila='treino')
+def _treinar_ml(progresso=None, **parametros):
+    from app.services.ml_service import MLService
+    return MLService().treinar_modelo(progresso=progresso, **parametros)
+
+
+@tarefa('stock_data_coletar', fila='coleta')
+def _coletar_stock_data(progresso=None, **parametros):
+    from app.services.stock_data_service import StockDataService
+    return StockDataService().coletar_dados_historicos(**parametros)
+
+
+@tarefa('stock_data_coletar_lote', fila='coleta')
+def _coletar_stock_data_lote(progresso=None, **parametros):
+    from app.services.stock_data_service import StockDataService
+    return StockDataService().coletar_dados_lote(progresso=progresso, **parametros)
+
+
+@tarefa('ibov_scrap_historico', fila='coleta')
+def _scrap_historico(progresso=None, **parametros):
+    from app.services.ibov_service import IbovService
+    return IbovService.backfill_historico(progresso=progresso, **parametros)
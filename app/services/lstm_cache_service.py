@@ -0,0 +1,177 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class LSTMModelCache:
+    """
+    Registro em memória (por processo) de modelos LSTM já carregados.
+
+    Mantém modelo Keras e scaler "quentes" por model_name, com despejo LRU
+    limitado por um orçamento de memória configurável (LSTM_CACHE_MAX_MB).
+    Requisições simultâneas por um modelo ausente disparam um único
+    carregamento; as demais esperam por ele.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('LSTM_CACHE_MAX_MB', 512)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._carregando = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def estimar_tamanho(model, scaler=None) -> int:
+        """
+        Estima o tamanho em bytes de um modelo carregado
+
+        Args:
+            model: Modelo Keras
+            scaler: Scaler associado (opcional)
+
+        Returns:
+            Tamanho aproximado em bytes (pesos + scaler)
+        """
+        try:
+            # Modelos exportados (ex: TFLite) informam o próprio tamanho
+            tamanho = model.nbytes if hasattr(model, 'nbytes') else sum(w.nbytes for w in model.get_weights())
+        except Exception:
+            tamanho = 0
+        if scaler is not None:
+            for attr in ('min_', 'scale_', 'data_min_', 'data_max_', 'data_range_'):
+                valor = getattr(scaler, attr, None)
+                if valor is not None and hasattr(valor, 'nbytes'):
+                    tamanho += valor.nbytes
+        return tamanho
+
+    def obter(self, model_name: str, loader, symbol: str = None):
+        """
+        Retorna (model, scaler) do cache, carregando via loader em caso de miss
+
+        Args:
+            model_name: Nome do modelo (chave do cache)
+            loader: Callable sem argumentos que retorna (model, scaler)
+            symbol: Símbolo da ação (usado na invalidação)
+
+        Returns:
+            Tupla (model, scaler)
+
+        Só a primeira thread de um miss executa o loader (contado em misses);
+        as que chegam durante o carregamento esperam o mesmo resultado (ou a
+        mesma exceção) e contam como hits.
+        """
+        with self._lock:
+            entry = self._entries.get(model_name)
+            if entry is not None:
+                self._entries.move_to_end(model_name)
+                self.hits += 1
+                return entry['model'], entry['scaler']
+
+            futuro = self._carregando.get(model_name)
+            carregar = futuro is None
+            if carregar:
+                futuro = Future()
+                self._carregando[model_name] = futuro
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not carregar:
+            return futuro.result()
+
+        try:
+            model, scaler = loader()
+            self.registrar(model_name, model, scaler, symbol=symbol)
+            futuro.set_result((model, scaler))
+            return model, scaler
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._carregando.pop(model_name, None)
+
+    def registrar(self, model_name: str, model, scaler, symbol: str = None, tamanho: int = None):
+        """
+        Insere ou substitui um modelo no cache, despejando os menos usados se necessário
+
+        Args:
+            model_name: Nome do modelo
+            model: Modelo Keras carregado
+            scaler: Scaler associado
+            symbol: Símbolo da ação (usado na invalidação)
+            tamanho: Tamanho em bytes (estimado se não informado)
+        """
+        if tamanho is None:
+            tamanho = self.estimar_tamanho(model, scaler)
+
+        if tamanho > self.max_bytes:
+            logger.warning(f"Modelo {model_name} ({tamanho} bytes) excede o orçamento do cache, não será mantido")
+            return
+
+        with self._lock:
+            self._entries.pop(model_name, None)
+            self._entries[model_name] = {
+                'model': model,
+                'scaler': scaler,
+                'symbol': symbol,
+                'tamanho': tamanho
+            }
+            self._despejar()
+
+    def invalidar(self, model_name: str):
+        with self._lock:
+            self._entries.pop(model_name, None)
+
+    def invalidar_symbol(self, symbol: str, manter: str = None):
+        """
+        Remove do cache os modelos de um símbolo (ex: após treinar um modelo mais novo)
+
+        Args:
+            symbol: Símbolo da ação
+            manter: model_name que deve permanecer no cache (opcional)
+        """
+        with self._lock:
+            remover = [
+                nome for nome, entry in self._entries.items()
+                if nome != manter and entry['symbol'] == symbol
+            ]
+            for nome in remover:
+                del self._entries[nome]
+            if remover:
+                logger.info(f"Cache LSTM: {len(remover)} modelo(s) de {symbol} invalidado(s)")
+
+    def limpar(self):
+        with self._lock:
+            self._entries.clear()
+
+    def uso_bytes(self) -> int:
+        with self._lock:
+            return sum(e['tamanho'] for e in self._entries.values())
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                'modelos': list(self._entries.keys()),
+                'uso_bytes': sum(e['tamanho'] for e in self._entries.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _despejar(self):
+        uso = sum(e['tamanho'] for e in self._entries.values())
+        while uso > self.max_bytes and self._entries:
+            nome, entry = self._entries.popitem(last=False)
+            uso -= entry['tamanho']
+            logger.info(f"Cache LSTM: modelo {nome} despejado (LRU)")
+
+
+lstm_model_cache = LSTMModelCache()
@@ -0,0 +1,533 @@
+import os
+import time
+import threading
+import logging
+from datetime import timedelta
+
+import joblib
+import numpy as np
+
+from app.models.stock_data_model import StockData
+from app.models.lstm_model_info import LSTMModel
+from app.models.lstm_model_symbol import LSTMModelSymbol
+from app.models.lstm_model_lineage import LSTMModelLineage
+from app.services.lstm_cache_service import lstm_model_cache
+from app.services.lstm_numpy_service import ModeloNumPy
+from app.utils.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Valor de LSTMModel.symbol para modelos globais (símbolos cobertos em lstm_model_symbols)
+SYMBOL_GLOBAL = 'GLOBAL'
+
+
+def caminho_tflite(model_path: str) -> str:
+    """Caminho do artefato TFLite exportado ao lado do .h5"""
+    return os.path.splitext(model_path)[0] + '.tflite'
+
+
+def _criar_interpretador(caminho: str):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        # Sem tflite-runtime instalado: usa o interpretador embutido no TensorFlow
+        from tensorflow.lite import Interpreter
+    return Interpreter(model_path=caminho)
+
+
+class ModeloTFLite:
+    """
+    Modelo LSTM exportado para TFLite (entrada com batch fixo em 1)
+
+    Cada janela é um invoke() separado: o LSTM fundido não aceita
+    resize_tensor_input para outro batch (o estado tem tamanho fixo) e um
+    artefato exportado com batch maior custa o mesmo por janela. Para muitas
+    janelas de uma vez o motor 'numpy' é vetorizado sobre o batch.
+
+    O interpretador não é thread-safe, então cada chamada roda sob um lock.
+    O LSTM fundido do TFLite guarda o estado (h, c) em variáveis entre um
+    invoke() e outro; ele é zerado antes de cada janela, senão a previsão
+    dependeria das requisições anteriores.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.nbytes = os.path.getsize(caminho)
+        self._interpretador = _criar_interpretador(caminho)
+        self._interpretador.allocate_tensors()
+        self._lock = threading.Lock()
+
+        entradas = self._interpretador.get_input_details()
+        self._entrada_janela = next(e['index'] for e in entradas if len(e['shape']) == 3)
+        indices = [e['index'] for e in entradas if len(e['shape']) == 1]
+        self._entrada_indice = indices[0] if indices else None
+        self._saida = self._interpretador.get_output_details()[0]['index']
+
+    def prever(self, janelas: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """
+        Próximo valor de cada janela
+
+        Args:
+            janelas: Array (batch, sequence_length) normalizado
+            indices: Índice do símbolo de cada janela (modelos com embedding)
+
+        Returns:
+            Array (batch,)
+        """
+        saidas = np.empty(len(janelas), dtype=np.float32)
+        with self._lock:
+            for i in range(len(janelas)):
+                self._interpretador.set_tensor(self._entrada_janela, janelas[i][np.newaxis, :, np.newaxis])
+                if self._entrada_indice is not None:
+                    self._interpretador.set_tensor(self._entrada_indice, indices[i:i + 1])
+                self._interpretador.reset_all_variables()
+                self._interpretador.invoke()
+                saidas[i] = self._interpretador.get_tensor(self._saida)[0, 0]
+        return saidas
+
+
+class LSTMInferenciaService:
+    """
+    Previsão com modelos LSTM sem importar TensorFlow/Keras
+
+    Motores: 'tflite' (artefato .tflite gravado ao lado do .h5 no treinamento,
+    via tflite-runtime) e 'numpy' (forward pass em NumPy com os pesos do .h5).
+    LSTMService estende esta classe com os motores Keras.
+    """
+
+    MOTORES_PREVISAO = ('tflite', 'numpy')
+    MOTOR_PADRAO = 'tflite'
+
+    def prever_proximos_dias(self, symbol: str, dias: int = 5, model_name: str = None,
+                             motor: str = None) -> dict:
+        """
+        Faz previsão dos próximos N dias
+
+        Args:
+            symbol: Símbolo da ação
+            dias: Número de dias para prever
+            model_name: Nome do modelo (opcional, usa o mais recente se não especificado)
+            motor: Um de MOTORES_PREVISAO (padrão: MOTOR_PADRAO)
+
+        Returns:
+            dict com previsões
+        """
+        try:
+            motor = motor or self.MOTOR_PADRAO
+            if motor not in self.MOTORES_PREVISAO:
+                return {'erro': f'Motor inválido: {motor}. Opções: {", ".join(self.MOTORES_PREVISAO)}'}
+
+            # Buscar modelo (próprio do símbolo ou global que o cubra)
+            model_info, cobertura = self._buscar_modelo(symbol, model_name)
+
+            if not model_info:
+                return {'erro': f'Nenhum modelo encontrado para {symbol}'}
+
+            if model_info.symbol == SYMBOL_GLOBAL and cobertura is None:
+                return {'erro': f'Modelo {model_info.model_name} não cobre {symbol}'}
+
+            # Carregar modelo e scaler (cache em memória por model_name)
+            model, scaler = self.carregar_modelo(model_info, motor=motor)
+            if cobertura is not None:
+                scaler = scaler[symbol]
+
+            # Buscar dados históricos
+            sequence_length = model_info.sequence_length
+            dados = StockData.query.filter_by(symbol=symbol)\
+                .order_by(StockData.date.desc())\
+                .limit(sequence_length)\
+                .all()
+
+            if len(dados) < sequence_length:
+                return {'erro': f'Dados históricos insuficientes para {symbol}'}
+
+            # Preparar dados
+            dados = list(reversed(dados))
+            prices = np.array([d.close for d in dados]).reshape(-1, 1)
+            scaled_prices = scaler.transform(prices)
+
+            # Fazer previsões
+            scaled_preds = self.prever_sequencia(
+                model, scaled_prices[:, 0], dias, motor=motor,
+                indices=[cobertura.indice] if cobertura is not None else None
+            )
+            previsoes = [float(p) for p in scaler.inverse_transform(scaled_preds.reshape(-1, 1))[:, 0]]
+
+            return self._montar_resposta_previsao(
+                symbol, model_info, dados[-1].date, float(dados[-1].close), previsoes, cobertura=cobertura
+            )
+
+        except Exception as e:
+            logger.error(f"Erro ao fazer previsão: {e}")
+            return {'erro': f'Erro ao fazer previsão: {str(e)}'}
+
+    def prever_lote(self, pedidos: list, motor: str = None) -> dict:
+        """
+        Faz previsões para vários símbolos de uma vez
+        
+        Símbolos são agrupados por sequence_length (uma única consulta SQL busca
+        as últimas janelas de todos eles) e por modelo (um único rollout com as
+        janelas empilhadas). estatisticas.chamadas_inferencia conta as chamadas
+        reais ao motor: uma por dia nos motores vetorizados, uma por janela e
+        por dia no 'tflite' (batch fixo em 1).
+        
+        Args:
+            pedidos: Lista de dicts {'symbol': str, 'dias': int}
+            motor: Um de MOTORES_PREVISAO (padrão: MOTOR_PADRAO)
+        
+        Returns:
+            dict com previsões por símbolo e erros
+        """
+        try:
+            motor = motor or self.MOTOR_PADRAO
+            if motor not in self.MOTORES_PREVISAO:
+                return {'erro': f'Motor inválido: {motor}. Opções: {", ".join(self.MOTORES_PREVISAO)}'}
+            
+            dias_por_symbol = {p['symbol']: p['dias'] for p in pedidos}
+            symbols = list(dias_por_symbol.keys())
+            
+            # Modelo ativo mais recente de cada símbolo (uma consulta)
+            modelos = LSTMModel.query.filter(
+                LSTMModel.symbol.in_(symbols),
+                LSTMModel.is_active == True
+            ).order_by(LSTMModel.created_at.desc()).all()
+            
+            modelo_por_symbol = {}
+            for m in modelos:
+                modelo_por_symbol.setdefault(m.symbol, m)
+            
+            # Símbolos sem modelo próprio: modelo global ativo mais recente que os cubra
+            coberturas = {}
+            faltantes = [s for s in symbols if s not in modelo_por_symbol]
+            if faltantes:
+                globais = db.session.query(LSTMModel, LSTMModelSymbol)\
+                    .join(LSTMModelSymbol, LSTMModelSymbol.model_id == LSTMModel.id)\
+                    .filter(LSTMModelSymbol.symbol.in_(faltantes), LSTMModel.is_active == True)\
+                    .order_by(LSTMModel.created_at.desc()).all()
+                
+                for m, cobertura in globais:
+                    if cobertura.symbol not in modelo_por_symbol:
+                        modelo_por_symbol[cobertura.symbol] = m
+                        coberturas[cobertura.symbol] = cobertura
+            
+            erros = {s: f'Nenhum modelo encontrado para {s}' for s in symbols if s not in modelo_por_symbol}
+            
+            grupos = {}
+            for symbol, model_info in modelo_por_symbol.items():
+                grupos.setdefault(model_info.sequence_length, []).append(symbol)
+            
+            resultados = {}
+            chamadas_inferencia = 0
+            
+            for sequence_length, symbols_grupo in grupos.items():
+                janelas = self._buscar_ultimas_janelas(symbols_grupo, sequence_length)
+                
+                por_modelo = {}
+                for symbol in symbols_grupo:
+                    if len(janelas.get(symbol, [])) < sequence_length:
+                        erros[symbol] = f'Dados históricos insuficientes para {symbol}'
+                        continue
+                    por_modelo.setdefault(modelo_por_symbol[symbol].model_name, []).append(symbol)
+                
+                for model_name, symbols_modelo in por_modelo.items():
+                    model_info = modelo_por_symbol[symbols_modelo[0]]
+                    model, scaler = self.carregar_modelo(model_info, motor=motor)
+                    
+                    # Modelos globais guardam um scaler por símbolo
+                    scalers = [scaler[s] if s in coberturas else scaler for s in symbols_modelo]
+                    indices = [coberturas[s].indice if s in coberturas else 0 for s in symbols_modelo]
+                    
+                    precos = np.array([[c for _, c in janelas[s]] for s in symbols_modelo])
+                    scaled = np.stack([sc.transform(p.reshape(-1, 1))[:, 0] for sc, p in zip(scalers, precos)])
+                    
+                    horizonte = max(dias_por_symbol[s] for s in symbols_modelo)
+                    scaled_preds = self.prever_sequencia(model, scaled, horizonte, motor=motor, indices=indices)
+                    preds = np.stack([sc.inverse_transform(p.reshape(-1, 1))[:, 0] for sc, p in zip(scalers, scaled_preds)])
+                    chamadas_inferencia += self.contar_chamadas_inferencia(motor, len(symbols_modelo), horizonte)
+                    
+                    for i, symbol in enumerate(symbols_modelo):
+                        ultima_data, ultimo_preco = janelas[symbol][-1]
+                        previsoes = [float(p) for p in preds[i, :dias_por_symbol[symbol]]]
+                        resultados[symbol] = self._montar_resposta_previsao(
+                            symbol, model_info, ultima_data, float(ultimo_preco), previsoes,
+                            cobertura=coberturas.get(symbol)
+                        )
+            
+            return {
+                'total': len(resultados),
+                'previsoes': [resultados[s] for s in symbols if s in resultados],
+                'erros': erros,
+                'estatisticas': {
+                    'grupos_sequence_length': len(grupos),
+                    'chamadas_inferencia': chamadas_inferencia
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Erro ao fazer previsão em lote: {e}")
+            return {'erro': f'Erro ao fazer previsão em lote: {str(e)}'}
+    
+    def _buscar_ultimas_janelas(self, symbols: list, sequence_length: int) -> dict:
+        """
+        Busca os últimos sequence_length fechamentos de vários símbolos em uma consulta
+        
+        Returns:
+            dict symbol -> lista de (date, close) em ordem cronológica
+        """
+        posicao = db.func.row_number().over(
+            partition_by=StockData.symbol,
+            order_by=StockData.date.desc()
+        ).label('posicao')
+        
+        sub = db.session.query(
+            StockData.symbol, StockData.date, StockData.close, posicao
+        ).filter(StockData.symbol.in_(symbols)).subquery()
+        
+        linhas = db.session.query(sub.c.symbol, sub.c.date, sub.c.close)\
+            .filter(sub.c.posicao <= sequence_length)\
+            .order_by(sub.c.symbol, sub.c.date.asc())\
+            .all()
+        
+        janelas = {}
+        for symbol, date, close in linhas:
+            janelas.setdefault(symbol, []).append((date, close))
+        return janelas
+    
+    def _buscar_modelo(self, symbol: str, model_name: str = None) -> tuple:
+        """
+        Modelo usado para um símbolo: o informado, o ativo mais recente do próprio
+        símbolo ou, na falta deste, o modelo global ativo mais recente que o cubra
+
+        Returns:
+            Tupla (LSTMModel ou None, LSTMModelSymbol ou None se não for global)
+        """
+        if model_name:
+            model_info = LSTMModel.query.filter_by(model_name=model_name).first()
+        else:
+            model_info = LSTMModel.query.filter_by(symbol=symbol, is_active=True)\
+                .order_by(LSTMModel.created_at.desc()).first()
+
+            if model_info is None:
+                model_info = LSTMModel.query\
+                    .join(LSTMModelSymbol, LSTMModelSymbol.model_id == LSTMModel.id)\
+                    .filter(LSTMModelSymbol.symbol == symbol, LSTMModel.is_active == True)\
+                    .order_by(LSTMModel.created_at.desc()).first()
+
+        if model_info is None or model_info.symbol != SYMBOL_GLOBAL:
+            return model_info, None
+
+        cobertura = LSTMModelSymbol.query.filter_by(model_id=model_info.id, symbol=symbol).first()
+        return model_info, cobertura
+
+    def _montar_resposta_previsao(self, symbol: str, model_info: LSTMModel, ultima_data,
+                                  ultimo_preco: float, previsoes: list, cobertura: LSTMModelSymbol = None) -> dict:
+        dias = len(previsoes)
+
+        # Modelo global: métricas do próprio símbolo
+        metricas = cobertura if cobertura is not None else model_info
+
+        # Gerar datas futuras
+        datas_futuras = []
+        for i in range(1, dias + 1):
+            proxima_data = ultima_data + timedelta(days=i)
+            # Pular fins de semana
+            while proxima_data.weekday() >= 5:
+                proxima_data += timedelta(days=1)
+            datas_futuras.append(proxima_data.strftime('%Y-%m-%d'))
+
+        return {
+            'symbol': symbol,
+            'model_name': model_info.model_name,
+            'ultimo_preco_real': ultimo_preco,
+            'ultima_data': ultima_data.strftime('%Y-%m-%d'),
+            'previsoes': [
+                {
+                    'data': datas_futuras[i],
+                    'preco_previsto': round(previsoes[i], 2),
+                    'variacao_percentual': round(((previsoes[i] - ultimo_preco) / ultimo_preco) * 100, 2)
+                }
+                for i in range(dias)
+            ],
+            'metricas_modelo': {
+                'mae': metricas.mae,
+                'rmse': metricas.rmse,
+                'mape': metricas.mape
+            }
+        }
+
+    def prever_sequencia(self, model, janela, dias: int, motor: str = None, indices=None) -> np.ndarray:
+        """
+        Previsão autorregressiva de N passos com um modelo exportado
+
+        Args:
+            model: ModeloTFLite ou ModeloNumPy carregado
+            janela: Array normalizado (sequence_length,) ou (batch, sequence_length)
+            dias: Número de passos a prever
+            motor: Ignorado (o modelo carregado já define o motor)
+            indices: Índice do símbolo de cada janela (modelos globais com embedding)
+
+        Returns:
+            Array normalizado (dias,) ou (batch, dias)
+        """
+        janela = np.asarray(janela, dtype=np.float32)
+        unico = janela.ndim == 1
+        if unico:
+            janela = janela[np.newaxis, :]
+
+        if indices is None:
+            indices = np.zeros(len(janela), dtype=np.int32)
+        indices = np.asarray(indices, dtype=np.int32).reshape(-1)
+
+        sequence_length = janela.shape[1]
+        buffer = np.concatenate([janela, np.empty((len(janela), dias), dtype=np.float32)], axis=1)
+
+        for i in range(dias):
+            buffer[:, sequence_length + i] = model.prever(buffer[:, i:sequence_length + i], indices)
+
+        previsoes = buffer[:, sequence_length:]
+        return previsoes[0] if unico else previsoes
+
+    def contar_chamadas_inferencia(self, motor: str, janelas: int, dias: int) -> int:
+        """
+        Número de chamadas ao motor feitas por prever_sequencia
+
+        Args:
+            motor: Motor usado no rollout
+            janelas: Janelas empilhadas no rollout
+            dias: Número de passos previstos
+
+        Returns:
+            Chamadas de inferência (invoke do TFLite, forward do NumPy)
+        """
+        if motor == 'tflite':
+            return janelas * dias
+        return dias
+
+    def carregar_modelo(self, model_info: LSTMModel, motor: str = None) -> tuple:
+        """
+        Carrega o modelo exportado e o scaler, reutilizando o cache do processo
+
+        Args:
+            model_info: Registro LSTMModel do modelo
+            motor: 'tflite' (padrão) ou 'numpy'
+
+        Returns:
+            Tupla (ModeloTFLite ou ModeloNumPy, scaler)
+        """
+        motor = motor or self.MOTORES_PREVISAO[0]
+
+        def loader():
+            scaler = joblib.load(model_info.model_path.replace('.h5', '_scaler.pkl'))
+
+            if motor == 'numpy':
+                return ModeloNumPy(model_info.model_path), scaler
+
+            caminho = caminho_tflite(model_info.model_path)
+            if not os.path.exists(caminho):
+                raise FileNotFoundError(f'Artefato TFLite não encontrado para {model_info.model_name}')
+            return ModeloTFLite(caminho), scaler
+
+        return lstm_model_cache.obter(f'{model_info.model_name}.{motor}', loader, symbol=model_info.symbol)
+
+    def aquecer_cache(self, motores: list = None, max_modelos: int = None) -> dict:
+        """
+        Carrega no cache do processo o modelo ativo mais recente de cada símbolo
+
+        Cada modelo faz também uma previsão de um passo, para que o primeiro
+        request não pague a alocação do interpretador/traçado do grafo.
+
+        Args:
+            motores: Motores a aquecer (padrão: [MOTOR_PADRAO])
+            max_modelos: Limite de modelos carregados (os mais recentes primeiro)
+
+        Returns:
+            dict com modelos carregados, erros e tempo
+        """
+        inicio = time.perf_counter()
+        motores = motores or [self.MOTOR_PADRAO]
+        invalidos = [m for m in motores if m not in self.MOTORES_PREVISAO]
+        if invalidos:
+            return {'erro': f'Motor inválido: {", ".join(invalidos)}. Opções: {", ".join(self.MOTORES_PREVISAO)}'}
+
+        ativos = LSTMModel.query.filter_by(is_active=True).order_by(LSTMModel.created_at.desc()).all()
+        modelos = {}
+        for m in ativos:
+            modelos.setdefault(m.symbol, m)
+        modelos = list(modelos.values())[:max_modelos]
+
+        carregados = []
+        erros = {}
+        for model_info in modelos:
+            for motor in motores:
+                try:
+                    model, _ = self.carregar_modelo(model_info, motor=motor)
+                    self.prever_sequencia(
+                        model, np.zeros(model_info.sequence_length, dtype=np.float32), 1,
+                        motor=motor, indices=[0]
+                    )
+                    carregados.append(f'{model_info.model_name}.{motor}')
+                except Exception as e:
+                    erros[f'{model_info.model_name}.{motor}'] = str(e)
+
+        return {
+            'modelos': len(modelos),
+            'carregados': carregados,
+            'erros': erros,
+            'uso_cache_bytes': lstm_model_cache.uso_bytes(),
+            'tempo_segundos': round(time.perf_counter() - inicio, 2)
+        }
+
+    def listar_modelos(self, symbol: str = None) -> dict:
+        """
+        Lista modelos LSTM treinados
+        
+        Args:
+            symbol: Símbolo da ação (opcional)
+        
+        Returns:
+            dict com lista de modelos
+        """
+        try:
+            if symbol:
+                modelos = LSTMModel.query.filter_by(symbol=symbol)\
+                    .order_by(LSTMModel.created_at.desc()).all()
+            else:
+                modelos = LSTMModel.query.order_by(LSTMModel.created_at.desc()).all()
+            
+            return {
+                'total': len(modelos),
+                'modelos': [m.to_dict() for m in modelos]
+            }
+            
+        except Exception as e:
+            logger.error(f"Erro ao listar modelos: {e}")
+            return {'erro': f'Erro ao listar modelos: {str(e)}'}
+    
+    def obter_metricas_modelo(self, model_name: str) -> dict:
+        """
+        Obtém métricas detalhadas de um modelo
+        
+        Args:
+            model_name: Nome do modelo
+        
+        Returns:
+            dict com métricas do modelo
+        """
+        try:
+            model_info = LSTMModel.query.filter_by(model_name=model_name).first()
+            
+            if not model_info:
+                return {'erro': f'Modelo {model_name} não encontrado'}
+            
+            resposta = model_info.to_dict()
+            
+            linhagem = LSTMModelLineage.query.filter_by(model_id=model_info.id).first()
+            if linhagem is not None:
+                pai = db.session.get(LSTMModel, linhagem.parent_id)
+                resposta['linhagem'] = {'modelo_pai': pai.model_name if pai else None, **linhagem.to_dict()}
+            
+            return resposta
+            
+        except Exception as e:
+            logger.error(f"Erro ao obter métricas: {e}")
+            return {'erro': f'Erro ao obter métricas: {str(e)}'}
@@ -0,0 +1,130 @@
+import json
+
+import h5py
+import numpy as np
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+_ATIVACOES = {
+    None: lambda x: x,
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid
+}
+
+
+class ModeloNumPy:
+    """
+    Forward pass em NumPy da arquitetura de criar_modelo_lstm
+
+    Pesos lidos diretamente do .h5 salvo pelo Keras (h5py, sem TensorFlow):
+    LSTMs empilhados (gates i, f, c, o na ordem do Keras), Dense finais e,
+    nos modelos globais, o embedding do símbolo concatenado a cada passo.
+    Toda a conta é vetorizada na dimensão de batch; Dropout é ignorado
+    (inferência).
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.lstms = []
+        self.denses = []
+        self.embedding = None
+
+        with h5py.File(caminho, 'r') as arquivo:
+            config = json.loads(arquivo.attrs['model_config'])
+            pesos = arquivo['model_weights']
+
+            for camada in config['config']['layers']:
+                tipo = camada['class_name']
+                nome = camada['config']['name']
+
+                if tipo == 'LSTM':
+                    w = self._ler_pesos(pesos[nome])
+                    self.lstms.append({
+                        'kernel': w['kernel'],
+                        'recurrent_kernel': w['recurrent_kernel'],
+                        'bias': w['bias'],
+                        'units': w['recurrent_kernel'].shape[0],
+                        'return_sequences': camada['config'].get('return_sequences', False)
+                    })
+                elif tipo == 'Dense':
+                    w = self._ler_pesos(pesos[nome])
+                    self.denses.append({
+                        'kernel': w['kernel'],
+                        'bias': w['bias'],
+                        'ativacao': _ATIVACOES[camada['config'].get('activation')]
+                    })
+                elif tipo == 'Embedding':
+                    self.embedding = self._ler_pesos(pesos[nome])['embeddings']
+
+        self.nbytes = sum(
+            arr.nbytes
+            for camada in self.lstms + self.denses
+            for arr in camada.values() if isinstance(arr, np.ndarray)
+        ) + (self.embedding.nbytes if self.embedding is not None else 0)
+
+    @staticmethod
+    def _ler_pesos(grupo) -> dict:
+        pesos = {}
+
+        def visitar(nome, obj):
+            if isinstance(obj, h5py.Dataset):
+                pesos[nome.split('/')[-1].split(':')[0]] = np.asarray(obj, dtype=np.float32)
+
+        grupo.visititems(visitar)
+        return pesos
+
+    @staticmethod
+    def _lstm(x: np.ndarray, camada: dict) -> np.ndarray:
+        batch, passos, _ = x.shape
+        units = camada['units']
+        U = camada['recurrent_kernel']
+
+        # Projeção da entrada de todos os passos de uma vez: (batch, passos, 4 * units)
+        entrada = x @ camada['kernel'] + camada['bias']
+
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        saidas = np.empty((batch, passos, units), dtype=np.float32) if camada['return_sequences'] else None
+
+        for t in range(passos):
+            z = entrada[:, t, :] + h @ U
+            # Sigmoide aplicada aos 4 blocos numa só chamada (o bloco c é descartado)
+            s = _sigmoid(z)
+            i, f, o = s[:, :units], s[:, units:2 * units], s[:, 3 * units:]
+            g = np.tanh(z[:, 2 * units:3 * units])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if saidas is not None:
+                saidas[:, t, :] = h
+
+        return saidas if saidas is not None else h
+
+    def prever(self, janelas: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """
+        Próximo valor de cada janela
+
+        Args:
+            janelas: Array (batch, sequence_length) normalizado
+            indices: Índice do símbolo de cada janela (modelos com embedding)
+
+        Returns:
+            Array (batch,)
+        """
+        x = np.asarray(janelas, dtype=np.float32)[:, :, np.newaxis]
+
+        if self.embedding is not None:
+            emb = self.embedding[np.asarray(indices, dtype=np.int64)]
+            x = np.concatenate([x, np.repeat(emb[:, np.newaxis, :], x.shape[1], axis=1)], axis=-1)
+
+        for camada in self.lstms:
+            x = self._lstm(x, camada)
+
+        for camada in self.denses:
+            x = camada['ativacao'](x @ camada['kernel'] + camada['bias'])
+
+        return x[:, 0]
@@ -2,47 +2,76 @@ import os
 import numpy as np
 import pandas as pd
 import tensorflow as tf
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import LSTM, Dense, Dropout
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+from tensorflow.keras.models import Sequential, Model, load_model
+from tensorflow.keras.layers import LSTM, Dense, Dropout, Input, Embedding, RepeatVector, Concatenate
+from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, LambdaCallback
 from sklearn.preprocessing import MinMaxScaler
-from datetime import datetime, timedelta
+from datetime import datetime
 import joblib
 import logging
-import json
+import time
+import weakref
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from app.models.stock_data_model import StockData
 from app.models.lstm_model_info import LSTMModel
+from app.models.lstm_model_symbol import LSTMModelSymbol
+from app.models.lstm_model_lineage import LSTMModelLineage
+from app.services.lstm_cache_service import lstm_model_cache
+from app.services.lstm_inferencia_service import LSTMInferenciaService, ModeloTFLite, SYMBOL_GLOBAL, caminho_tflite
 from app.utils.extensions import db
+from app.utils.database import configurar_banco
 
 logger = logging.getLogger(__name__)
 
 
-class LSTMService:
+# Rollouts compilados por modelo carregado (liberados junto com o modelo)
+_ROLLOUTS = weakref.WeakKeyDictionary()
+
+# Maior diferença absoluta (escala normalizada) aceita entre TFLite e Keras na exportação
+PARIDADE_MAX_TFLITE = 1e-4
+
+# App Flask mínimo de cada processo do treinamento em lote
+_APP_WORKER = None
+
+
+class LSTMService(LSTMInferenciaService):
     """
     Serviço para criação, treinamento e previsão usando modelos LSTM
     para predição de preços de ações
     """
     
+    MOTORES_PREVISAO = ('grafo', 'keras') + LSTMInferenciaService.MOTORES_PREVISAO
+    MOTOR_PADRAO = 'grafo'
+    
     def __init__(self):
         self.models_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'models')
         os.makedirs(self.models_dir, exist_ok=True)
         self.scaler = MinMaxScaler(feature_range=(0, 1))
     
-    def preparar_dados(self, symbol: str, sequence_length: int = 60) -> dict:
+    def preparar_dados(self, symbol: str, sequence_length: int = 60, streaming: bool = False,
+                       batch_size: int = 32) -> dict:
         """
         Prepara dados para treinamento do modelo LSTM
         
+        As janelas são views (sliding_window_view) sobre a série normalizada, sem
+        cópia; no modo streaming os datasets tf.data montam cada batch sob demanda
+        e o tensor (N, sequence_length, 1) nunca é materializado por inteiro.
+        
         Args:
             symbol: Símbolo da ação
             sequence_length: Número de dias anteriores para usar como features
+            streaming: Se True, retorna tf.data.Dataset em vez de arrays
+            batch_size: Tamanho do batch dos datasets (modo streaming)
         
         Returns:
             dict com dados preparados e informações
         """
         try:
             # Buscar dados do banco
-            dados = StockData.query.filter_by(symbol=symbol)\
+            dados = db.session.query(StockData.date, StockData.close)\
+                .filter(StockData.symbol == symbol)\
                 .order_by(StockData.date.asc())\
                 .all()
             
@@ -52,80 +81,108 @@ class LSTMService:
                 }
             
             # Converter para DataFrame
-            df = pd.DataFrame([
-                {
-                    'date': d.date,
-                    'close': d.close,
-                    'open': d.open,
-                    'high': d.high,
-                    'low': d.low,
-                    'volume': d.volume
-                }
-                for d in dados
-            ])
+            df = pd.DataFrame(dados, columns=['date', 'close'])
             
             df.set_index('date', inplace=True)
             
             # Usar apenas preço de fechamento para simplificar
             data = df[['close']].values
             
-            # Normalizar dados
+            # Normalizar dados (um scaler por chamada: cada símbolo tem sua escala)
+            self.scaler = MinMaxScaler(feature_range=(0, 1))
             scaled_data = self.scaler.fit_transform(data)
+            serie = scaled_data[:, 0]
             
-            # Criar sequências
-            X, y = [], []
-            for i in range(sequence_length, len(scaled_data)):
-                X.append(scaled_data[i-sequence_length:i, 0])
-                y.append(scaled_data[i, 0])
-            
-            X, y = np.array(X), np.array(y)
-            
-            # Reshape para LSTM [samples, time steps, features]
-            X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+            # Criar sequências: cada linha de janelas é [x_0 .. x_{L-1}, y]
+            janelas = np.lib.stride_tricks.sliding_window_view(serie, sequence_length + 1)
+            total = len(janelas)
             
             # Dividir em treino e teste (80/20)
-            split = int(0.8 * len(X))
+            split = int(0.8 * total)
             
-            X_train, X_test = X[:split], X[split:]
+            y = janelas[:, sequence_length]
             y_train, y_test = y[:split], y[split:]
             
+            if streaming:
+                resultado = {
+                    'train_dataset': self._criar_dataset(serie, sequence_length, 0, split, batch_size, embaralhar=True),
+                    'test_dataset': self._criar_dataset(serie, sequence_length, split, total, batch_size),
+                    'y_train': y_train,
+                    'y_test': y_test
+                }
+            else:
+                # Reshape para LSTM [samples, time steps, features] (ainda uma view)
+                X = janelas[:, :sequence_length, np.newaxis]
+                resultado = {
+                    'X_train': X[:split],
+                    'X_test': X[split:],
+                    'y_train': y_train,
+                    'y_test': y_test
+                }
+            
             # Datas para referência
             train_dates = df.index[:split + sequence_length]
             test_dates = df.index[split + sequence_length:]
             
-            return {
-                'X_train': X_train,
-                'X_test': X_test,
-                'y_train': y_train,
-                'y_test': y_test,
-                'scaler': self.scaler,
-                'info': {
-                    'total_samples': len(X),
-                    'train_samples': len(X_train),
-                    'test_samples': len(X_test),
-                    'sequence_length': sequence_length,
-                    'train_start': train_dates[0].strftime('%Y-%m-%d'),
-                    'train_end': train_dates[-1].strftime('%Y-%m-%d'),
-                    'test_start': test_dates[0].strftime('%Y-%m-%d') if len(test_dates) > 0 else None,
-                    'test_end': test_dates[-1].strftime('%Y-%m-%d') if len(test_dates) > 0 else None
-                }
+            resultado['scaler'] = self.scaler
+            resultado['info'] = {
+                'total_samples': total,
+                'train_samples': split,
+                'test_samples': total - split,
+                'sequence_length': sequence_length,
+                'train_start': train_dates[0].strftime('%Y-%m-%d'),
+                'train_end': train_dates[-1].strftime('%Y-%m-%d'),
+                'test_start': test_dates[0].strftime('%Y-%m-%d') if len(test_dates) > 0 else None,
+                'test_end': test_dates[-1].strftime('%Y-%m-%d') if len(test_dates) > 0 else None
             }
             
+            return resultado
+            
         except Exception as e:
             logger.error(f"Erro ao preparar dados: {e}")
             return {'erro': f'Erro ao preparar dados: {str(e)}'}
     
-    def criar_modelo_lstm(self, sequence_length: int = 60, units: int = 50) -> Sequential:
+    @staticmethod
+    def _criar_dataset(serie: np.ndarray, sequence_length: int, inicio: int, fim: int,
+                       batch_size: int, embaralhar: bool = False):
+        """
+        Dataset tf.data que gera as janelas [inicio, fim) a partir da série 1D
+        
+        Só os índices das janelas são embaralhados; cada batch é montado com
+        gather sobre a série, sem manter todas as janelas em memória.
+        """
+        serie_tf = tf.constant(serie, dtype=tf.float32)
+        offsets = tf.range(sequence_length, dtype=tf.int64)
+        
+        indices = tf.data.Dataset.range(inicio, fim)
+        if embaralhar:
+            indices = indices.shuffle(fim - inicio, reshuffle_each_iteration=True)
+        
+        def montar_batch(idx):
+            X = tf.gather(serie_tf, idx[:, tf.newaxis] + offsets)[:, :, tf.newaxis]
+            y = tf.gather(serie_tf, idx + sequence_length)
+            return X, y
+        
+        return indices.batch(batch_size).map(montar_batch, num_parallel_calls=tf.data.AUTOTUNE)\
+            .prefetch(tf.data.AUTOTUNE)
+    
+    def criar_modelo_lstm(self, sequence_length: int = 60, units: int = 50, total_symbols: int = 0,
+                          embedding_dim: int = 0):
         """
         Cria arquitetura do modelo LSTM
         
         Args:
             sequence_length: Tamanho da sequência de entrada
             units: Número de unidades LSTM
+            total_symbols: Símbolos cobertos (modelo global com embedding)
+            embedding_dim: Dimensão do embedding de símbolo (0 = sem embedding)
         
         Returns:
             Modelo LSTM compilado
         """
+        if embedding_dim and total_symbols:
+            return self._criar_modelo_lstm_embedding(sequence_length, units, total_symbols, embedding_dim)
+        
         model = Sequential([
             # Primeira camada LSTM
             LSTM(units=units, return_sequences=True, input_shape=(sequence_length, 1)),
@@ -155,8 +212,40 @@ class LSTMService:
         
         return model
     
+    def _criar_modelo_lstm_embedding(self, sequence_length: int, units: int, total_symbols: int,
+                                     embedding_dim: int) -> Model:
+        """
+        Mesma pilha LSTM, com o embedding do símbolo concatenado a cada passo da janela
+        
+        Entradas: [janela (batch, sequence_length, 1), indice do símbolo (batch,)]
+        """
+        janela = Input(shape=(sequence_length, 1), name='janela')
+        indice = Input(shape=(), dtype='int32', name='indice_symbol')
+        
+        embedding = Embedding(total_symbols, embedding_dim)(indice)
+        x = Concatenate(axis=-1)([janela, RepeatVector(sequence_length)(embedding)])
+        
+        x = LSTM(units=units, return_sequences=True)(x)
+        x = Dropout(0.2)(x)
+        x = LSTM(units=units, return_sequences=True)(x)
+        x = Dropout(0.2)(x)
+        x = LSTM(units=units, return_sequences=False)(x)
+        x = Dropout(0.2)(x)
+        x = Dense(units=25)(x)
+        saida = Dense(units=1)(x)
+        
+        model = Model(inputs=[janela, indice], outputs=saida)
+        model.compile(
+            optimizer='adam',
+            loss='mean_squared_error',
+            metrics=['mae']
+        )
+        
+        return model
+    
     def treinar_modelo(self, symbol: str, epochs: int = 50, batch_size: int = 32, 
-                      sequence_length: int = 60, units: int = 50) -> dict:
+                      sequence_length: int = 60, units: int = 50, streaming: bool = False,
+                      progresso=None) -> dict:
         """
         Treina modelo LSTM para predição de preços
         
@@ -166,280 +255,859 @@ class LSTMService:
             batch_size: Tamanho do batch
             sequence_length: Tamanho da sequência
             units: Número de unidades LSTM
+            streaming: Se True, treina a partir de datasets tf.data (janelas sob demanda)
+            progresso: Callable progresso(atual, total, descricao) chamado a cada época (opcional)
         
         Returns:
             dict com informações do treinamento
         """
         try:
-            logger.info(f"Iniciando treinamento LSTM para {symbol}")
+            treino = self._treinar_e_salvar(symbol, epochs, batch_size, sequence_length, units,
+                                            streaming=streaming, progresso=progresso)
+            if 'erro' in treino:
+                return treino
             
-            # Preparar dados
-            data_prep = self.preparar_dados(symbol, sequence_length)
-            if 'erro' in data_prep:
-                return data_prep
+            # Salvar informações no banco
+            db.session.add(LSTMModel(**treino['registro']))
+            db.session.commit()
             
-            X_train = data_prep['X_train']
+            # Novo modelo ativo: descarta os anteriores do símbolo e já deixa este aquecido
+            model_name = treino['resposta']['model_name']
+            lstm_model_cache.invalidar_symbol(symbol)
+            lstm_model_cache.registrar(model_name, treino['model'], treino['scaler'], symbol=symbol)
+            
+            return treino['resposta']
+            
+        except Exception as e:
+            logger.error(f"Erro ao treinar modelo: {e}")
+            db.session.rollback()
+            return {'erro': f'Erro ao treinar modelo: {str(e)}'}
+    
+    def _treinar_e_salvar(self, symbol: str, epochs: int, batch_size: int, sequence_length: int,
+                          units: int, streaming: bool = False, progresso=None, verbose: int = 1) -> dict:
+        """
+        Treina e grava modelo/scaler em disco, sem registrar no banco
+        
+        Returns:
+            dict com 'resposta' (retorno da API), 'registro' (campos do LSTMModel),
+            'model' e 'scaler'; ou {'erro': ...}
+        """
+        logger.info(f"Iniciando treinamento LSTM para {symbol}")
+        
+        # Preparar dados
+        data_prep = self.preparar_dados(symbol, sequence_length, streaming=streaming, batch_size=batch_size)
+        if 'erro' in data_prep:
+            return data_prep
+        
+        y_test = data_prep['y_test']
+        scaler = data_prep['scaler']
+        info = data_prep['info']
+        
+        if streaming:
+            dados_treino = {'x': data_prep['train_dataset']}
+            dados_validacao = data_prep['test_dataset']
+            X_test = data_prep['test_dataset']
+        else:
+            dados_treino = {'x': data_prep['X_train'], 'y': data_prep['y_train'], 'batch_size': batch_size}
+            dados_validacao = (data_prep['X_test'], y_test)
             X_test = data_prep['X_test']
-            y_train = data_prep['y_train']
-            y_test = data_prep['y_test']
-            scaler = data_prep['scaler']
-            info = data_prep['info']
-            
-            # Criar modelo
-            model = self.criar_modelo_lstm(sequence_length, units)
-            
-            # Callbacks
-            early_stop = EarlyStopping(
-                monitor='val_loss',
-                patience=10,
-                restore_best_weights=True
-            )
+        
+        # Criar modelo
+        model = self.criar_modelo_lstm(sequence_length, units)
+        
+        # Callbacks
+        early_stop = EarlyStopping(
+            monitor='val_loss',
+            patience=10,
+            restore_best_weights=True
+        )
+        callbacks = [early_stop]
+        
+        if progresso is not None:
+            callbacks.append(LambdaCallback(
+                on_epoch_end=lambda epoch, logs: progresso(
+                    epoch + 1, epochs, f"Época {epoch + 1}/{epochs} - val_loss {(logs or {}).get('val_loss', 0):.6f}"
+                )
+            ))
+        
+        # Treinar modelo
+        logger.info(f"Treinando modelo com {epochs} épocas...")
+        history = model.fit(
+            **dados_treino,
+            epochs=epochs,
+            validation_data=dados_validacao,
+            callbacks=callbacks,
+            verbose=verbose
+        )
+        
+        # Fazer previsões
+        test_predict = model.predict(X_test, verbose=verbose)
+        
+        # Desnormalizar previsões
+        test_predict = scaler.inverse_transform(test_predict)
+        y_test_actual = scaler.inverse_transform(y_test.reshape(-1, 1))
+        
+        # Calcular métricas
+        metrics = self.calcular_metricas(y_test_actual, test_predict)
+        
+        # Salvar modelo
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        model_name = f'lstm_{symbol}_{timestamp}'
+        model_path = os.path.join(self.models_dir, f'{model_name}.h5')
+        scaler_path = os.path.join(self.models_dir, f'{model_name}_scaler.pkl')
+        
+        model.save(model_path)
+        joblib.dump(scaler, scaler_path)
+        
+        amostra = X_test if not streaming else next(iter(X_test))[0].numpy()
+        exportacao = self.exportar_tflite(model, model_path, amostra)
+        
+        registro = {
+            'symbol': symbol,
+            'model_name': model_name,
+            'model_path': model_path,
+            'sequence_length': sequence_length,
+            'epochs': len(history.history['loss']),
+            'batch_size': batch_size,
+            'mae': metrics['mae'],
+            'rmse': metrics['rmse'],
+            'mape': metrics['mape'],
+            'train_start_date': datetime.strptime(info['train_start'], '%Y-%m-%d').date(),
+            'train_end_date': datetime.strptime(info['train_end'], '%Y-%m-%d').date(),
+            'test_start_date': datetime.strptime(info['test_start'], '%Y-%m-%d').date() if info['test_start'] else None,
+            'test_end_date': datetime.strptime(info['test_end'], '%Y-%m-%d').date() if info['test_end'] else None
+        }
+        
+        resposta = {
+            'mensagem': 'Modelo treinado com sucesso',
+            'symbol': symbol,
+            'model_name': model_name,
+            'model_path': model_path,
+            'parametros': {
+                'sequence_length': sequence_length,
+                'epochs_executadas': len(history.history['loss']),
+                'epochs_solicitadas': epochs,
+                'batch_size': batch_size,
+                'units': units,
+                'streaming': streaming
+            },
+            'metricas': metrics,
+            'dados': info,
+            'exportacao': exportacao,
+            'historico_treinamento': {
+                'loss': [float(x) for x in history.history['loss'][-10:]],
+                'val_loss': [float(x) for x in history.history['val_loss'][-10:]],
+                'mae': [float(x) for x in history.history['mae'][-10:]],
+                'val_mae': [float(x) for x in history.history['val_mae'][-10:]]
+            }
+        }
+        
+        return {
+            'resposta': resposta,
+            'registro': registro,
+            'model': model,
+            'scaler': scaler
+        }
+    
+    def treinar_lote(self, symbols: list, epochs: int = 50, batch_size: int = 32,
+                     sequence_length: int = 60, units: int = 50, streaming: bool = False,
+                     processos: int = None, threads_por_processo: int = None, progresso=None) -> dict:
+        """
+        Treina um modelo por símbolo em paralelo, em um pool de processos
+        
+        Cada processo limita as threads do TensorFlow (intra_op = threads_por_processo,
+        inter_op = 1), de modo que N núcleos treinam N modelos pequenos ao mesmo tempo.
+        Os workers só gravam os arquivos; o registro em LSTMModel é feito aqui, em uma
+        única transação (se falhar, nenhum modelo do lote é registrado).
+        
+        Args:
+            symbols: Lista de símbolos
+            epochs, batch_size, sequence_length, units, streaming: Como em treinar_modelo
+            processos: Tamanho do pool (padrão: min(núcleos, símbolos))
+            threads_por_processo: Threads intra_op por processo (padrão: núcleos // processos)
+            progresso: Callable progresso(atual, total, descricao) chamado a cada símbolo (opcional)
+        
+        Returns:
+            dict com resultado por símbolo e relatório de tempos
+        """
+        try:
+            symbols = list(dict.fromkeys(symbols))
+            if not symbols:
+                return {'erro': 'Nenhum símbolo informado'}
+            
+            nucleos = os.cpu_count() or 1
+            processos = max(1, min(processos or nucleos, len(symbols)))
+            threads_por_processo = max(1, threads_por_processo or nucleos // processos)
+            
+            parametros = {
+                'epochs': epochs,
+                'batch_size': batch_size,
+                'sequence_length': sequence_length,
+                'units': units,
+                'streaming': streaming
+            }
+            database_uri = db.engine.url.render_as_string(hide_password=False)
+            
+            logger.info(f"Treinamento em lote: {len(symbols)} símbolos, {processos} processos x {threads_por_processo} threads")
+            inicio = time.perf_counter()
+            
+            concluidos = []
+            erros = []
+            
+            # spawn: o runtime do TensorFlow não é seguro após fork
+            with ProcessPoolExecutor(
+                max_workers=processos,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_worker_treino,
+                initargs=(database_uri, threads_por_processo, 1)
+            ) as executor:
+                futuros = {executor.submit(_treinar_no_worker, symbol, parametros): symbol for symbol in symbols}
+                
+                for futuro in as_completed(futuros):
+                    symbol = futuros[futuro]
+                    try:
+                        resultado = futuro.result()
+                    except Exception as e:
+                        resultado = {'symbol': symbol, 'erro': f'Erro ao treinar modelo: {str(e)}', 'tempo_segundos': None}
+                    
+                    if 'erro' in resultado:
+                        erros.append(resultado)
+                    else:
+                        concluidos.append(resultado)
+                    
+                    if progresso is not None:
+                        progresso(len(concluidos) + len(erros), len(symbols), symbol)
+            
+            tempo_total = time.perf_counter() - inicio
+            
+            # Registro atômico do lote
+            try:
+                db.session.add_all([LSTMModel(**r['registro']) for r in concluidos])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                for r in concluidos:
+                    caminho = r['registro']['model_path']
+                    for arquivo in (caminho, caminho.replace('.h5', '_scaler.pkl'), caminho_tflite(caminho)):
+                        if os.path.exists(arquivo):
+                            os.remove(arquivo)
+                raise
+            
+            for r in concluidos:
+                lstm_model_cache.invalidar_symbol(r['symbol'])
+            
+            soma_tarefas = sum(r['tempo_segundos'] or 0 for r in concluidos + erros)
+            speedup = soma_tarefas / tempo_total if tempo_total > 0 else 0
+            
+            return {
+                'mensagem': f'Treinamento em lote concluído: {len(concluidos)} de {len(symbols)} modelos',
+                'total_symbols': len(symbols),
+                'modelos': sorted([r['resposta'] for r in concluidos], key=lambda r: r['symbol']),
+                'erros': [{'symbol': r['symbol'], 'erro': r['erro']} for r in erros],
+                'tempos': {
+                    'wall_clock_segundos': round(tempo_total, 2),
+                    'soma_tarefas_segundos': round(soma_tarefas, 2),
+                    'speedup': round(speedup, 2),
+                    'eficiencia': round(speedup / processos, 2),
+                    'processos': processos,
+                    'threads_por_processo': threads_por_processo,
+                    'por_symbol': {r['symbol']: r['tempo_segundos'] for r in concluidos + erros}
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Erro no treinamento em lote: {e}")
+            db.session.rollback()
+            return {'erro': f'Erro no treinamento em lote: {str(e)}'}
+    
+    def treinar_modelo_global(self, symbols: list = None, epochs: int = 50, batch_size: int = 32,
+                              sequence_length: int = 60, units: int = 50, embedding_dim: int = 0,
+                              progresso=None) -> dict:
+        """
+        Treina um único modelo LSTM com as janelas de vários símbolos empilhadas
+        
+        Cada símbolo é normalizado com seu próprio scaler (preparar_dados) e
+        mantém a divisão cronológica 80/20. O modelo é registrado em LSTMModel
+        com symbol='GLOBAL' e os símbolos cobertos em lstm_model_symbols, e passa
+        a ser usado por prever_proximos_dias para símbolos sem modelo próprio.
+        
+        Args:
+            symbols: Lista de símbolos (None = todos os símbolos com dados coletados)
+            epochs: Número de épocas de treinamento
+            batch_size: Tamanho do batch
+            sequence_length: Tamanho da sequência
+            units: Número de unidades LSTM
+            embedding_dim: Dimensão do embedding de símbolo (0 = sem embedding)
+            progresso: Callable progresso(atual, total, descricao) chamado a cada época (opcional)
+        
+        Returns:
+            dict com informações do treinamento e métricas por símbolo
+        """
+        try:
+            if not symbols:
+                symbols = [s for (s,) in db.session.query(StockData.symbol).distinct().all()]
+            symbols = sorted(set(symbols))
+            
+            # Janelas de cada símbolo, cada um com seu scaler
+            preparados = {}
+            ignorados = {}
+            for symbol in symbols:
+                data_prep = self.preparar_dados(symbol, sequence_length)
+                if 'erro' in data_prep:
+                    ignorados[symbol] = data_prep['erro']
+                else:
+                    preparados[symbol] = data_prep
             
-            # Treinar modelo
-            logger.info(f"Treinando modelo com {epochs} épocas...")
+            if not preparados:
+                return {'erro': 'Nenhum símbolo com dados suficientes', 'symbols_ignorados': ignorados}
+            
+            cobertos = list(preparados.keys())
+            indices = {symbol: i for i, symbol in enumerate(cobertos)}
+            
+            X_train = np.concatenate([preparados[s]['X_train'] for s in cobertos])
+            y_train = np.concatenate([preparados[s]['y_train'] for s in cobertos])
+            X_test = np.concatenate([preparados[s]['X_test'] for s in cobertos])
+            y_test = np.concatenate([preparados[s]['y_test'] for s in cobertos])
+            idx_train = np.concatenate([np.full(len(preparados[s]['y_train']), indices[s], dtype=np.int32) for s in cobertos])
+            idx_test = np.concatenate([np.full(len(preparados[s]['y_test']), indices[s], dtype=np.int32) for s in cobertos])
+            
+            if embedding_dim:
+                entrada_treino, entrada_teste = [X_train, idx_train], [X_test, idx_test]
+            else:
+                entrada_treino, entrada_teste = X_train, X_test
+            
+            model = self.criar_modelo_lstm(sequence_length, units, total_symbols=len(cobertos),
+                                           embedding_dim=embedding_dim)
+            
+            callbacks = [EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)]
+            if progresso is not None:
+                callbacks.append(LambdaCallback(
+                    on_epoch_end=lambda epoch, logs: progresso(
+                        epoch + 1, epochs, f"Época {epoch + 1}/{epochs} - val_loss {(logs or {}).get('val_loss', 0):.6f}"
+                    )
+                ))
+            
+            logger.info(f"Treinando modelo global com {len(cobertos)} símbolos e {len(y_train)} janelas...")
             history = model.fit(
-                X_train, y_train,
-                epochs=epochs,
+                entrada_treino, y_train,
                 batch_size=batch_size,
-                validation_data=(X_test, y_test),
-                callbacks=[early_stop],
+                epochs=epochs,
+                validation_data=(entrada_teste, y_test),
+                callbacks=callbacks,
                 verbose=1
             )
             
-            # Fazer previsões
-            test_predict = model.predict(X_test)
-            
-            # Desnormalizar previsões
-            test_predict = scaler.inverse_transform(test_predict)
-            y_test_actual = scaler.inverse_transform(y_test.reshape(-1, 1))
+            # Métricas por símbolo, na escala de preço de cada um
+            test_predict = model.predict(entrada_teste, verbose=0)[:, 0]
+            metricas_por_symbol = {}
+            inicio = 0
+            for symbol in cobertos:
+                fim = inicio + len(preparados[symbol]['y_test'])
+                scaler = preparados[symbol]['scaler']
+                metricas_por_symbol[symbol] = self.calcular_metricas(
+                    scaler.inverse_transform(y_test[inicio:fim].reshape(-1, 1)),
+                    scaler.inverse_transform(test_predict[inicio:fim].reshape(-1, 1))
+                )
+                inicio = fim
             
-            # Calcular métricas
-            metrics = self.calcular_metricas(y_test_actual, test_predict)
+            metricas = {
+                chave: float(np.mean([m[chave] for m in metricas_por_symbol.values()]))
+                for chave in ('mae', 'rmse', 'mape')
+            }
             
-            # Salvar modelo
+            # Salvar modelo e os scalers de todos os símbolos
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            model_name = f'lstm_{symbol}_{timestamp}'
+            model_name = f'lstm_global_{timestamp}'
             model_path = os.path.join(self.models_dir, f'{model_name}.h5')
             scaler_path = os.path.join(self.models_dir, f'{model_name}_scaler.pkl')
             
+            scalers = {symbol: preparados[symbol]['scaler'] for symbol in cobertos}
             model.save(model_path)
-            joblib.dump(scaler, scaler_path)
+            joblib.dump(scalers, scaler_path)
+            exportacao = self.exportar_tflite(model, model_path, X_test, idx_test)
+            
+            infos = [preparados[s]['info'] for s in cobertos]
+            datas_teste = [i['test_start'] for i in infos if i['test_start']]
             
-            # Salvar informações no banco
             lstm_model_info = LSTMModel(
-                symbol=symbol,
+                symbol=SYMBOL_GLOBAL,
                 model_name=model_name,
                 model_path=model_path,
                 sequence_length=sequence_length,
                 epochs=len(history.history['loss']),
                 batch_size=batch_size,
-                mae=metrics['mae'],
-                rmse=metrics['rmse'],
-                mape=metrics['mape'],
-                train_start_date=datetime.strptime(info['train_start'], '%Y-%m-%d').date(),
-                train_end_date=datetime.strptime(info['train_end'], '%Y-%m-%d').date(),
-                test_start_date=datetime.strptime(info['test_start'], '%Y-%m-%d').date() if info['test_start'] else None,
-                test_end_date=datetime.strptime(info['test_end'], '%Y-%m-%d').date() if info['test_end'] else None
+                mae=metricas['mae'],
+                rmse=metricas['rmse'],
+                mape=metricas['mape'],
+                train_start_date=datetime.strptime(min(i['train_start'] for i in infos), '%Y-%m-%d').date(),
+                train_end_date=datetime.strptime(max(i['train_end'] for i in infos), '%Y-%m-%d').date(),
+                test_start_date=datetime.strptime(min(datas_teste), '%Y-%m-%d').date() if datas_teste else None,
+                test_end_date=datetime.strptime(max(i['test_end'] for i in infos if i['test_end']), '%Y-%m-%d').date()
+                if datas_teste else None
             )
-            
             db.session.add(lstm_model_info)
+            db.session.flush()
+            
+            db.session.add_all([
+                LSTMModelSymbol(
+                    model_id=lstm_model_info.id,
+                    symbol=symbol,
+                    indice=indices[symbol],
+                    **metricas_por_symbol[symbol]
+                )
+                for symbol in cobertos
+            ])
             db.session.commit()
             
+            lstm_model_cache.invalidar_symbol(SYMBOL_GLOBAL)
+            lstm_model_cache.registrar(model_name, model, scalers, symbol=SYMBOL_GLOBAL)
+            
             return {
-                'mensagem': 'Modelo treinado com sucesso',
-                'symbol': symbol,
+                'mensagem': 'Modelo global treinado com sucesso',
                 'model_name': model_name,
                 'model_path': model_path,
+                'symbols': cobertos,
+                'symbols_ignorados': ignorados,
                 'parametros': {
                     'sequence_length': sequence_length,
                     'epochs_executadas': len(history.history['loss']),
                     'epochs_solicitadas': epochs,
                     'batch_size': batch_size,
-                    'units': units
+                    'units': units,
+                    'embedding_dim': embedding_dim
                 },
-                'metricas': metrics,
-                'dados': info,
-                'historico_treinamento': {
-                    'loss': [float(x) for x in history.history['loss'][-10:]],
-                    'val_loss': [float(x) for x in history.history['val_loss'][-10:]],
-                    'mae': [float(x) for x in history.history['mae'][-10:]],
-                    'val_mae': [float(x) for x in history.history['val_mae'][-10:]]
+                'metricas': metricas,
+                'metricas_por_symbol': metricas_por_symbol,
+                'exportacao': exportacao,
+                'dados': {
+                    'train_samples': int(len(y_train)),
+                    'test_samples': int(len(y_test))
                 }
             }
             
         except Exception as e:
-            logger.error(f"Erro ao treinar modelo: {e}")
+            logger.error(f"Erro ao treinar modelo global: {e}")
             db.session.rollback()
-            return {'erro': f'Erro ao treinar modelo: {str(e)}'}
+            return {'erro': f'Erro ao treinar modelo global: {str(e)}'}
     
-    def calcular_metricas(self, y_true, y_pred) -> dict:
+    def ajustar_modelo(self, symbol: str, epochs: int = 5, janelas: int = 250, learning_rate: float = 1e-4,
+                       batch_size: int = 32, model_name: str = None, progresso=None) -> dict:
         """
-        Calcula métricas de avaliação do modelo
+        Ajuste fino (warm start) do modelo ativo de um símbolo com as janelas mais recentes
         
-        Args:
-            y_true: Valores reais
-            y_pred: Valores previstos
-        
-        Returns:
-            dict com métricas MAE, RMSE e MAPE
-        """
-        # MAE - Mean Absolute Error
-        mae = np.mean(np.abs(y_true - y_pred))
-        
-        # RMSE - Root Mean Square Error
-        rmse = np.sqrt(np.mean((y_true - y_pred) ** 2))
-        
-        # MAPE - Mean Absolute Percentage Error
-        mape = np.mean(np.abs((y_true - y_pred) / y_true)) * 100
-        
-        return {
-            'mae': float(mae),
-            'rmse': float(rmse),
-            'mape': float(mape)
-        }
-    
-    def prever_proximos_dias(self, symbol: str, dias: int = 5, model_name: str = None) -> dict:
-        """
-        Faz previsão dos próximos N dias
+        Parte dos pesos do modelo pai e usa o mesmo scaler (sem reajustá-lo, para a
+        escala continuar compatível com os pesos). Treina poucas épocas, com taxa de
+        aprendizado menor, sobre as `janelas` mais recentes, e reserva as últimas
+        20% para validação. O resultado é registrado como um novo LSTMModel, ligado
+        ao pai em lstm_model_lineage. O pai é avaliado na mesma validação, para
+        comparar as métricas.
         
         Args:
             symbol: Símbolo da ação
-            dias: Número de dias para prever
-            model_name: Nome do modelo (opcional, usa o mais recente se não especificado)
+            epochs: Épocas do ajuste
+            janelas: Janelas mais recentes usadas (treino + validação)
+            learning_rate: Taxa de aprendizado do Adam no ajuste
+            batch_size: Tamanho do batch
+            model_name: Modelo pai (padrão: ativo mais recente do símbolo)
+            progresso: Callable progresso(atual, total, descricao) chamado a cada época (opcional)
         
         Returns:
-            dict com previsões
+            dict com o novo modelo, as métricas do pai e do ajuste e o tempo gasto
         """
         try:
-            # Buscar modelo
-            if model_name:
-                model_info = LSTMModel.query.filter_by(model_name=model_name).first()
-            else:
-                model_info = LSTMModel.query.filter_by(symbol=symbol, is_active=True)\
-                    .order_by(LSTMModel.created_at.desc()).first()
+            inicio = time.perf_counter()
             
-            if not model_info:
-                return {'erro': f'Nenhum modelo encontrado para {symbol}'}
+            pai, _ = self._buscar_modelo(symbol, model_name)
+            if pai is None:
+                return {'erro': f'Nenhum modelo encontrado para {symbol}. Treine um modelo primeiro.'}
+            if pai.symbol != symbol:
+                return {'erro': f'O modelo {pai.model_name} não é do símbolo {symbol} (modelos globais não são ajustados)'}
             
-            # Carregar modelo e scaler
-            model = load_model(model_info.model_path)
-            scaler_path = model_info.model_path.replace('.h5', '_scaler.pkl')
-            scaler = joblib.load(scaler_path)
+            sequence_length = pai.sequence_length
             
-            # Buscar dados históricos
-            sequence_length = model_info.sequence_length
-            dados = StockData.query.filter_by(symbol=symbol)\
+            # Cópia própria do modelo: a do cache continua atendendo as previsões
+            model = load_model(pai.model_path)
+            scaler = joblib.load(pai.model_path.replace('.h5', '_scaler.pkl'))
+            
+            dados = db.session.query(StockData.date, StockData.close)\
+                .filter(StockData.symbol == symbol)\
                 .order_by(StockData.date.desc())\
-                .limit(sequence_length)\
-                .all()
+                .limit(janelas + sequence_length)\
+                .all()[::-1]
             
-            if len(dados) < sequence_length:
-                return {'erro': f'Dados históricos insuficientes para {symbol}'}
+            total = len(dados) - sequence_length
+            if total < 20:
+                return {'erro': f'Dados insuficientes para ajustar {symbol}. Mínimo necessário: {sequence_length + 20} registros'}
             
-            # Preparar dados
-            dados = list(reversed(dados))
-            prices = np.array([d.close for d in dados]).reshape(-1, 1)
-            scaled_prices = scaler.transform(prices)
+            precos = np.array([d.close for d in dados]).reshape(-1, 1)
+            serie = scaler.transform(precos)[:, 0]
+            janelas_serie = np.lib.stride_tricks.sliding_window_view(serie, sequence_length + 1)
             
-            # Fazer previsões
-            previsoes = []
-            current_sequence = scaled_prices.copy()
+            split = int(0.8 * total)
+            X = janelas_serie[:, :sequence_length, np.newaxis]
+            y = janelas_serie[:, sequence_length]
+            X_train, X_val = X[:split], X[split:]
+            y_train, y_val = y[:split], y[split:]
+            y_val_real = scaler.inverse_transform(y_val.reshape(-1, 1))
             
-            for i in range(dias):
-                # Preparar input
-                x_input = current_sequence[-sequence_length:].reshape(1, sequence_length, 1)
-                
-                # Prever próximo valor
-                next_pred = model.predict(x_input, verbose=0)
-                
-                # Adicionar à sequência
-                current_sequence = np.vstack([current_sequence, next_pred])
-                
-                # Desnormalizar
-                next_price = scaler.inverse_transform(next_pred)[0][0]
-                previsoes.append(float(next_price))
-            
-            # Gerar datas futuras
-            ultima_data = dados[-1].date
-            datas_futuras = []
-            for i in range(1, dias + 1):
-                proxima_data = ultima_data + timedelta(days=i)
-                # Pular fins de semana
-                while proxima_data.weekday() >= 5:
-                    proxima_data += timedelta(days=1)
-                datas_futuras.append(proxima_data.strftime('%Y-%m-%d'))
-            
-            # Último preço real
-            ultimo_preco = float(dados[-1].close)
+            metricas_pai = self.calcular_metricas(
+                y_val_real, scaler.inverse_transform(model.predict(X_val, verbose=0))
+            )
+            
+            # Recompilar zera o estado do otimizador; a taxa menor preserva o que o pai aprendeu
+            model.compile(
+                optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+                loss='mean_squared_error',
+                metrics=['mae']
+            )
+            
+            callbacks = [EarlyStopping(monitor='val_loss', patience=2, restore_best_weights=True)]
+            if progresso is not None:
+                callbacks.append(LambdaCallback(
+                    on_epoch_end=lambda epoch, logs: progresso(
+                        epoch + 1, epochs, f"Época {epoch + 1}/{epochs} - val_loss {(logs or {}).get('val_loss', 0):.6f}"
+                    )
+                ))
+            
+            logger.info(f"Ajuste fino de {pai.model_name}: {total} janelas, {epochs} épocas")
+            history = model.fit(
+                X_train, y_train,
+                batch_size=batch_size,
+                epochs=epochs,
+                validation_data=(X_val, y_val),
+                callbacks=callbacks,
+                verbose=0
+            )
+            
+            metricas = self.calcular_metricas(
+                y_val_real, scaler.inverse_transform(model.predict(X_val, verbose=0))
+            )
+            
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            novo_nome = f'lstm_{symbol}_{timestamp}'
+            model_path = os.path.join(self.models_dir, f'{novo_nome}.h5')
+            
+            model.save(model_path)
+            joblib.dump(scaler, model_path.replace('.h5', '_scaler.pkl'))
+            exportacao = self.exportar_tflite(model, model_path, X_val)
+            
+            epochs_executadas = len(history.history['loss'])
+            novo = LSTMModel(
+                symbol=symbol,
+                model_name=novo_nome,
+                model_path=model_path,
+                sequence_length=sequence_length,
+                epochs=epochs_executadas,
+                batch_size=batch_size,
+                mae=metricas['mae'],
+                rmse=metricas['rmse'],
+                mape=metricas['mape'],
+                train_start_date=dados[0].date,
+                train_end_date=dados[split + sequence_length - 1].date,
+                test_start_date=dados[split + sequence_length].date,
+                test_end_date=dados[-1].date
+            )
+            db.session.add(novo)
+            db.session.flush()
+            
+            db.session.add(LSTMModelLineage(
+                model_id=novo.id,
+                parent_id=pai.id,
+                janelas=total,
+                learning_rate=learning_rate,
+                parent_mae=metricas_pai['mae'],
+                parent_rmse=metricas_pai['rmse'],
+                parent_mape=metricas_pai['mape']
+            ))
+            db.session.commit()
+            
+            lstm_model_cache.invalidar_symbol(symbol)
+            lstm_model_cache.registrar(novo_nome, model, scaler, symbol=symbol)
             
             return {
+                'mensagem': 'Modelo ajustado com sucesso',
                 'symbol': symbol,
-                'model_name': model_info.model_name,
-                'ultimo_preco_real': ultimo_preco,
-                'ultima_data': ultima_data.strftime('%Y-%m-%d'),
-                'previsoes': [
-                    {
-                        'data': datas_futuras[i],
-                        'preco_previsto': round(previsoes[i], 2),
-                        'variacao_percentual': round(((previsoes[i] - ultimo_preco) / ultimo_preco) * 100, 2)
-                    }
-                    for i in range(dias)
-                ],
-                'metricas_modelo': {
-                    'mae': model_info.mae,
-                    'rmse': model_info.rmse,
-                    'mape': model_info.mape
-                }
+                'model_name': novo_nome,
+                'model_path': model_path,
+                'modelo_pai': pai.model_name,
+                'parametros': {
+                    'sequence_length': sequence_length,
+                    'janelas': total,
+                    'epochs_executadas': epochs_executadas,
+                    'epochs_solicitadas': epochs,
+                    'batch_size': batch_size,
+                    'learning_rate': learning_rate
+                },
+                'metricas': metricas,
+                'metricas_pai': metricas_pai,
+                'dados': {
+                    'train_start': dados[0].date.strftime('%Y-%m-%d'),
+                    'train_end': dados[split + sequence_length - 1].date.strftime('%Y-%m-%d'),
+                    'test_start': dados[split + sequence_length].date.strftime('%Y-%m-%d'),
+                    'test_end': dados[-1].date.strftime('%Y-%m-%d')
+                },
+                'exportacao': exportacao,
+                'tempo_segundos': round(time.perf_counter() - inicio, 2)
             }
             
         except Exception as e:
-            logger.error(f"Erro ao fazer previsão: {e}")
-            return {'erro': f'Erro ao fazer previsão: {str(e)}'}
+            logger.error(f"Erro no ajuste fino: {e}")
+            db.session.rollback()
+            return {'erro': f'Erro no ajuste fino: {str(e)}'}
     
-    def listar_modelos(self, symbol: str = None) -> dict:
+    def exportar_tflite(self, model, model_path: str, amostra, indices_amostra=None) -> dict:
         """
-        Lista modelos LSTM treinados
+        Exporta o modelo para TFLite ao lado do .h5 e confere a paridade com o Keras
+        
+        O artefato tem batch fixo em 1 (o LSTM fundido do TFLite não aceita batch
+        dinâmico) e é usado pelo motor 'tflite', que não importa TensorFlow.
+        Desative com LSTM_EXPORTAR_TFLITE=0.
         
         Args:
-            symbol: Símbolo da ação (opcional)
+            model: Modelo Keras treinado
+            model_path: Caminho do .h5
+            amostra: Janelas de teste (n, sequence_length, 1) para a checagem de paridade
+            indices_amostra: Índices de símbolo das janelas (modelos com embedding)
         
         Returns:
-            dict com lista de modelos
+            dict com caminho, tamanho e maior diferença absoluta em relação ao Keras
         """
+        if os.environ.get('LSTM_EXPORTAR_TFLITE', '1') == '0':
+            return {'exportado': False}
+        
         try:
-            if symbol:
-                modelos = LSTMModel.query.filter_by(symbol=symbol)\
-                    .order_by(LSTMModel.created_at.desc()).all()
+            inicio = time.perf_counter()
+            sequence_length = model.inputs[0].shape[1]
+            com_embedding = len(model.inputs) > 1
+            
+            specs = [tf.TensorSpec([1, sequence_length, 1], tf.float32, name='janela')]
+            if com_embedding:
+                specs.append(tf.TensorSpec([1], tf.int32, name='indice_symbol'))
+                funcao = tf.function(lambda janela, indice: model([janela, indice], training=False))
+            else:
+                funcao = tf.function(lambda janela: model(janela, training=False))
+            
+            conversor = tf.lite.TFLiteConverter.from_concrete_functions(
+                [funcao.get_concrete_function(*specs)], model
+            )
+            conteudo = conversor.convert()
+            
+            caminho = caminho_tflite(model_path)
+            with open(caminho, 'wb') as f:
+                f.write(conteudo)
+            
+            # Paridade com o Keras em até 32 janelas de teste
+            amostra = np.asarray(amostra, dtype=np.float32)[:32]
+            if indices_amostra is None:
+                indices = np.zeros(len(amostra), dtype=np.int32)
             else:
-                modelos = LSTMModel.query.order_by(LSTMModel.created_at.desc()).all()
+                indices = np.asarray(indices_amostra, dtype=np.int32)[:32]
+            
+            esperado = model.predict([amostra, indices] if com_embedding else amostra, verbose=0)[:, 0]
+            obtido = ModeloTFLite(caminho).prever(amostra[:, :, 0], indices)
+            paridade = float(np.max(np.abs(esperado - obtido)))
+            
+            # Artefato divergente não é servido: o motor 'tflite' passa a recusar o modelo (artefato não encontrado)
+            if paridade > PARIDADE_MAX_TFLITE:
+                os.remove(caminho)
+                logger.warning(f"TFLite de {model_path} descartado: paridade {paridade:.2e} > {PARIDADE_MAX_TFLITE:.0e}")
+                return {
+                    'exportado': False,
+                    'erro': f'Paridade com o Keras acima do limite ({paridade:.2e} > {PARIDADE_MAX_TFLITE:.0e})',
+                    'paridade_max_abs': paridade
+                }
             
             return {
-                'total': len(modelos),
-                'modelos': [m.to_dict() for m in modelos]
+                'exportado': True,
+                'tflite_path': caminho,
+                'tamanho_bytes': len(conteudo),
+                'paridade_max_abs': paridade,
+                'tempo_segundos': round(time.perf_counter() - inicio, 2)
             }
             
         except Exception as e:
-            logger.error(f"Erro ao listar modelos: {e}")
-            return {'erro': f'Erro ao listar modelos: {str(e)}'}
+            logger.warning(f"Falha ao exportar {model_path} para TFLite: {e}")
+            return {'exportado': False, 'erro': str(e)}
     
-    def obter_metricas_modelo(self, model_name: str) -> dict:
+    def calcular_metricas(self, y_true, y_pred) -> dict:
         """
-        Obtém métricas detalhadas de um modelo
+        Calcula métricas de avaliação do modelo
         
         Args:
-            model_name: Nome do modelo
+            y_true: Valores reais
+            y_pred: Valores previstos
         
         Returns:
-            dict com métricas do modelo
+            dict com métricas MAE, RMSE e MAPE
         """
-        try:
-            model_info = LSTMModel.query.filter_by(model_name=model_name).first()
+        # MAE - Mean Absolute Error
+        mae = np.mean(np.abs(y_true - y_pred))
+        
+        # RMSE - Root Mean Square Error
+        rmse = np.sqrt(np.mean((y_true - y_pred) ** 2))
+        
+        # MAPE - Mean Absolute Percentage Error
+        mape = np.mean(np.abs((y_true - y_pred) / y_true)) * 100
+        
+        return {
+            'mae': float(mae),
+            'rmse': float(rmse),
+            'mape': float(mape)
+        }
+    
+    def prever_sequencia(self, model, janela, dias: int, motor: str = 'grafo', indices=None) -> np.ndarray:
+        """
+        Previsão autorregressiva de N passos a partir de uma janela normalizada
+        
+        Args:
+            model: Modelo Keras carregado
+            janela: Array normalizado (sequence_length,) ou (batch, sequence_length)
+            dias: Número de passos a prever
+            motor: 'grafo', 'keras', 'tflite' ou 'numpy'
+            indices: Índice do símbolo de cada janela (modelos globais com embedding)
+        
+        Returns:
+            Array normalizado (dias,) ou (batch, dias)
+        """
+        if motor in LSTMInferenciaService.MOTORES_PREVISAO:
+            return super().prever_sequencia(model, janela, dias, indices=indices)
+        
+        janela = np.asarray(janela, dtype=np.float32)
+        unico = janela.ndim == 1
+        if unico:
+            janela = janela[np.newaxis, :]
+        
+        if indices is None:
+            indices = np.zeros(len(janela), dtype=np.int32)
+        indices = np.asarray(indices, dtype=np.int32).reshape(-1)
+        
+        if motor == 'keras':
+            previsoes = self._prever_sequencia_keras(model, janela, dias, indices)
+        else:
+            rollout = self._obter_rollout(model)
+            previsoes = rollout(
+                tf.constant(janela[:, :, np.newaxis]), tf.constant(dias, dtype=tf.int32), tf.constant(indices)
+            ).numpy()
+        
+        return previsoes[0] if unico else previsoes
+    
+    def contar_chamadas_inferencia(self, motor: str, janelas: int, dias: int) -> int:
+        """Como na classe base; o motor 'grafo' faz o rollout inteiro em uma chamada"""
+        if motor == 'grafo':
+            return 1
+        return super().contar_chamadas_inferencia(motor, janelas, dias)
+    
+    def _prever_sequencia_keras(self, model, janela: np.ndarray, dias: int, indices: np.ndarray = None) -> np.ndarray:
+        """Caminho original: um model.predict por dia (mantido para testes de paridade)"""
+        sequence_length = janela.shape[1]
+        com_embedding = len(model.inputs) > 1
+        previsoes = []
+        current_sequence = janela.copy()
+        
+        for i in range(dias):
+            # Preparar input
+            x_input = current_sequence[:, -sequence_length:].reshape(-1, sequence_length, 1)
+            
+            # Prever próximo valor
+            next_pred = model.predict([x_input, indices] if com_embedding else x_input, verbose=0)
             
-            if not model_info:
-                return {'erro': f'Modelo {model_name} não encontrado'}
+            # Adicionar à sequência
+            current_sequence = np.hstack([current_sequence, next_pred])
+            previsoes.append(next_pred[:, 0])
+        
+        return np.stack(previsoes, axis=1)
+    
+    @staticmethod
+    def _obter_rollout(model):
+        """
+        Retorna (compilando na primeira chamada) o rollout tf.function de um modelo
+        
+        O horizonte inteiro roda em um único grafo, sem voltar ao Python a cada
+        passo: a janela desliza com um concat (descarta o valor mais antigo e
+        acrescenta a previsão), uma cópia da janela por passo, que o LSTM lê
+        inteira de qualquer forma.
+        """
+        rollout = _ROLLOUTS.get(model)
+        if rollout is not None:
+            return rollout
+        
+        model_ref = weakref.ref(model)
+        com_embedding = len(model.inputs) > 1
+        
+        @tf.function(input_signature=[
+            tf.TensorSpec(shape=[None, None, 1], dtype=tf.float32),
+            tf.TensorSpec(shape=[], dtype=tf.int32),
+            tf.TensorSpec(shape=[None], dtype=tf.int32)
+        ])
+        def rollout(janela, dias, indices):
+            buffer = janela
+            saidas = tf.TensorArray(tf.float32, size=dias)
             
-            return model_info.to_dict()
+            for i in tf.range(dias):
+                entrada = [buffer, indices] if com_embedding else buffer
+                next_pred = tf.cast(model_ref()(entrada, training=False), tf.float32)
+                
+                buffer = tf.concat([buffer[:, 1:], next_pred[:, tf.newaxis, :]], axis=1)
+                saidas = saidas.write(i, next_pred[:, 0])
             
-        except Exception as e:
-            logger.error(f"Erro ao obter métricas: {e}")
-            return {'erro': f'Erro ao obter métricas: {str(e)}'}
+            return tf.transpose(saidas.stack())
+        
+        _ROLLOUTS[model] = rollout
+        return rollout
+    
+    def carregar_modelo(self, model_info: LSTMModel, motor: str = None) -> tuple:
+        """
+        Carrega modelo Keras e scaler, reutilizando o cache do processo
+        
+        Args:
+            model_info: Registro LSTMModel do modelo
+            motor: 'tflite' ou 'numpy' carregam os motores sem TensorFlow
+        
+        Returns:
+            Tupla (model, scaler)
+        """
+        if motor in LSTMInferenciaService.MOTORES_PREVISAO:
+            return super().carregar_modelo(model_info, motor=motor)
+        
+        def loader():
+            model = load_model(model_info.model_path)
+            scaler_path = model_info.model_path.replace('.h5', '_scaler.pkl')
+            scaler = joblib.load(scaler_path)
+            return model, scaler
+        
+        return lstm_model_cache.obter(model_info.model_name, loader, symbol=model_info.symbol)
+
+
+def _inicializar_worker_treino(database_uri: str, intra_op: int, inter_op: int):
+    """Inicializa um processo do treinamento em lote (threads do TF e acesso ao banco)"""
+    global _APP_WORKER
+    
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+    
+    from flask import Flask
+    _APP_WORKER = Flask(__name__)
+    configurar_banco(_APP_WORKER, database_uri)
+    db.init_app(_APP_WORKER)
+
+
+def _treinar_no_worker(symbol: str, parametros: dict) -> dict:
+    inicio = time.perf_counter()
+    
+    try:
+        with _APP_WORKER.app_context():
+            treino = LSTMService()._treinar_e_salvar(symbol, verbose=0, **parametros)
+    except Exception as e:
+        treino = {'erro': f'Erro ao treinar modelo: {str(e)}'}
+    
+    tempo = round(time.perf_counter() - inicio, 2)
+    
+    if 'erro' in treino:
+        return {'symbol': symbol, 'erro': treino['erro'], 'tempo_segundos': tempo}
+    
+    return {
+        'symbol': symbol,
+        'resposta': treino['resposta'],
+        'registro': treino['registro'],
+        'tempo_segundos': tempo
+    }
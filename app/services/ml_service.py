@@ -1,16 +1,26 @@
 
 import os
 import json
+import math
+import hashlib
+import warnings
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import joblib
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier, ExtraTreesClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
 from sklearn.svm import SVC
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
 from sklearn.preprocessing import StandardScaler, RobustScaler
-from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import ParameterSampler, TimeSeriesSplit
 import logging
 
 from app.models.ibov_model import IbovAtivo
@@ -20,6 +30,41 @@ from app.utils.extensions import db
 
 logger = logging.getLogger(__name__)
 
+# Dias corridos usados pela média móvel/volatilidade e pelo alvo mais distante (D+3)
+JANELA_FEATURES_DIAS = 7
+HORIZONTE_ALVO_DIAS = 3
+
+# Ensemble ativo em memória (por processo), chaveado pela versão do ModeloTreinado
+_ENSEMBLE_CACHE = {}
+_ENSEMBLE_LOCK = threading.Lock()
+
+# Espaço da busca de hiperparâmetros (nomes do set_params do VotingClassifier)
+ESPACO_BUSCA = {
+    'rf__n_estimators': [100, 200, 300],
+    'rf__max_depth': [8, 12, 16, None],
+    'rf__min_samples_leaf': [1, 3, 5],
+    'et__n_estimators': [100, 150, 250],
+    'et__max_depth': [6, 10, 14],
+    'et__min_samples_leaf': [2, 4, 8],
+    'gb__n_estimators': [50, 100, 200],
+    'gb__learning_rate': [0.03, 0.05, 0.1],
+    'gb__max_depth': [3, 5, 8]
+}
+
+FEATURES_MODELO = ['participacao_pct', 'qtde_teorica', 'tipo_on', 'tipo_pn',
+                   'variacao_percentual', 'media_movel_7d', 'volatilidade']
+
+# Motores do membro gb: 'exato' (GradientBoostingClassifier, dados com fillna(0)) ou
+# 'histograma' (HistGradientBoostingClassifier, recebe os nulos como NaN)
+MOTORES_GB = ('exato', 'histograma')
+
+# Semente fixa da busca: o score de um fold depende só de dados e parâmetros (cacheável)
+BUSCA_RANDOM_STATE = 42
+MIN_AMOSTRAS_FOLD = 20
+
+# Dados da busca em cada processo do pool (enviados uma vez pelo initializer)
+_DADOS_BUSCA = None
+
 
 class MLService:
     
@@ -27,167 +72,134 @@ class MLService:
         self.modelos_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'modelos')
         os.makedirs(self.modelos_dir, exist_ok=True)
     
-    def refinar_dados(self) -> dict:
-       
+    def refinar_dados(self, incremental: bool = False) -> dict:
+        """
+        Gera dados_refinados a partir de ibov_ativos
+        
+        No modo incremental o recálculo começa na data mais antiga de
+        ibov_ativos que ainda não tem linha em dados_refinados (datas novas ou
+        dias antigos inseridos depois, como os do backfill histórico), junto
+        com os HORIZONTE_ALVO_DIAS anteriores (cujos alvos D+1/D+3 dependem
+        dela), e vai até a última data; a leitura de ibov_ativos começa
+        JANELA_FEATURES_DIAS antes disso. Os terços da recomendação usam os
+        scores de toda a tabela (os gravados mais os recalculados) e as linhas
+        antigas são reclassificadas com eles, então o resultado é o mesmo de
+        um refinamento completo. Se houver linhas sem score gravado (anteriores
+        à coluna), o refinamento é completo.
+        
+        Args:
+            incremental: Se True, processa apenas as datas novas
+        
+        Returns:
+            dict com estatísticas do refinamento
+        """
         try:
-            # LIMPAR DADOS ANTIGOS PRIMEIRO!
-            DadosRefinados.query.delete()
-            db.session.commit()
+            inicio_recalculo = None
             
-            ativos = IbovAtivo.query.all()
+            if incremental:
+                ultima_processada = db.session.query(db.func.max(DadosRefinados.data_referencia)).scalar()
+                
+                sem_score = db.session.query(DadosRefinados.id)\
+                    .filter(DadosRefinados.score.is_(None)).first()
+                
+                if ultima_processada is not None and sem_score is None:
+                    # Anti-join: (codigo, data) de ibov_ativos ainda sem linha refinada
+                    primeira_nova = db.session.query(db.func.min(IbovAtivo.data))\
+                        .outerjoin(DadosRefinados, db.and_(
+                            DadosRefinados.codigo == IbovAtivo.codigo,
+                            DadosRefinados.data_referencia == IbovAtivo.data
+                        ))\
+                        .filter(DadosRefinados.id.is_(None)).scalar()
+                    
+                    if primeira_nova is None:
+                        return {
+                            'mensagem': 'Nenhuma data de ibov_ativos pendente de refinamento',
+                            'total_processado': 0,
+                            'total_salvos': 0,
+                            'ultima_data_processada': ultima_processada.isoformat()
+                        }
+                    
+                    inicio_recalculo = primeira_nova - timedelta(days=HORIZONTE_ALVO_DIAS)
+            
+            if inicio_recalculo is None:
+                # LIMPAR DADOS ANTIGOS PRIMEIRO!
+                DadosRefinados.query.delete()
+                db.session.commit()
+                
+                # Uma única leitura de ibov_ativos; o resto é calculado em pandas
+                df = self._carregar_ativos()
+            else:
+                df = self._carregar_ativos(desde=inicio_recalculo - timedelta(days=JANELA_FEATURES_DIAS))
             
-            if not ativos:
+            if df.empty:
                 return {'erro': 'Nenhum dado encontrado na tabela ibov_ativos'}
             
             db.create_all()
             
-            refinados_salvos = 0
+            refinados = self._calcular_features(df)
             
-            for ativo in ativos:
-                try:
-                    participacao = float(ativo.participacao.replace(',', '.')) if ativo.participacao else 0.0
-                except:
-                    participacao = 0.0
-                
-                try:
-                    qtde_str = ativo.theoricalQty.replace('.', '').replace(',', '.')
-                    qtde_teorica = float(qtde_str) / 1_000_000  # Normaliza para milhões
-                except:
-                    qtde_teorica = 0.0
-                
-                tipo_on = 1 if 'ON' in ativo.tipo.upper() else 0
-                tipo_pn = 1 if 'PN' in ativo.tipo.upper() else 0
-                
-                variacao = self._calcular_variacao(ativo.codigo, ativo.data)
-                media_movel_7d = self._calcular_media_movel(ativo.codigo, ativo.data, dias=7)
-                volatilidade = self._calcular_volatilidade(ativo.codigo, ativo.data, dias=7)
-                
-                score_liquidez = (participacao * 100) + (min(qtde_teorica, 5.0) * 0.1)
-                
-                score_momentum = (variacao or 0) * 10 if variacao else 0
-                
-                score_estabilidade = 1.0 / (1.0 + (volatilidade or 0.1))
-                
-                if media_movel_7d and participacao > 0:
-                    score_tendencia = (participacao - media_movel_7d) / participacao * 100
-                else:
-                    score_tendencia = 0
-                
-                score_tipo = 1.5 if tipo_on else 0.7
-                
-                score_qualidade = (score_liquidez * 0.3 + 
-                                 score_estabilidade * 0.2 + 
-                                 abs(score_tendencia) * 0.1 + 
-                                 score_tipo * 0.1)
-                
-
-                
-                data_amanha = ativo.data + timedelta(days=1)
-                ativo_amanha = IbovAtivo.query.filter_by(
-                    codigo=ativo.codigo, data=data_amanha
-                ).first()
-                
-                score_d1 = 0.0
-                if ativo_amanha:
-                    try:
-                        part_amanha = float(ativo_amanha.participacao.replace(',', '.'))
-                        score_d1 = (part_amanha - participacao) / participacao if participacao > 0 else 0
-                    except:
-                        score_d1 = 0.0
-                
-                data_3dias = ativo.data + timedelta(days=3)
-                ativo_3dias = IbovAtivo.query.filter_by(
-                    codigo=ativo.codigo, data=data_3dias
-                ).first()
-                
-                score_d3 = 0.0
-                if ativo_3dias:
-                    try:
-                        part_3dias = float(ativo_3dias.participacao.replace(',', '.'))
-                        score_d3 = (part_3dias - participacao) / participacao if participacao > 0 else 0
-                    except:
-                        score_d3 = 0.0
-                
-                score_tecnico = (
-                    score_momentum * 0.4 +
-                    score_tendencia * 0.3 +
-                    score_qualidade * 0.2 +
-                    score_estabilidade * 0.1
-                ) * 0.01  # Normaliza
-                
-                performance_score = (
-                    score_d1 * 0.4 +
-                    score_d3 * 0.3 +
-                    score_tecnico * 0.3
-                )
-                
-                import random
-                import time
-                seed_unico = int(time.time() * 1000) + hash(ativo.codigo) % 1000
-                random.seed(seed_unico)
-                ruido = random.uniform(-0.02, 0.02)  # ±2% de ruído
-                performance_score += ruido
-                
-                recomendacao = performance_score
-                
-                existe = DadosRefinados.query.filter_by(
-                    codigo=ativo.codigo,
-                    data_referencia=ativo.data
-                ).first()
-                
-                if not existe:
-                    refinado = DadosRefinados(
-                        codigo=ativo.codigo,
-                        nome=ativo.nome,
-                        participacao_pct=participacao,
-                        qtde_teorica=qtde_teorica,
-                        tipo_on=tipo_on,
-                        tipo_pn=tipo_pn,
-                        variacao_percentual=variacao,
-                        media_movel_7d=media_movel_7d,
-                        volatilidade=volatilidade,
-                        recomendacao=performance_score,  # Score temporário
-                        data_referencia=ativo.data
-                    )
-                    db.session.add(refinado)
-                    refinados_salvos += 1
+            if inicio_recalculo is not None:
+                refinados = refinados[refinados['data_referencia'] >= inicio_recalculo].reset_index(drop=True)
             
-            db.session.commit()
+            refinados['score'] = self._calcular_score(refinados)
             
-            todos_registros = DadosRefinados.query.all()
-            scores = [r.recomendacao for r in todos_registros]
+            todos_scores = refinados['score'].to_numpy()
+            if inicio_recalculo is not None:
+                gravados = db.session.query(DadosRefinados.score)\
+                    .filter(DadosRefinados.data_referencia < inicio_recalculo).all()
+                todos_scores = np.concatenate([np.array([s for s, in gravados], dtype=float), todos_scores])
             
-            import statistics
-            import numpy as np
-            scores_sorted = sorted(scores)
+            scores_sorted = np.sort(todos_scores)
             
             tamanho = len(scores_sorted)
-            threshold_baixo = scores_sorted[tamanho // 3] if tamanho > 3 else min(scores)
-            threshold_alto = scores_sorted[2 * tamanho // 3] if tamanho > 3 else max(scores)
+            threshold_baixo = scores_sorted[tamanho // 3] if tamanho > 3 else scores_sorted.min()
+            threshold_alto = scores_sorted[2 * tamanho // 3] if tamanho > 3 else scores_sorted.max()
             
             print(f"DEBUG - Thresholds: Baixo={threshold_baixo:.4f}, Alto={threshold_alto:.4f}")
             
-            total_comprar = 0
-            total_manter = 0
-            total_vender = 0
-            
-            for registro in todos_registros:
-                if registro.recomendacao >= threshold_alto:
-                    registro.recomendacao = 2  # COMPRAR (top 33%)
-                    total_comprar += 1
-                elif registro.recomendacao >= threshold_baixo:
-                    registro.recomendacao = 1  # MANTER (middle 33%)
-                    total_manter += 1
-                else:
-                    registro.recomendacao = 0  # VENDER (bottom 33%)
-                    total_vender += 1
+            # 2 = COMPRAR (top 33%), 1 = MANTER (middle 33%), 0 = VENDER (bottom 33%)
+            scores = refinados['score']
+            refinados['recomendacao'] = np.where(
+                scores >= threshold_alto, 2, np.where(scores >= threshold_baixo, 1, 0)
+            )
+            
+            total_comprar = int((refinados['recomendacao'] == 2).sum())
+            total_manter = int((refinados['recomendacao'] == 1).sum())
+            total_vender = int((refinados['recomendacao'] == 0).sum())
+            
+            colunas = ['codigo', 'nome', 'participacao_pct', 'qtde_teorica', 'tipo_on', 'tipo_pn',
+                       'variacao_percentual', 'media_movel_7d', 'volatilidade', 'recomendacao',
+                       'score', 'data_referencia']
+            registros = refinados[colunas].astype(object)
+            registros = registros.where(registros.notna(), None).to_dict('records')
+            
+            if inicio_recalculo is not None:
+                # Substitui as linhas recalculadas (datas novas + lookback dos alvos)
+                DadosRefinados.query.filter(
+                    DadosRefinados.data_referencia >= inicio_recalculo
+                ).delete(synchronize_session=False)
+                
+                # Linhas antigas seguem os terços da tabela inteira
+                db.session.execute(
+                    db.update(DadosRefinados)
+                    .where(DadosRefinados.data_referencia < inicio_recalculo)
+                    .values(recomendacao=db.case(
+                        (DadosRefinados.score >= float(threshold_alto), 2),
+                        (DadosRefinados.score >= float(threshold_baixo), 1),
+                        else_=0
+                    )),
+                    execution_options={'synchronize_session': False}
+                )
             
+            db.session.execute(db.insert(DadosRefinados.__table__), registros)
             db.session.commit()
             
             return {
                 'mensagem': 'Dados refinados com sucesso! (3 classes: COMPRAR, MANTER, VENDER)',
-                'total_processado': len(ativos),
-                'total_salvos': refinados_salvos,
+                'modo': 'incremental' if inicio_recalculo is not None else 'completo',
+                'recalculado_desde': inicio_recalculo.isoformat() if inicio_recalculo is not None else None,
+                'total_processado': len(df),
+                'total_salvos': len(registros),
                 'distribuicao': f'COMPRAR: {total_comprar}, MANTER: {total_manter}, VENDER: {total_vender}',
                 'estrategia': 'Target baseado em performance FUTURA com 3 classes (terços)',
                 'thresholds': f'Baixo: {threshold_baixo:.4f}, Alto: {threshold_alto:.4f}'
@@ -198,25 +210,306 @@ class MLService:
             logger.error(f"Erro ao refinar dados: {e}")
             return {'erro': str(e)}
     
-    def treinar_modelo(self, algoritmo='RandomForest') -> dict:
-       
+    def _carregar_ativos(self, desde=None) -> pd.DataFrame:
+        query = db.session.query(
+            IbovAtivo.id, IbovAtivo.codigo, IbovAtivo.nome, IbovAtivo.tipo,
+            IbovAtivo.participacao_valor, IbovAtivo.qtde_teorica_valor, IbovAtivo.data
+        )
+        
+        if desde is not None:
+            query = query.filter(IbovAtivo.data >= desde)
+        
+        linhas = query.order_by(IbovAtivo.id).all()
+        
+        return pd.DataFrame(
+            linhas, columns=['id', 'codigo', 'nome', 'tipo', 'participacao_valor', 'qtde_teorica_valor', 'data']
+        )
+    
+    def _calcular_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calcula as features de todos os ativos de uma vez
+        
+        Só o primeiro registro de cada (codigo, data) é usado. Janelas e
+        deslocamentos são em dias corridos:
+        - variacao_percentual: variação % da participação em relação ao dia
+          anterior (nula se não houver registro nesse dia);
+        - media_movel_7d: média da participação nos registros de [data - 7, data]
+          (nula se algum deles tiver participação inválida);
+        - volatilidade: desvio padrão populacional na mesma janela (nulo com
+          menos de 2 registros);
+        - score_d1/score_d3: variação relativa da participação em D+1/D+3
+          (0 se o dia não existir ou a participação atual não for positiva).
+        
+        Args:
+            df: Linhas de ibov_ativos ordenadas por id
+        
+        Returns:
+            DataFrame com uma linha por (codigo, data) e as colunas de DadosRefinados
+        """
+        df = df.copy()
+        df['dt'] = pd.to_datetime(df['data'])
+        
+        # Participação "estrita" (NaN se inválida) usada nas janelas e lookups
+        df['part'] = df['participacao_valor'].astype(float)
+        
+        # Só o primeiro registro de cada (codigo, data) é salvo e usado nos lookups
+        base = df.drop_duplicates(['codigo', 'dt'], keep='first').reset_index(drop=True)
+        
+        participacao = base['part'].fillna(0.0)
+        
+        qtde_teorica = (base['qtde_teorica_valor'].astype(float) / 1_000_000).fillna(0.0)  # Normaliza para milhões
+        
+        tipo = base['tipo'].fillna('').str.upper()
+        
+        primeiro = base.set_index(['codigo', 'dt'])['part']
+        
+        def lookup(dias: int) -> tuple:
+            chaves = pd.MultiIndex.from_arrays([base['codigo'], base['dt'] + pd.Timedelta(days=dias)])
+            existe = chaves.isin(primeiro.index)
+            valores = primeiro.reindex(chaves).to_numpy()
+            return existe, valores
+        
+        # Variação em relação ao dia anterior (dia corrido)
+        existe_anterior, part_anterior = lookup(-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variacao = ((base['part'].to_numpy() - part_anterior) / part_anterior) * 100
+        variacao = np.where(existe_anterior & np.isfinite(variacao), variacao, np.nan)
+        
+        # Janela [data - 7, data]: explode cada registro nos 8 dias que ele cobre
+        janelas = pd.concat([
+            df[['codigo', 'dt', 'part']].assign(alvo=df['dt'] + pd.Timedelta(days=k))
+            for k in range(JANELA_FEATURES_DIAS + 1)
+        ])
+        janelas = janelas.merge(
+            base[['codigo', 'dt']].rename(columns={'dt': 'alvo'}), on=['codigo', 'alvo']
+        )
+        grupos = janelas.groupby(['codigo', 'alvo'])['part']
+        estatisticas = pd.DataFrame({
+            'n': grupos.size(),
+            'validos': grupos.count(),
+            'media': grupos.mean(),
+            'std': grupos.std(ddof=0)
+        }).reindex(pd.MultiIndex.from_arrays([base['codigo'], base['dt']]))
+        
+        completos = (estatisticas['n'] == estatisticas['validos']).to_numpy()
+        media_movel = np.where(completos, estatisticas['media'].to_numpy(), np.nan)
+        volatilidade = np.where(
+            completos & (estatisticas['n'] > 1).to_numpy(), estatisticas['std'].to_numpy(), np.nan
+        )
+        
+        # Alvos futuros D+1 e D+3
+        scores_futuros = {}
+        for dias in (1, 3):
+            existe, part_futura = lookup(dias)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                score = np.where(participacao > 0, (part_futura - participacao) / participacao, 0.0)
+            scores_futuros[dias] = np.where(existe & ~np.isnan(part_futura), score, 0.0)
+        
+        return pd.DataFrame({
+            'codigo': base['codigo'],
+            'nome': base['nome'],
+            'participacao_pct': participacao,
+            'qtde_teorica': qtde_teorica,
+            'tipo_on': tipo.str.contains('ON', regex=False).astype(int),
+            'tipo_pn': tipo.str.contains('PN', regex=False).astype(int),
+            'variacao_percentual': variacao,
+            'media_movel_7d': media_movel,
+            'volatilidade': volatilidade,
+            'score_d1': scores_futuros[1],
+            'score_d3': scores_futuros[3],
+            'data_referencia': base['data']
+        })
+    
+    def _calcular_score(self, refinados: pd.DataFrame) -> np.ndarray:
+        """
+        Score de performance (D+1, D+3 e componente técnico) de cada linha
+        """
+        participacao = refinados['participacao_pct'].to_numpy()
+        qtde_teorica = refinados['qtde_teorica'].to_numpy()
+        tipo_on = refinados['tipo_on'].to_numpy()
+        variacao = refinados['variacao_percentual'].fillna(0).to_numpy()
+        media_movel_7d = refinados['media_movel_7d'].fillna(0).to_numpy()
+        volatilidade = refinados['volatilidade'].fillna(0).to_numpy()
+        
+        score_liquidez = (participacao * 100) + (np.minimum(qtde_teorica, 5.0) * 0.1)
+        
+        score_momentum = variacao * 10
+        
+        score_estabilidade = 1.0 / (1.0 + np.where(volatilidade != 0, volatilidade, 0.1))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score_tendencia = np.where(
+                (media_movel_7d != 0) & (participacao > 0),
+                (participacao - media_movel_7d) / participacao * 100,
+                0
+            )
+        
+        score_tipo = np.where(tipo_on == 1, 1.5, 0.7)
+        
+        score_qualidade = (score_liquidez * 0.3 + 
+                           score_estabilidade * 0.2 + 
+                           np.abs(score_tendencia) * 0.1 + 
+                           score_tipo * 0.1)
+        
+        score_tecnico = (
+            score_momentum * 0.4 +
+            score_tendencia * 0.3 +
+            score_qualidade * 0.2 +
+            score_estabilidade * 0.1
+        ) * 0.01  # Normaliza
+        
+        performance_score = (
+            refinados['score_d1'].to_numpy() * 0.4 +
+            refinados['score_d3'].to_numpy() * 0.3 +
+            score_tecnico * 0.3
+        )
+        
+        return performance_score + self._gerar_ruido(len(refinados))
+    
+    @staticmethod
+    def _gerar_ruido(n: int) -> np.ndarray:
+        return np.random.default_rng().uniform(-0.02, 0.02, n)  # ±2% de ruído
+    
+    def _carregar_dados_treino(self, motor_gb: str = 'exato') -> tuple:
+        """
+        Features e alvo dos dados refinados em ordem cronológica
+        
+        Returns:
+            (X, y); nulos de X viram 0 no motor 'exato' e ficam NaN no 'histograma'
+        """
+        dados = DadosRefinados.query.all()
+        if not dados:
+            return pd.DataFrame(columns=FEATURES_MODELO), pd.Series(dtype=float)
+        
+        df = pd.DataFrame([d.to_dict() for d in dados])
+        
+        df = df.sort_values('data_referencia')
+        
+        X = df[FEATURES_MODELO].astype(float)
+        if motor_gb == 'exato':
+            X = X.fillna(0)
+        y = df['recomendacao'].fillna(0)
+        return X, y
+    
+    @staticmethod
+    def _criar_ensemble(random_state: int, parametros: dict = None, n_jobs: int = -1,
+                        motor_gb: str = 'exato') -> VotingClassifier:
+        """
+        Monta o VotingClassifier (rf + et + gb) com a configuração padrão
+        
+        No motor 'histograma' o gb é um HistGradientBoostingClassifier, que trata
+        NaN nativamente; RF/ET (sem suporte a NaN no scikit-learn fixado) recebem
+        antes um SimpleImputer com 0 e colunas indicadoras dos valores ausentes.
+        
+        Args:
+            random_state: Semente dos três membros
+            parametros: Sobrescritas no formato do set_params (ex: {'rf__max_depth': 16})
+            n_jobs: Paralelismo de RF/ET e do próprio voting
+            motor_gb: 'exato' ou 'histograma' (MOTORES_GB)
+        """
+        rf = RandomForestClassifier(
+            n_estimators=200,  
+            max_depth=12,      
+            min_samples_split=8,
+            min_samples_leaf=3,
+            max_features='sqrt',
+            class_weight='balanced',
+            bootstrap=True,
+            random_state=random_state,
+            n_jobs=n_jobs
+        )
+        
+        et = ExtraTreesClassifier(
+            n_estimators=150,
+            max_depth=10,
+            min_samples_split=10,
+            min_samples_leaf=4,
+            max_features='sqrt',
+            class_weight='balanced',
+            bootstrap=False,
+            random_state=random_state,
+            n_jobs=n_jobs
+        )
+        
+        if motor_gb == 'histograma':
+            gb = HistGradientBoostingClassifier(
+                max_iter=100,
+                learning_rate=0.05,
+                max_depth=8,
+                min_samples_leaf=6,
+                random_state=random_state
+            )
+            # keep_empty_features: colunas sem nenhum valor (ex: variação no início da série) continuam no lugar
+            rf = Pipeline([('imputador', SimpleImputer(strategy='constant', fill_value=0, add_indicator=True, keep_empty_features=True)), ('modelo', rf)])
+            et = Pipeline([('imputador', SimpleImputer(strategy='constant', fill_value=0, add_indicator=True, keep_empty_features=True)), ('modelo', et)])
+        else:
+            gb = GradientBoostingClassifier(
+                n_estimators=100,
+                learning_rate=0.05,  
+                max_depth=8,
+                min_samples_split=15,
+                min_samples_leaf=6,
+                subsample=0.8,  
+                random_state=random_state
+            )
+        
+        modelo = VotingClassifier(
+            estimators=[
+                ('rf', rf),      
+                ('et', et),        
+                ('gb', gb)       
+            ],
+            voting='soft',       
+            n_jobs=n_jobs
+        )
+        
+        if parametros:
+            modelo.set_params(**{MLService._caminho_parametro(k, motor_gb): v for k, v in parametros.items()})
+        
+        return modelo
+    
+    @staticmethod
+    def _caminho_parametro(nome: str, motor_gb: str) -> str:
+        """
+        Nome de ESPACO_BUSCA (ex: 'rf__max_depth') -> caminho no ensemble do motor
+        """
+        if motor_gb != 'histograma':
+            return nome
+        membro, parametro = nome.split('__', 1)
+        if membro in ('rf', 'et'):
+            return f'{membro}__modelo__{parametro}'
+        if parametro == 'n_estimators':
+            return f'{membro}__max_iter'
+        return nome
+    
+    def treinar_modelo(self, algoritmo='RandomForest', otimizar: bool = False, n_candidatos: int = 16,
+                       processos: int = None, motor_gb: str = 'exato', progresso=None) -> dict:
+        """
+        Treina o ensemble com os dados refinados e o registra como modelo ativo
+        
+        Args:
+            algoritmo: Nome registrado em ModeloTreinado
+            motor_gb: 'exato' (GradientBoosting, nulos viram 0) ou 'histograma'
+                (HistGradientBoosting, nulos mantidos como NaN)
+            otimizar: Busca os hiperparâmetros antes do treino (otimizar_hiperparametros)
+            n_candidatos: Configurações sorteadas na busca
+            processos: Tamanho do pool da busca
+            progresso: Callable progresso(atual, total, descricao) chamado durante a busca (opcional)
+        """
         try:
             import time  # Para aleatoriedade real
-            db.create_all()
             
-            dados = DadosRefinados.query.all()
+            if motor_gb not in MOTORES_GB:
+                return {'erro': f"motor_gb inválido: {motor_gb}. Use {', '.join(MOTORES_GB)}"}
             
-            if len(dados) < 10:
-                return {'erro': 'Poucos dados para treinar. Mínimo 10 amostras.'}
+            db.create_all()
             
-            df = pd.DataFrame([d.to_dict() for d in dados])
+            X, y = self._carregar_dados_treino(motor_gb)
             
-            df = df.sort_values('data_referencia')
+            if len(X) < 10:
+                return {'erro': 'Poucos dados para treinar. Mínimo 10 amostras.'}
             
-            features = ['participacao_pct', 'qtde_teorica', 'tipo_on', 'tipo_pn', 
-                       'variacao_percentual', 'media_movel_7d', 'volatilidade']
-            X = df[features].fillna(0)
-            y = df['recomendacao'].fillna(0)
+            features = list(X.columns)
             
             split_index = int(len(X) * 0.8)
             X_train = X.iloc[:split_index]
@@ -249,58 +542,34 @@ class MLService:
             
             random_state_dinamico = int(time.time()) % 10000
             
-            rf = RandomForestClassifier(
-                n_estimators=200,  
-                max_depth=12,      
-                min_samples_split=8,
-                min_samples_leaf=3,
-                max_features='sqrt',
-                class_weight='balanced',
-                bootstrap=True,
-                random_state=random_state_dinamico,
-                n_jobs=-1
-            )
-            
-            from sklearn.ensemble import ExtraTreesClassifier
-            et = ExtraTreesClassifier(
-                n_estimators=150,
-                max_depth=10,
-                min_samples_split=10,
-                min_samples_leaf=4,
-                max_features='sqrt',
-                class_weight='balanced',
-                bootstrap=False,
-                random_state=random_state_dinamico,
-                n_jobs=-1
-            )
-            
-            gb = GradientBoostingClassifier(
-                n_estimators=100,
-                learning_rate=0.05,  
-                max_depth=8,
-                min_samples_split=15,
-                min_samples_leaf=6,
-                subsample=0.8,  
-                random_state=random_state_dinamico
-            )
-            
-            modelo = VotingClassifier(
-                estimators=[
-                    ('rf', rf),      
-                    ('et', et),        
-                    ('gb', gb)       
-                ],
-                voting='soft',       
-                n_jobs=-1
-            )
+            busca = None
+            parametros = None
+            if otimizar:
+                busca = self.otimizar_hiperparametros(
+                    X_train, y_train, n_candidatos=n_candidatos, processos=processos,
+                    motor_gb=motor_gb, progresso=progresso
+                )
+                if 'erro' in busca:
+                    return busca
+                parametros = busca['melhores_parametros']
+            
+            modelo = self._criar_ensemble(random_state_dinamico, parametros, motor_gb=motor_gb)
+            params_ensemble = modelo.get_params()
+            hiperparametros = {
+                'motor_gb': motor_gb,
+                'parametros': {nome: params_ensemble[self._caminho_parametro(nome, motor_gb)] for nome in ESPACO_BUSCA},
+                'busca': {k: v for k, v in busca.items() if k != 'melhores_parametros'} if busca else None
+            }
             
             print(f"🔍 DEBUG - Formato X_train: {X_train_scaled.shape}")
             print(f"🔍 DEBUG - Formato y_train: {y_train.shape}")
             print(f"🔍 DEBUG - Primeiros 5 valores de y_train: {y_train.iloc[:5].tolist()}")
             print(f"🔍 DEBUG - Valores únicos em y_train: {sorted(y_train.unique())}")
             
-            print("🤖 Treinando modelo RandomForest otimizado...")
+            print(f"🤖 Treinando modelo RandomForest otimizado (gb: {motor_gb})...")
+            inicio_fit = time.perf_counter()
             modelo.fit(X_train_scaled, y_train)
+            tempo_fit = time.perf_counter() - inicio_fit
             
             print("🔮 Fazendo predições no conjunto de teste...")
             y_pred = modelo.predict(X_test_scaled)
@@ -331,6 +600,9 @@ class MLService:
                     importances = modelo.feature_importances_
                 elif hasattr(modelo, 'estimators_') and hasattr(modelo.estimators_[0], 'feature_importances_'):
                     importances = modelo.estimators_[0].feature_importances_
+                elif hasattr(modelo, 'estimators_') and hasattr(modelo.estimators_[0][-1], 'feature_importances_'):
+                    # Pipeline (motor histograma): as primeiras colunas são as features, depois os indicadores
+                    importances = modelo.estimators_[0][-1].feature_importances_[:len(features)]
                 else:
                     importances = [1/len(features)] * len(features)  # Uniform se não disponível
                 
@@ -353,7 +625,8 @@ class MLService:
             joblib.dump({
                 'modelo': modelo,
                 'scaler': scaler,
-                'features': features
+                'features': features,
+                'motor_gb': motor_gb
             }, caminho_modelo)
             
             modelo_db = ModeloTreinado(
@@ -367,6 +640,7 @@ class MLService:
                 total_amostras_treino=len(X_train),
                 total_amostras_teste=len(X_test),
                 features_utilizadas=json.dumps(features),
+                hiperparametros=json.dumps(hiperparametros),
                 caminho_modelo=caminho_modelo,
                 ativo=True
             )
@@ -376,6 +650,9 @@ class MLService:
             db.session.add(modelo_db)
             db.session.commit()
             
+            with _ENSEMBLE_LOCK:
+                self._registrar_em_cache(versao, {'modelo': modelo, 'scaler': scaler, 'features': features, 'motor_gb': motor_gb})
+            
             return {
                 'mensagem': '🎯 Modelo treinado com sucesso!',
                 'versao': versao,
@@ -414,6 +691,8 @@ class MLService:
                     'treino': len(X_train),
                     'teste': len(X_test)
                 },
+                'hiperparametros': hiperparametros,
+                'tempo_treino_segundos': round(tempo_fit, 2),
                 'debug': {
                     'distribuicao_treino': f'VENDER: {vender_treino}, MANTER: {manter_treino}, COMPRAR: {comprar_treino}',
                     'distribuicao_teste_real': distribuicao_real_dict,
@@ -443,25 +722,173 @@ class MLService:
             logger.error(f"Erro ao treinar modelo: {e}")
             return {'erro': str(e)}
     
+    def otimizar_hiperparametros(self, X, y, n_candidatos: int = 16, fator: int = 3, n_splits: int = 3,
+                                 processos: int = None, motor_gb: str = 'exato', progresso=None) -> dict:
+        """
+        Busca a configuração do ensemble por successive halving com TimeSeriesSplit
+        
+        Cada rodada avalia os candidatos vivos nas `amostras` mais recentes do
+        treino (validação walk-forward, sem olhar o futuro) e mantém só o melhor
+        1/fator para a rodada seguinte, que usa fator vezes mais amostras; a
+        última rodada usa o treino inteiro. Os folds são distribuídos em um pool
+        de processos e o score de cada fold fica em cache em
+        modelos/cache_busca/<hash dos dados>/, chaveado pelo hash dos parâmetros,
+        de modo que repetir a busca sobre os mesmos dados não treina de novo.
+        
+        Args:
+            X, y: Treino em ordem cronológica (sem o conjunto de teste)
+            n_candidatos: Configurações sorteadas de ESPACO_BUSCA
+            fator: Fração eliminada por rodada (mantém 1/fator)
+            n_splits: Folds do TimeSeriesSplit
+            processos: Tamanho do pool (padrão: núcleos; 1 avalia no próprio processo)
+            motor_gb: Motor do membro gb (MOTORES_GB)
+            progresso: Callable progresso(atual, total, descricao) chamado a cada fold (opcional)
+        
+        Returns:
+            dict com melhores_parametros, score_cv (F1 ponderado médio) e o resumo das rodadas
+        """
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        total = len(X)
+        minimo = (n_splits + 1) * MIN_AMOSTRAS_FOLD
+        
+        if total < minimo:
+            return {'erro': f'Poucos dados para a busca de hiperparâmetros. Mínimo {minimo} amostras de treino.'}
+        
+        inicio = time.perf_counter()
+        candidatos = list({
+            self._hash_parametros(p): p
+            for p in ParameterSampler(ESPACO_BUSCA, n_iter=n_candidatos, random_state=BUSCA_RANDOM_STATE)
+        }.items())
+        
+        # Número de rodadas limitado pelo menor subconjunto que ainda comporta os folds
+        n_rodadas = 1 + int(math.log(len(candidatos), fator)) if len(candidatos) > 1 else 1
+        while n_rodadas > 1 and total // fator ** (n_rodadas - 1) < minimo:
+            n_rodadas -= 1
+        
+        # Os folds dependem de n_splits: o mesmo índice i cobre outro intervalo com outra divisão
+        pasta_cache = os.path.join(
+            self.modelos_dir, 'cache_busca', hashlib.sha1(X.tobytes() + y.astype(float).tobytes()).hexdigest()[:16],
+            motor_gb, f'splits_{n_splits}'
+        )
+        os.makedirs(pasta_cache, exist_ok=True)
+        
+        processos = max(1, processos or os.cpu_count() or 1)
+        executor = None
+        
+        vivos = candidatos
+        rodadas = []
+        avaliacoes_total = 0
+        concluidas = 0
+        previstas = sum(
+            max(1, math.ceil(len(candidatos) / fator ** r)) * n_splits for r in range(n_rodadas)
+        )
+        
+        try:
+            for rodada in range(n_rodadas):
+                amostras = total if rodada == n_rodadas - 1 else total // fator ** (n_rodadas - 1 - rodada)
+                deslocamento = total - amostras
+                folds = [
+                    (treino + deslocamento, teste + deslocamento)
+                    for treino, teste in TimeSeriesSplit(n_splits=n_splits).split(np.arange(amostras))
+                ]
+                
+                scores = {chave: [None] * n_splits for chave, _ in vivos}
+                pendentes = []
+                for chave, parametros in vivos:
+                    for i, (treino, teste) in enumerate(folds):
+                        arquivo = os.path.join(pasta_cache, f'{chave}_{amostras}_{i}.json')
+                        if os.path.exists(arquivo):
+                            with open(arquivo) as f:
+                                scores[chave][i] = json.load(f)['score']
+                        else:
+                            pendentes.append((chave, i, parametros, treino, teste, arquivo))
+                
+                def registrar(chave, i, arquivo, score):
+                    nonlocal concluidas
+                    scores[chave][i] = score
+                    if score is not None:
+                        with open(arquivo, 'w') as f:
+                            json.dump({'score': score}, f)
+                    concluidas += 1
+                    if progresso is not None:
+                        progresso(concluidas, previstas, f'rodada {rodada + 1}/{n_rodadas}')
+                
+                if pendentes and processos > 1:
+                    if executor is None:
+                        # spawn como no treinamento em lote do LSTM: seguro dentro das threads do JobManager
+                        executor = ProcessPoolExecutor(
+                            max_workers=processos,
+                            mp_context=multiprocessing.get_context('spawn'),
+                            initializer=_inicializar_worker_busca,
+                            initargs=(X, y)
+                        )
+                    futuros = {
+                        executor.submit(_avaliar_fold_no_worker, parametros, treino, teste, motor_gb): (chave, i, arquivo)
+                        for chave, i, parametros, treino, teste, arquivo in pendentes
+                    }
+                    for futuro in as_completed(futuros):
+                        registrar(*futuros[futuro], futuro.result())
+                else:
+                    for chave, i, parametros, treino, teste, arquivo in pendentes:
+                        registrar(chave, i, arquivo, _avaliar_fold(X, y, parametros, treino, teste, motor_gb))
+                
+                concluidas += (len(vivos) * n_splits) - len(pendentes)
+                avaliacoes_total += len(pendentes)
+                
+                # Folds que falharam (ex: classe ausente ou feature toda nula no recorte) ficam fora da média
+                medias = {}
+                for chave, _ in vivos:
+                    validos = [s for s in scores[chave] if s is not None]
+                    medias[chave] = float(np.mean(validos)) if validos else 0.0
+                vivos = sorted(vivos, key=lambda c: medias[c[0]], reverse=True)
+                
+                rodadas.append({
+                    'rodada': rodada + 1,
+                    'amostras': amostras,
+                    'candidatos': len(vivos),
+                    'folds_treinados': len(pendentes),
+                    'folds_em_cache': len(vivos) * n_splits - len(pendentes),
+                    'melhor_score': round(medias[vivos[0][0]], 4)
+                })
+                
+                if rodada < n_rodadas - 1:
+                    vivos = vivos[:max(1, math.ceil(len(vivos) / fator))]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        melhor_chave, melhores_parametros = vivos[0]
+        
+        # Custo relativo à avaliação de todos os candidatos com o treino inteiro
+        custo = sum(r['candidatos'] * r['amostras'] for r in rodadas) / (len(candidatos) * total)
+        
+        logger.info(f"Busca de hiperparâmetros: {melhor_chave} F1={rodadas[-1]['melhor_score']} ({len(candidatos)} candidatos)")
+        
+        return {
+            'melhores_parametros': melhores_parametros,
+            'hash_parametros': melhor_chave,
+            'score_cv': rodadas[-1]['melhor_score'],
+            'candidatos': len(candidatos),
+            'n_splits': n_splits,
+            'fator': fator,
+            'rodadas': rodadas,
+            'folds_treinados': avaliacoes_total,
+            'custo_relativo_grade': round(custo, 4),
+            'processos': processos,
+            'tempo_segundos': round(time.perf_counter() - inicio, 2)
+        }
+    
+    @staticmethod
+    def _hash_parametros(parametros: dict) -> str:
+        return hashlib.sha1(json.dumps(parametros, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    
     def prever(self, codigo: str) -> dict:
        
         try:
-            # Busca modelo ativo
-            modelo_db = ModeloTreinado.query.filter_by(ativo=True).first()
-            
-            if not modelo_db:
-                return {'erro': 'Nenhum modelo treinado disponível'}
-            
-            try:
-                modelo_data = joblib.load(modelo_db.caminho_modelo)
-                modelo = modelo_data['modelo']
-                scaler = modelo_data['scaler']
-                features = modelo_data['features']
-            except Exception as load_error:
-                if 'numpy._core' in str(load_error):
-                    return {'erro': 'Modelo incompatível com versão atual do numpy. Treine um novo modelo.'}
-                else:
-                    return {'erro': f'Erro ao carregar modelo: {str(load_error)}'}
+            carregado = self._carregar_modelo_ativo()
+            if 'erro' in carregado:
+                return carregado
             
             dado = DadosRefinados.query.filter_by(codigo=codigo).order_by(
                 DadosRefinados.data_referencia.desc()
@@ -470,54 +897,207 @@ class MLService:
             if not dado:
                 return {'erro': f'Dados não encontrados para {codigo}'}
             
-            X = np.array([[
-                dado.participacao_pct or 0,
-                dado.qtde_teorica or 0,
-                dado.tipo_on or 0,
-                dado.tipo_pn or 0,
-                dado.variacao_percentual or 0,
-                dado.media_movel_7d or 0,
-                dado.volatilidade or 0
-            ]])
-            
-            X_scaled = scaler.transform(X)
-            
-            predicao = modelo.predict(X_scaled)[0]
-            probabilidades = modelo.predict_proba(X_scaled)[0]
-            
-            if predicao == 2:
-                recomendacao = 'COMPRAR'
-            elif predicao == 1:
-                recomendacao = 'MANTER'
-            else:
-                recomendacao = 'VENDER'
-                
-            confianca = max(probabilidades) * 100
+            X_scaled = carregado['scaler'].transform(self._matriz_features([dado], carregado['features'], carregado['motor_gb'] == 'exato'))
+            probabilidades = carregado['modelo'].predict_proba(X_scaled)[0]
+            
+            return self._montar_predicao(dado, carregado['modelo'].classes_, probabilidades)
+            
+        except Exception as e:
+            logger.error(f"Erro ao fazer predição: {e}")
+            return {'erro': str(e)}
+    
+    def prever_lote(self, codigos: list = None) -> dict:
+        """
+        Prediz vários códigos com uma única carga do modelo e uma única chamada
+        de predict_proba
+        
+        A última linha refinada de cada código vem de uma consulta com
+        row_number() particionado por código.
+        
+        Args:
+            codigos: Códigos a prever (None = todos os códigos com dados refinados)
+        
+        Returns:
+            dict com predições por código e erros
+        """
+        try:
+            carregado = self._carregar_modelo_ativo()
+            if 'erro' in carregado:
+                return carregado
+            
+            dados = self._buscar_ultimos_refinados(codigos)
+            por_codigo = {d.codigo: d for d in dados}
+            
+            if codigos is None:
+                codigos = sorted(por_codigo)
+            erros = {c: f'Dados não encontrados para {c}' for c in codigos if c not in por_codigo}
+            dados = [por_codigo[c] for c in codigos if c in por_codigo]
+            
+            predicoes = []
+            if dados:
+                X_scaled = carregado['scaler'].transform(self._matriz_features(dados, carregado['features'], carregado['motor_gb'] == 'exato'))
+                probabilidades = carregado['modelo'].predict_proba(X_scaled)
+                predicoes = [
+                    self._montar_predicao(dado, carregado['modelo'].classes_, proba)
+                    for dado, proba in zip(dados, probabilidades)
+                ]
             
             return {
-                'codigo': codigo,
-                'nome': dado.nome,
-                'recomendacao': recomendacao,
-                'confianca': round(confianca, 2),
-                'probabilidades': {
-                    'vender': round(probabilidades[0] * 100, 2) if len(probabilidades) > 0 else 0,
-                    'manter': round(probabilidades[1] * 100, 2) if len(probabilidades) > 1 else 0,
-                    'comprar': round(probabilidades[2] * 100, 2) if len(probabilidades) > 2 else 0
-                },
-                'dados_utilizados': {
-                    'participacao': dado.participacao_pct,
-                    'qtde_teorica': dado.qtde_teorica,
-                    'tipo': 'ON' if dado.tipo_on else 'PN',
-                    'variacao_percentual': dado.variacao_percentual,
-                    'media_movel_7d': dado.media_movel_7d,
-                    'volatilidade': dado.volatilidade
-                }
+                'total': len(predicoes),
+                'versao_modelo': carregado['versao'],
+                'predicoes': predicoes,
+                'erros': erros
             }
             
         except Exception as e:
-            logger.error(f"Erro ao fazer predição: {e}")
+            logger.error(f"Erro ao fazer predição em lote: {e}")
             return {'erro': str(e)}
     
+    def _carregar_modelo_ativo(self) -> dict:
+        """
+        Ensemble do modelo ativo, do cache do processo
+        
+        A cada chamada só a versão ativa é consultada no banco; o .pkl é lido
+        de novo apenas quando ela muda (novo treino em qualquer processo).
+        Com ML_MODELO_MMAP=r os arrays numpy do .pkl são mapeados em memória
+        (joblib mmap_mode) em vez de copiados.
+        
+        Returns:
+            dict com modelo, scaler, features e versao, ou {'erro': ...}
+        """
+        modelo_db = db.session.query(ModeloTreinado.versao, ModeloTreinado.caminho_modelo)\
+            .filter_by(ativo=True)\
+            .order_by(ModeloTreinado.data_treinamento.desc())\
+            .first()
+        
+        if not modelo_db:
+            return {'erro': 'Nenhum modelo treinado disponível'}
+        
+        carregado = _ENSEMBLE_CACHE.get(modelo_db.versao)
+        if carregado is not None:
+            return carregado
+        
+        with _ENSEMBLE_LOCK:
+            carregado = _ENSEMBLE_CACHE.get(modelo_db.versao)
+            if carregado is not None:
+                return carregado
+            
+            try:
+                modelo_data = joblib.load(modelo_db.caminho_modelo, mmap_mode=os.environ.get('ML_MODELO_MMAP') or None)
+            except Exception as load_error:
+                if 'numpy._core' in str(load_error):
+                    return {'erro': 'Modelo incompatível com versão atual do numpy. Treine um novo modelo.'}
+                return {'erro': f'Erro ao carregar modelo: {str(load_error)}'}
+            
+            return self._registrar_em_cache(modelo_db.versao, modelo_data)
+    
+    @staticmethod
+    def _registrar_em_cache(versao: str, modelo_data: dict) -> dict:
+        # Só o modelo ativo fica em memória: versões anteriores são descartadas
+        carregado = {
+            'modelo': modelo_data['modelo'],
+            'scaler': modelo_data['scaler'],
+            'features': modelo_data['features'],
+            # .pkl anteriores ao motor histograma foram treinados com fillna(0)
+            'motor_gb': modelo_data.get('motor_gb', 'exato'),
+            'versao': versao
+        }
+        _ENSEMBLE_CACHE.clear()
+        _ENSEMBLE_CACHE[versao] = carregado
+        return carregado
+    
+    def aquecer_cache(self) -> dict:
+        """
+        Carrega o ensemble ativo no cache do processo
+        
+        Returns:
+            dict com a versão carregada e o tempo, ou {'erro': ...}
+        """
+        inicio = time.perf_counter()
+        carregado = self._carregar_modelo_ativo()
+        if 'erro' in carregado:
+            return carregado
+        return {'versao': carregado['versao'], 'tempo_segundos': round(time.perf_counter() - inicio, 2)}
+    
+    def _buscar_ultimos_refinados(self, codigos: list = None) -> list:
+        """
+        Última linha de DadosRefinados de cada código, em uma consulta
+        
+        Args:
+            codigos: Códigos desejados (None = todos)
+        
+        Returns:
+            Lista de DadosRefinados
+        """
+        posicao = db.func.row_number().over(
+            partition_by=DadosRefinados.codigo,
+            order_by=DadosRefinados.data_referencia.desc()
+        ).label('posicao')
+        
+        sub = db.session.query(DadosRefinados.id, posicao)
+        if codigos is not None:
+            sub = sub.filter(DadosRefinados.codigo.in_(codigos))
+        sub = sub.subquery()
+        
+        return DadosRefinados.query\
+            .join(sub, sub.c.id == DadosRefinados.id)\
+            .filter(sub.c.posicao == 1)\
+            .all()
+    
+    @staticmethod
+    def _matriz_features(dados: list, features: list, preencher_nulos: bool = True) -> pd.DataFrame:
+        # Mesmas colunas (e nomes) usadas no fit do scaler; sem preencher, nulos viram NaN
+        nulo = 0 if preencher_nulos else np.nan
+        return pd.DataFrame([
+            [
+                nulo if valor is None else valor
+                for valor in (
+                    dado.participacao_pct,
+                    dado.qtde_teorica,
+                    dado.tipo_on,
+                    dado.tipo_pn,
+                    dado.variacao_percentual,
+                    dado.media_movel_7d,
+                    dado.volatilidade
+                )
+            ]
+            for dado in dados
+        ], columns=features, dtype=float)
+    
+    @staticmethod
+    def _montar_predicao(dado: DadosRefinados, classes, probabilidades) -> dict:
+        # Voting soft: predict() é o argmax das probabilidades médias
+        predicao = classes[int(np.argmax(probabilidades))]
+        
+        if predicao == 2:
+            recomendacao = 'COMPRAR'
+        elif predicao == 1:
+            recomendacao = 'MANTER'
+        else:
+            recomendacao = 'VENDER'
+            
+        confianca = max(probabilidades) * 100
+        
+        return {
+            'codigo': dado.codigo,
+            'nome': dado.nome,
+            'recomendacao': recomendacao,
+            'confianca': round(confianca, 2),
+            'probabilidades': {
+                'vender': round(probabilidades[0] * 100, 2) if len(probabilidades) > 0 else 0,
+                'manter': round(probabilidades[1] * 100, 2) if len(probabilidades) > 1 else 0,
+                'comprar': round(probabilidades[2] * 100, 2) if len(probabilidades) > 2 else 0
+            },
+            'dados_utilizados': {
+                'participacao': dado.participacao_pct,
+                'qtde_teorica': dado.qtde_teorica,
+                'tipo': 'ON' if dado.tipo_on else 'PN',
+                'variacao_percentual': dado.variacao_percentual,
+                'media_movel_7d': dado.media_movel_7d,
+                'volatilidade': dado.volatilidade
+            }
+        }
+    
     def obter_metricas(self) -> dict:
        
         try:
@@ -548,147 +1128,34 @@ class MLService:
         except Exception as e:
             logger.error(f"Erro ao obter métricas: {e}")
             return {'erro': str(e)}
-    
-    
-    def _calcular_variacao(self, codigo: str, data_atual) -> float:
-        try:
-            dia_anterior = data_atual - timedelta(days=1)
-            ativo_anterior = IbovAtivo.query.filter_by(
-                codigo=codigo, data=dia_anterior
-            ).first()
-            
-            if ativo_anterior:
-                part_atual = float(IbovAtivo.query.filter_by(
-                    codigo=codigo, data=data_atual
-                ).first().participacao.replace(',', '.'))
-                
-                part_anterior = float(ativo_anterior.participacao.replace(',', '.'))
-                
-                return ((part_atual - part_anterior) / part_anterior) * 100
-        except:
-            pass
-        return None
-    
-    def _calcular_media_movel(self, codigo: str, data_atual, dias=7) -> float:
-        try:
-            data_inicio = data_atual - timedelta(days=dias)
-            ativos = IbovAtivo.query.filter(
-                IbovAtivo.codigo == codigo,
-                IbovAtivo.data >= data_inicio,
-                IbovAtivo.data <= data_atual
-            ).all()
-            
-            if ativos:
-                participacoes = [float(a.participacao.replace(',', '.')) for a in ativos]
-                return sum(participacoes) / len(participacoes)
-        except:
-            pass
-        return None
-    
-    def _calcular_volatilidade(self, codigo: str, data_atual, dias=7) -> float:
-        try:
-            data_inicio = data_atual - timedelta(days=dias)
-            ativos = IbovAtivo.query.filter(
-                IbovAtivo.codigo == codigo,
-                IbovAtivo.data >= data_inicio,
-                IbovAtivo.data <= data_atual
-            ).all()
-            
-            if len(ativos) > 1:
-                participacoes = [float(a.participacao.replace(',', '.')) for a in ativos]
-                return float(np.std(participacoes))
-        except:
-            pass
+
+
+def _avaliar_fold(X: np.ndarray, y: np.ndarray, parametros: dict, treino: np.ndarray, teste: np.ndarray,
+                  motor_gb: str = 'exato'):
+    """
+    Treina o ensemble em um fold e retorna o F1 ponderado na validação (None se falhar)
+    """
+    try:
+        scaler = RobustScaler()
+        with warnings.catch_warnings():
+            # Motor histograma: no início da série uma feature pode estar toda em NaN no fold
+            warnings.simplefilter('ignore', RuntimeWarning)
+            X_treino = scaler.fit_transform(X[treino])
+        # Um processo por fold: paralelismo interno desligado para não disputar núcleos
+        modelo = MLService._criar_ensemble(BUSCA_RANDOM_STATE, parametros, n_jobs=1, motor_gb=motor_gb)
+        modelo.fit(X_treino, y[treino])
+        y_pred = modelo.predict(scaler.transform(X[teste]))
+        return float(f1_score(y[teste], y_pred, average='weighted', zero_division=0))
+    except Exception as e:
+        logger.warning(f"Fold da busca descartado: {e}")
         return None
 
-    def _calcular_rsi(self, codigo: str, data_atual, periodo=14) -> float:
-        try:
-            data_inicio = data_atual - timedelta(days=periodo + 5)
-            ativos = IbovAtivo.query.filter(
-                IbovAtivo.codigo == codigo,
-                IbovAtivo.data >= data_inicio,
-                IbovAtivo.data <= data_atual
-            ).order_by(IbovAtivo.data).all()
-            
-            if len(ativos) >= periodo:
-                precos = [float(a.participacao.replace(',', '.')) for a in ativos]
-                
-                deltas = [precos[i] - precos[i-1] for i in range(1, len(precos))]
-                
-                ganhos = [d if d > 0 else 0 for d in deltas]
-                perdas = [-d if d < 0 else 0 for d in deltas]
-                
-                if len(ganhos) >= periodo and len(perdas) >= periodo:
-                    avg_ganho = sum(ganhos[-periodo:]) / periodo
-                    avg_perda = sum(perdas[-periodo:]) / periodo
-                    
-                    if avg_perda != 0:
-                        rs = avg_ganho / avg_perda
-                        rsi = 100 - (100 / (1 + rs))
-                        return rsi
-        except:
-            pass
-        return 50.0  
-    
-    def _calcular_momentum(self, codigo: str, data_atual, periodo=5) -> float:
-        try:
-            data_inicio = data_atual - timedelta(days=periodo + 2)
-            ativos = IbovAtivo.query.filter(
-                IbovAtivo.codigo == codigo,
-                IbovAtivo.data >= data_inicio,
-                IbovAtivo.data <= data_atual
-            ).order_by(IbovAtivo.data).all()
-            
-            if len(ativos) >= periodo + 1:
-                preco_atual = float(ativos[-1].participacao.replace(',', '.'))
-                preco_anterior = float(ativos[-(periodo+1)].participacao.replace(',', '.'))
-                
-                if preco_anterior != 0:
-                    momentum = ((preco_atual - preco_anterior) / preco_anterior) * 100
-                    return momentum
-        except:
-            pass
-        return 0.0
-    
-    def _calcular_ranking_participacao(self, ativo_atual, todos_ativos) -> int:
-        try:
-            participacoes = []
-            for ativo in todos_ativos:
-                if ativo.data == ativo_atual.data:
-                    try:
-                        part = float(ativo.participacao.replace(',', '.'))
-                        participacoes.append((ativo.codigo, part))
-                    except:
-                        participacoes.append((ativo.codigo, 0.0))
-            
-            participacoes.sort(key=lambda x: x[1], reverse=True)
-            
-            for i, (codigo, _) in enumerate(participacoes):
-                if codigo == ativo_atual.codigo:
-                    return i + 1  # Posição 1-based
-                    
-        except:
-            pass
-        return 50  
-    
-    def _calcular_ranking_volume(self, ativo_atual, todos_ativos) -> int:
-        try:
-            volumes = []
-            for ativo in todos_ativos:
-                if ativo.data == ativo_atual.data:
-                    try:
-                        vol_str = ativo.theoricalQty.replace('.', '').replace(',', '.')
-                        vol = float(vol_str)
-                        volumes.append((ativo.codigo, vol))
-                    except:
-                        volumes.append((ativo.codigo, 0.0))
-            
-            volumes.sort(key=lambda x: x[1], reverse=True)
-            
-            for i, (codigo, _) in enumerate(volumes):
-                if codigo == ativo_atual.codigo:
-                    return i + 1
-                    
-        except:
-            pass
-        return 50  
+
+def _inicializar_worker_busca(X: np.ndarray, y: np.ndarray):
+    global _DADOS_BUSCA
+    _DADOS_BUSCA = (X, y)
+
+
+def _avaliar_fold_no_worker(parametros: dict, treino: np.ndarray, teste: np.ndarray, motor_gb: str):
+    X, y = _DADOS_BUSCA
+    return _avaliar_fold(X, y, parametros, treino, teste, motor_gb)
@@ -1,13 +1,19 @@
-import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from app.models.ibov_model import IbovAtivo
 from app.models.stock_data_model import StockData
+from app.utils.db_utils import inserir_ignorando_conflitos, inserir_ou_atualizar
 from app.utils.extensions import db
 
 logger = logging.getLogger(__name__)
 
+# Barras já salvas que a atualização incremental baixa de novo (correções de ajuste)
+OVERLAP_DIAS_PADRAO = 5
+
 
 class StockDataService:
     """
@@ -15,7 +21,48 @@ class StockDataService:
     """
     
     @staticmethod
-    def coletar_dados_historicos(symbol: str, start_date: str = None, end_date: str = None, period: str = None) -> dict:
+    def baixar_historico(symbol: str, start_date: str = None, end_date: str = None, period: str = None) -> pd.DataFrame:
+        """
+        Baixa o histórico de uma ação do Yahoo Finance (downloader padrão)
+        
+        Args:
+            symbol: Símbolo da ação
+            start_date: Data inicial 'YYYY-MM-DD' (opcional se usar period)
+            end_date: Data final 'YYYY-MM-DD' (opcional)
+            period: Período relativo ('1mo', '3mo', '6mo', '1y', '2y', '5y', 'max')
+        
+        Returns:
+            DataFrame indexado por Date com colunas OHLCV
+        """
+        # Importado sob demanda: yfinance é pesado e só as coletas precisam dele
+        import yfinance as yf
+        
+        # Criar objeto Ticker
+        ticker = yf.Ticker(symbol)
+        
+        # Se usar period, usar método history com period
+        if period:
+            logger.info(f"Coletando dados de {symbol} com período: {period}")
+            return ticker.history(period=period, auto_adjust=False)
+        
+        # Se não especificar datas, usar período padrão de 2 anos
+        if start_date is None and end_date is None:
+            logger.info(f"Coletando dados de {symbol} com período padrão: 2y")
+            return ticker.history(period='2y', auto_adjust=False)
+        
+        # Usar datas especificadas
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+        if start_date is None:
+            start_date = (datetime.now() - timedelta(days=730)).strftime('%Y-%m-%d')
+        
+        logger.info(f"Coletando dados de {symbol} de {start_date} até {end_date}")
+        return ticker.history(start=start_date, end=end_date, auto_adjust=False)
+    
+    @staticmethod
+    def coletar_dados_historicos(symbol: str, start_date: str = None, end_date: str = None, period: str = None,
+                                 downloader=None, incremental: bool = False,
+                                 overlap_dias: int = OVERLAP_DIAS_PADRAO) -> dict:
         """
         Coleta dados históricos de uma ação do Yahoo Finance
         
@@ -24,33 +71,169 @@ class StockDataService:
             start_date: Data inicial no formato 'YYYY-MM-DD' (opcional se usar period)
             end_date: Data final no formato 'YYYY-MM-DD' (opcional, padrão: hoje)
             period: Período relativo ('1mo', '3mo', '6mo', '1y', '2y', '5y', 'max')
+            downloader: Função com a assinatura de baixar_historico (padrão: yfinance)
+            incremental: Se True, baixa apenas a partir da última data salva (menos overlap_dias)
+            overlap_dias: Dias já salvos que são baixados de novo e sobrescritos (ajustes de preço)
         
         Returns:
             dict com informações sobre a coleta
         """
         try:
-            # Criar objeto Ticker
-            ticker = yf.Ticker(symbol)
+            downloader = downloader or StockDataService.baixar_historico
             
-            # Se usar period, usar método history com period
-            if period:
-                logger.info(f"Coletando dados de {symbol} com período: {period}")
-                df = ticker.history(period=period, auto_adjust=False)
-            else:
-                # Se não especificar datas, usar período padrão de 2 anos
-                if start_date is None and end_date is None:
-                    logger.info(f"Coletando dados de {symbol} com período padrão: 2y")
-                    df = ticker.history(period='2y', auto_adjust=False)
-                else:
-                    # Usar datas especificadas
-                    if end_date is None:
-                        end_date = datetime.now().strftime('%Y-%m-%d')
-                    if start_date is None:
-                        start_date = (datetime.now() - timedelta(days=730)).strftime('%Y-%m-%d')
+            ultima_data = None
+            if incremental:
+                ultima_data = db.session.query(db.func.max(StockData.date))\
+                    .filter(StockData.symbol == symbol).scalar()
+                if ultima_data is not None:
+                    start_date, end_date, period = StockDataService._janela_incremental(ultima_data, overlap_dias)
+            
+            inicio = time.perf_counter()
+            df = downloader(symbol, start_date=start_date, end_date=end_date, period=period)
+            tempo_download = time.perf_counter() - inicio
+            
+            return StockDataService._salvar_historico(symbol, df, tempo_download, ultima_data=ultima_data)
+            
+        except Exception as e:
+            logger.error(f"Erro ao coletar dados: {e}")
+            db.session.rollback()
+            return {
+                'erro': f'Erro ao coletar dados: {str(e)}',
+                'symbol': symbol
+            }
+    
+    @staticmethod
+    def coletar_dados_lote(symbols: list = None, start_date: str = None, end_date: str = None,
+                           period: str = None, max_workers: int = 8, downloader=None,
+                           incremental: bool = False, overlap_dias: int = OVERLAP_DIAS_PADRAO,
+                           progresso=None) -> dict:
+        """
+        Coleta dados históricos de vários símbolos com downloads concorrentes
+        
+        Os downloads rodam em um pool limitado de threads; a gravação é feita na
+        thread da requisição, com um insert em lote por símbolo.
+        
+        Args:
+            symbols: Lista de símbolos (None = carteira atual do IBOV em ibov_ativos)
+            start_date: Data inicial 'YYYY-MM-DD'
+            end_date: Data final 'YYYY-MM-DD'
+            period: Período relativo
+            max_workers: Número máximo de downloads simultâneos
+            downloader: Função com a assinatura de baixar_historico (padrão: yfinance)
+            incremental: Se True, cada símbolo baixa só a partir da sua última data salva
+            overlap_dias: Dias já salvos que são baixados de novo e sobrescritos
+            progresso: Callable progresso(atual, total, descricao) chamado a cada símbolo (opcional)
+        
+        Returns:
+            dict com resultado por símbolo
+        """
+        try:
+            downloader = downloader or StockDataService.baixar_historico
+            
+            if not symbols:
+                symbols = StockDataService.listar_symbols_ibov()
+                if not symbols:
+                    return {'erro': 'Nenhum ativo IBOV encontrado. Execute /ibov/scrap primeiro.'}
+            
+            symbols = list(dict.fromkeys(s.upper() for s in symbols))
+            inicio_total = time.perf_counter()
+            
+            # Última data salva de cada símbolo (uma consulta)
+            ultimas_datas = {}
+            if incremental:
+                ultimas_datas = dict(
+                    db.session.query(StockData.symbol, db.func.max(StockData.date))
+                    .filter(StockData.symbol.in_(symbols))
+                    .group_by(StockData.symbol)
+                    .all()
+                )
+            
+            def baixar(symbol):
+                janela = (start_date, end_date, period)
+                if symbol in ultimas_datas:
+                    janela = StockDataService._janela_incremental(ultimas_datas[symbol], overlap_dias)
+                
+                inicio = time.perf_counter()
+                df = downloader(symbol, start_date=janela[0], end_date=janela[1], period=janela[2])
+                return df, time.perf_counter() - inicio
+            
+            resultados = []
+            erros = []
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as executor:
+                futuros = {executor.submit(baixar, symbol): symbol for symbol in symbols}
+                
+                for futuro in as_completed(futuros):
+                    symbol = futuros[futuro]
+                    try:
+                        df, tempo_download = futuro.result()
+                        resultado = StockDataService._salvar_historico(
+                            symbol, df, tempo_download, ultima_data=ultimas_datas.get(symbol)
+                        )
+                    except Exception as e:
+                        logger.error(f"Erro ao coletar {symbol}: {e}")
+                        db.session.rollback()
+                        resultado = {'erro': f'Erro ao coletar dados: {str(e)}', 'symbol': symbol}
                     
-                    logger.info(f"Coletando dados de {symbol} de {start_date} até {end_date}")
-                    df = ticker.history(start=start_date, end=end_date, auto_adjust=False)
+                    if 'erro' in resultado:
+                        erros.append({'symbol': symbol, 'erro': resultado['erro']})
+                    else:
+                        resultados.append(resultado)
+                    
+                    if progresso is not None:
+                        progresso(len(resultados) + len(erros), len(symbols), symbol)
+            
+            return {
+                'mensagem': f'Coleta em lote concluída: {len(resultados)} de {len(symbols)} símbolos',
+                'total_symbols': len(symbols),
+                'total_inseridos': sum(r['estatisticas']['registros_inseridos'] for r in resultados),
+                'tempo_total_segundos': round(time.perf_counter() - inicio_total, 4),
+                'resultados': sorted(resultados, key=lambda r: r['symbol']),
+                'erros': erros
+            }
             
+        except Exception as e:
+            logger.error(f"Erro na coleta em lote: {e}")
+            db.session.rollback()
+            return {'erro': f'Erro na coleta em lote: {str(e)}'}
+    
+    @staticmethod
+    def listar_symbols_ibov() -> list:
+        """
+        Símbolos Yahoo Finance (sufixo .SA) da carteira IBOV mais recente em ibov_ativos
+        """
+        ultima_data = db.session.query(db.func.max(IbovAtivo.data)).scalar()
+        if ultima_data is None:
+            return []
+        
+        codigos = db.session.query(IbovAtivo.codigo)\
+            .filter(IbovAtivo.data == ultima_data)\
+            .distinct()\
+            .all()
+        
+        return sorted(f'{c[0]}.SA' for c in codigos)
+    
+    @staticmethod
+    def _janela_incremental(ultima_data, overlap_dias: int) -> tuple:
+        """
+        (start_date, end_date, period) para baixar só as barras após ultima_data
+        
+        Os últimos overlap_dias já salvos entram de novo na janela para capturar
+        correções de preço ajustado; o end do yfinance é exclusivo, por isso amanhã.
+        """
+        start_date = (ultima_data - timedelta(days=overlap_dias)).strftime('%Y-%m-%d')
+        end_date = (datetime.now().date() + timedelta(days=1)).strftime('%Y-%m-%d')
+        return start_date, end_date, None
+    
+    @staticmethod
+    def _salvar_historico(symbol: str, df: pd.DataFrame, tempo_download: float, ultima_data=None) -> dict:
+        """
+        Persiste o DataFrame baixado com um insert em lote e monta a resposta da coleta
+        
+        Com ultima_data (modo incremental), as barras até essa data sobrescrevem as
+        já salvas (upsert) e as posteriores são inseridas.
+        """
+        try:
             if df is None or df.empty:
                 logger.error(f"Nenhum dado retornado para {symbol}")
                 return {
@@ -66,42 +249,33 @@ class StockDataService:
             data_inicio = df['Date'].min().strftime('%Y-%m-%d')
             data_fim = df['Date'].max().strftime('%Y-%m-%d')
             
-            registros_inseridos = 0
-            registros_duplicados = 0
-            
-            # Inserir dados no banco
-            for _, row in df.iterrows():
-                try:
-                    # Verificar se já existe
-                    existing = StockData.query.filter_by(
-                        symbol=symbol,
-                        date=row['Date'].date()
-                    ).first()
-                    
-                    if existing:
-                        registros_duplicados += 1
-                        continue
-                    
-                    # Criar novo registro
-                    stock_data = StockData(
-                        symbol=symbol,
-                        date=row['Date'].date(),
-                        open=float(row['Open']),
-                        high=float(row['High']),
-                        low=float(row['Low']),
-                        close=float(row['Close']),
-                        volume=int(row['Volume']),
-                        adj_close=float(row['Adj Close']) if 'Adj Close' in row else float(row['Close'])
-                    )
-                    
-                    db.session.add(stock_data)
-                    registros_inseridos += 1
-                    
-                except Exception as e:
-                    logger.error(f"Erro ao inserir registro: {e}")
-                    continue
+            # Montar registros de forma vetorizada
+            inicio = time.perf_counter()
+            registros = StockDataService._montar_registros(symbol, df)
+            tempo_preparacao = time.perf_counter() - inicio
             
+            inicio = time.perf_counter()
+            registros_atualizados = 0
+            
+            if ultima_data is not None:
+                # Janela de overlap: sobrescreve as barras já salvas
+                overlap = [r for r in registros if r['date'] <= ultima_data]
+                novos = [r for r in registros if r['date'] > ultima_data]
+                registros_atualizados = inserir_ou_atualizar(
+                    StockData, overlap, index_elements=['symbol', 'date'],
+                    colunas_atualizar=['open', 'high', 'low', 'close', 'volume', 'adj_close']
+                )
+            else:
+                novos = registros
+            
+            # Inserir dados no banco (INSERT ... ON CONFLICT DO NOTHING em lotes)
+            registros_inseridos = inserir_ignorando_conflitos(
+                StockData, novos, index_elements=['symbol', 'date']
+            )
             db.session.commit()
+            tempo_escrita = time.perf_counter() - inicio
+            
+            registros_duplicados = len(novos) - registros_inseridos
             
             logger.info(f"Coleta concluída: {registros_inseridos} inseridos, {registros_duplicados} duplicados")
             
@@ -115,7 +289,14 @@ class StockDataService:
                 'estatisticas': {
                     'total_registros': len(df),
                     'registros_inseridos': registros_inseridos,
-                    'registros_duplicados': registros_duplicados
+                    'registros_duplicados': registros_duplicados,
+                    'registros_atualizados': registros_atualizados
+                },
+                'incremental': ultima_data is not None,
+                'tempos_segundos': {
+                    'download': round(tempo_download, 4),
+                    'preparacao': round(tempo_preparacao, 4),
+                    'escrita': round(tempo_escrita, 4)
                 }
             }
             
@@ -127,6 +308,34 @@ class StockDataService:
                 'symbol': symbol
             }
     
+    @staticmethod
+    def _montar_registros(symbol: str, df: pd.DataFrame) -> list:
+        """
+        Converte o DataFrame do yfinance em dicts prontos para o insert em lote
+        
+        Args:
+            symbol: Símbolo da ação
+            df: DataFrame com coluna Date e colunas OHLCV
+        
+        Returns:
+            Lista de dicts com as colunas de StockData
+        """
+        df = df.dropna(subset=['Open', 'High', 'Low', 'Close', 'Volume'])
+        adj_close = df['Adj Close'] if 'Adj Close' in df.columns else df['Close']
+        
+        registros = pd.DataFrame({
+            'symbol': symbol,
+            'date': pd.to_datetime(df['Date']).dt.date,
+            'open': df['Open'].astype(float),
+            'high': df['High'].astype(float),
+            'low': df['Low'].astype(float),
+            'close': df['Close'].astype(float),
+            'volume': df['Volume'].astype('int64'),
+            'adj_close': adj_close.astype(float)
+        })
+        
+        return registros.astype(object).to_dict('records')
+    
     @staticmethod
     def obter_dados_symbol(symbol: str, limit: int = 100) -> dict:
         """
@@ -251,6 +460,7 @@ class StockDataService:
             dict com informações da empresa
         """
         try:
+            import yfinance as yf
             ticker = yf.Ticker(symbol)
             info = ticker.info
             
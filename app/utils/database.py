@@ -0,0 +1,96 @@
+"""
+Configuração do banco (URI, pool de conexões e pragmas do SQLite)
+
+A URI vem de SQLALCHEMY_DATABASE_URI no ambiente (padrão: instance/dados.db).
+Em SQLite, cada conexão nova recebe WAL, synchronous=NORMAL, cache e mmap
+maiores e busy_timeout, de modo que leituras não esperam pelas escritas da
+coleta/treino e escritas concorrentes aguardam o lock em vez de falhar.
+"""
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DATABASE_URI_PADRAO = 'sqlite:///dados.db'
+
+
+def _config_int(nome: str, padrao: int) -> int:
+    return int(os.environ.get(nome, padrao))
+
+
+def pragmas_sqlite() -> dict:
+    """
+    Pragmas aplicados a cada conexão SQLite (ajustáveis por variável de ambiente)
+
+    Returns:
+        dict pragma -> valor, vazio se SQLITE_AJUSTES=0 (ex.: banco em
+        sistema de arquivos de rede, onde WAL não funciona)
+    """
+    if os.environ.get('SQLITE_AJUSTES', '1') == '0':
+        return {}
+
+    return {
+        'journal_mode': 'WAL',
+        # Em WAL, NORMAL só sincroniza no checkpoint: seguro contra corrupção,
+        # pode perder as últimas transações em queda de energia
+        'synchronous': 'NORMAL',
+        # Valor negativo = KiB
+        'cache_size': -_config_int('SQLITE_CACHE_SIZE_KB', 64 * 1024),
+        'mmap_size': _config_int('SQLITE_MMAP_SIZE_MB', 256) * 1024 * 1024,
+        'busy_timeout': _config_int('SQLITE_BUSY_TIMEOUT_MS', 30000),
+        'temp_store': 'MEMORY'
+    }
+
+
+@event.listens_for(Engine, 'connect')
+def _aplicar_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, valor in pragmas_sqlite().items():
+            cursor.execute(f'PRAGMA {pragma}={valor}')
+    finally:
+        cursor.close()
+
+
+def configurar_banco(app, database_uri: str = None):
+    """
+    Define URI e opções do engine na configuração da app (antes de db.init_app)
+
+    Args:
+        app: Aplicação Flask
+        database_uri: URI explícita; senão SQLALCHEMY_DATABASE_URI do ambiente
+            ou o SQLite padrão
+
+    O pool é por processo (cada worker do gunicorn cria o seu): tamanho em
+    SQLALCHEMY_POOL_SIZE / SQLALCHEMY_MAX_OVERFLOW.
+    """
+    uri = database_uri or os.environ.get('SQLALCHEMY_DATABASE_URI', DATABASE_URI_PADRAO)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    opcoes = {
+        'pool_size': _config_int('SQLALCHEMY_POOL_SIZE', 5),
+        'max_overflow': _config_int('SQLALCHEMY_MAX_OVERFLOW', 10),
+        'pool_timeout': _config_int('SQLALCHEMY_POOL_TIMEOUT', 30)
+    }
+
+    if uri.startswith('sqlite'):
+        if ':memory:' in uri or uri.rstrip('/') == 'sqlite:':
+            # Banco em memória: pool padrão do SQLAlchemy (uma conexão compartilhada)
+            opcoes = {}
+        else:
+            # O busy timeout do driver (segundos) cobre também a abertura da conexão;
+            # conexões do pool são usadas por threads diferentes (uma por vez)
+            opcoes['connect_args'] = {
+                'timeout': _config_int('SQLITE_BUSY_TIMEOUT_MS', 30000) / 1000,
+                'check_same_thread': False
+            }
+    else:
+        opcoes['pool_pre_ping'] = True
+        opcoes['pool_recycle'] = _config_int('SQLALCHEMY_POOL_RECYCLE', 1800)
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes
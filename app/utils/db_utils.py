@@ -0,0 +1,101 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.utils.extensions import db
+
+
+def inserir_ignorando_conflitos(model, registros: list, index_elements: list, chunk_size: int = 1000) -> int:
+    """
+    Insere registros em lote com INSERT ... ON CONFLICT DO NOTHING
+
+    Args:
+        model: Classe do modelo SQLAlchemy
+        registros: Lista de dicts com as colunas a inserir
+        index_elements: Colunas da restrição única usada para detectar conflito
+        chunk_size: Quantidade de registros por statement
+
+    Returns:
+        Número de registros efetivamente inseridos
+    """
+    if not registros:
+        return 0
+
+    dialeto = db.session.get_bind().dialect.name
+    inseridos = 0
+
+    for inicio in range(0, len(registros), chunk_size):
+        chunk = registros[inicio:inicio + chunk_size]
+
+        if dialeto == 'sqlite':
+            stmt = sqlite.insert(model.__table__).on_conflict_do_nothing(index_elements=index_elements)
+        elif dialeto == 'postgresql':
+            stmt = postgresql.insert(model.__table__).on_conflict_do_nothing(index_elements=index_elements)
+        else:
+            # Sem suporte a ON CONFLICT: descarta as chaves já existentes antes de inserir
+            chunk = _remover_existentes(model, chunk, index_elements)
+            if not chunk:
+                continue
+            stmt = db.insert(model.__table__)
+
+        resultado = db.session.execute(stmt, chunk)
+        inseridos += max(resultado.rowcount, 0)
+
+    return inseridos
+
+
+def _remover_existentes(model, registros: list, index_elements: list) -> list:
+    colunas = [getattr(model, c) for c in index_elements]
+    primeira = colunas[0]
+    valores = {r[index_elements[0]] for r in registros}
+
+    existentes = {
+        tuple(linha)
+        for linha in db.session.query(*colunas).filter(primeira.in_(valores)).all()
+    }
+
+    return [r for r in registros if tuple(r[c] for c in index_elements) not in existentes]
+
+
+def inserir_ou_atualizar(model, registros: list, index_elements: list, colunas_atualizar: list,
+                         chunk_size: int = 1000) -> int:
+    """
+    Insere registros em lote e sobrescreve colunas dos que já existem (upsert)
+
+    Args:
+        model: Classe do modelo SQLAlchemy
+        registros: Lista de dicts com as colunas a inserir
+        index_elements: Colunas da restrição única usada para detectar conflito
+        colunas_atualizar: Colunas sobrescritas quando o registro já existe
+        chunk_size: Quantidade de registros por statement
+
+    Returns:
+        Número de registros inseridos ou atualizados
+    """
+    if not registros:
+        return 0
+
+    dialeto = db.session.get_bind().dialect.name
+    afetados = 0
+
+    for inicio in range(0, len(registros), chunk_size):
+        chunk = registros[inicio:inicio + chunk_size]
+
+        if dialeto in ('sqlite', 'postgresql'):
+            insert = sqlite.insert if dialeto == 'sqlite' else postgresql.insert
+            stmt = insert(model.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={c: stmt.excluded[c] for c in colunas_atualizar}
+            )
+            resultado = db.session.execute(stmt, chunk)
+            afetados += max(resultado.rowcount, 0)
+        else:
+            # Sem suporte a ON CONFLICT: remove as chaves existentes e reinsere
+            chaves = [getattr(model, c) for c in index_elements]
+            for registro in chunk:
+                db.session.query(model).filter(
+                    *[coluna == registro[c] for coluna, c in zip(chaves, index_elements)]
+                ).delete(synchronize_session=False)
+            db.session.execute(db.insert(model.__table__), chunk)
+            afetados += len(chunk)
+
+    return afetados
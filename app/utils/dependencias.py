@@ -0,0 +1,62 @@
+"""
+Dependências opcionais e pesadas (TensorFlow, scikit-learn, yfinance)
+
+São importadas só no primeiro uso dos endpoints que precisam delas; aqui
+apenas se verifica se estão instaladas (importlib.util.find_spec não executa
+o módulo), para a tabela de rotas ficar estática e a inicialização leve.
+"""
+from functools import lru_cache, wraps
+import importlib.util
+
+from flask import jsonify
+
+# Comando de instalação sugerido quando a dependência falta
+INSTALACAO = {
+    'tensorflow': 'pip install tensorflow==2.15.0 protobuf==3.20.3',
+    'sklearn': 'pip install scikit-learn==1.3.0',
+    'yfinance': 'pip install yfinance==0.2.32',
+    'tflite_runtime': 'pip install tflite-runtime==2.14.0',
+    'h5py': 'pip install h5py==3.10.0'
+}
+
+
+@lru_cache(maxsize=None)
+def modulo_disponivel(nome: str) -> bool:
+    """
+    Indica se o módulo está instalado, sem importá-lo
+
+    Args:
+        nome: Nome do módulo de topo (ex.: 'tensorflow')
+
+    Returns:
+        True se o módulo pode ser importado
+    """
+    try:
+        return importlib.util.find_spec(nome) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def modulos_faltantes(*modulos: str) -> list:
+    return [m for m in modulos if not modulo_disponivel(m)]
+
+
+def requer_modulos(*modulos: str):
+    """
+    Decorador de rota: responde 503 se algum dos módulos não estiver instalado
+
+    A rota continua registrada (tabela estática); o import pesado fica a cargo
+    do controller, no primeiro uso.
+    """
+    def decorador(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            faltantes = modulos_faltantes(*modulos)
+            if faltantes:
+                return jsonify({
+                    'erro': f'Dependência não instalada: {", ".join(faltantes)}',
+                    'instalacao': [INSTALACAO.get(m, f'pip install {m}') for m in faltantes]
+                }), 503
+            return func(*args, **kwargs)
+        return wrapper
+    return decorador
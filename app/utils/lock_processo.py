@@ -0,0 +1,109 @@
+"""
+Lock entre processos para tarefas que devem rodar em um único worker
+
+Usa flock em um arquivo: o lock pertence ao processo enquanto o descritor
+estiver aberto e é liberado pelo sistema operacional quando ele termina,
+mesmo se o processo morrer sem limpar nada.
+"""
+import os
+import threading
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sem flock, o processo sempre assume o lock (servidor de desenvolvimento)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Locks mantidos vivos até o fim do processo (fechar o arquivo libera o flock)
+_locks_ativos = []
+
+
+class LockArquivo:
+    """
+    Lock exclusivo e não bloqueante sobre um arquivo
+
+    Args:
+        caminho: Arquivo usado como lock (criado se não existir)
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._arquivo = None
+
+    @property
+    def adquirido(self) -> bool:
+        return self._arquivo is not None
+
+    def adquirir(self) -> bool:
+        """
+        Tenta obter o lock sem esperar
+
+        Returns:
+            True se este processo detém o lock
+        """
+        if self._arquivo is not None:
+            return True
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        arquivo = open(self.caminho, 'a+')
+
+        if fcntl is not None:
+            try:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                arquivo.close()
+                return False
+
+        arquivo.seek(0)
+        arquivo.truncate()
+        arquivo.write(str(os.getpid()))
+        arquivo.flush()
+        self._arquivo = arquivo
+        return True
+
+    def liberar(self):
+        if self._arquivo is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+        self._arquivo.close()
+        self._arquivo = None
+
+
+def executar_com_lock(caminho: str, ao_adquirir, intervalo: float = 30.0) -> LockArquivo:
+    """
+    Executa `ao_adquirir()` em apenas um processo entre os que compartilham o lock
+
+    Se outro processo já detém o lock, uma thread daemon tenta de novo a cada
+    `intervalo` segundos, de modo que a tarefa é assumida por outro worker
+    se o dono atual morrer.
+
+    Args:
+        caminho: Arquivo de lock
+        ao_adquirir: Callable sem argumentos executado uma vez ao obter o lock
+        intervalo: Segundos entre tentativas
+
+    Returns:
+        LockArquivo usado
+    """
+    lock = LockArquivo(caminho)
+    _locks_ativos.append(lock)
+
+    if lock.adquirir():
+        logger.info(f"Lock {caminho} adquirido pelo processo {os.getpid()}")
+        ao_adquirir()
+        return lock
+
+    def tentar():
+        evento = threading.Event()
+        while not evento.wait(intervalo):
+            if lock.adquirir():
+                logger.info(f"Lock {caminho} assumido pelo processo {os.getpid()}")
+                ao_adquirir()
+                return
+
+    threading.Thread(target=tentar, name='lock-processo', daemon=True).start()
+    return lock
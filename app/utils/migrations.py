@@ -0,0 +1,149 @@
+"""
+Migrações simples do banco SQLite (sem Alembic)
+
+Cada migração é idempotente e roda na inicialização, depois do db.create_all().
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from app.utils.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+def aplicar_migracoes():
+    """
+    Aplica todas as migrações pendentes no banco atual
+    """
+    _adicionar_colunas_numericas_ibov()
+    _backfill_valores_numericos_ibov()
+    _criar_indices_series_temporais()
+    _adicionar_coluna_hiperparametros()
+    _adicionar_coluna_score_dados_refinados()
+
+
+def _adicionar_colunas(tabela: str, colunas: dict):
+    existentes = {c['name'] for c in inspect(db.engine).get_columns(tabela)}
+
+    with db.engine.begin() as conn:
+        for nome, tipo in colunas.items():
+            if nome not in existentes:
+                conn.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {nome} {tipo}'))
+                logger.info(f"Migração: coluna {tabela}.{nome} criada")
+
+
+def _criar_indice(nome: str, tabela: str, colunas: list, unique: bool = False):
+    """
+    Cria um índice (idempotente)
+
+    Antes de um índice único, as linhas duplicadas (todas menos a de menor id
+    de cada chave) são copiadas para a tabela <tabela>_duplicadas_<timestamp>
+    e só então removidas; as chaves afetadas vão para o log.
+    """
+    inspector = inspect(db.engine)
+
+    if not inspector.has_table(tabela):
+        return
+
+    if any(i['name'] == nome for i in inspector.get_indexes(tabela)):
+        return
+
+    if unique:
+        # Uma restrição UNIQUE com as mesmas colunas já atende (ex: uix_symbol_date em stock_data)
+        existentes = inspector.get_unique_constraints(tabela) + [
+            i for i in inspector.get_indexes(tabela) if i.get('unique')
+        ]
+        if any(list(c['column_names']) == colunas for c in existentes):
+            return
+
+    lista_colunas = ', '.join(f'"{c}"' for c in colunas)
+
+    with db.engine.begin() as conn:
+        if unique:
+            _mover_duplicadas(conn, tabela, lista_colunas)
+
+        conn.execute(text(
+            f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {nome} ON {tabela} ({lista_colunas})'
+        ))
+
+
+def _mover_duplicadas(conn, tabela: str, lista_colunas: str, exemplos: int = 10):
+    """
+    Move para uma tabela de backup as linhas que impedem o índice único em lista_colunas
+
+    Returns:
+        Nome da tabela de backup, ou None se não havia duplicadas
+    """
+    duplicadas = f'id NOT IN (SELECT MIN(id) FROM {tabela} GROUP BY {lista_colunas})'
+
+    chaves = conn.execute(text(
+        f'SELECT {lista_colunas}, COUNT(*) FROM {tabela} GROUP BY {lista_colunas} HAVING COUNT(*) > 1'
+    )).fetchall()
+    if not chaves:
+        return None
+
+    backup = f'{tabela}_duplicadas_{datetime.now().strftime("%Y%m%d%H%M%S")}'
+    conn.execute(text(f'CREATE TABLE {backup} AS SELECT * FROM {tabela} WHERE {duplicadas}'))
+    movidas = conn.execute(text(f'DELETE FROM {tabela} WHERE {duplicadas}')).rowcount
+
+    amostra = ', '.join(str(tuple(c[:-1])) for c in chaves[:exemplos])
+    logger.warning(
+        f"Migração: {movidas} linhas duplicadas de {tabela} ({len(chaves)} chaves, ex.: {amostra}) "
+        f"movidas para {backup}; foi mantida a de menor id de cada chave"
+    )
+    return backup
+
+
+def _criar_indices_series_temporais():
+    _criar_indice('uix_ibov_ativos_codigo_data', 'ibov_ativos', ['codigo', 'data'], unique=True)
+    _criar_indice('uix_stock_data_symbol_date', 'stock_data', ['symbol', 'date'], unique=True)
+    _criar_indice('uix_dados_refinados_codigo_data', 'dados_refinados', ['codigo', 'data_referencia'], unique=True)
+    _criar_indice('ix_lstm_models_symbol_active_created', 'lstm_models', ['symbol', 'is_active', 'created_at'])
+
+
+def _adicionar_colunas_numericas_ibov():
+    _adicionar_colunas('ibov_ativos', {
+        'participacao_valor': 'FLOAT',
+        'qtde_teorica_valor': 'FLOAT'
+    })
+
+
+def _adicionar_coluna_hiperparametros():
+    _adicionar_colunas('modelos_treinados', {'hiperparametros': 'TEXT'})
+
+
+def _adicionar_coluna_score_dados_refinados():
+    _adicionar_colunas('dados_refinados', {'score': 'FLOAT'})
+
+
+def _backfill_valores_numericos_ibov(chunk_size: int = 1000):
+    """
+    Preenche participacao_valor/qtde_teorica_valor das linhas gravadas antes das colunas existirem
+    """
+    from app.models.ibov_model import IbovAtivo
+    from app.services.b3_scraper_service import B3Scraper
+
+    pendentes = db.session.query(IbovAtivo.id, IbovAtivo.participacao, IbovAtivo.theoricalQty).filter(
+        IbovAtivo.participacao_valor.is_(None),
+        IbovAtivo.qtde_teorica_valor.is_(None)
+    ).all()
+
+    if not pendentes:
+        return
+
+    valores = [
+        {
+            'id': id_,
+            'participacao_valor': B3Scraper._parse_percentage(participacao),
+            'qtde_teorica_valor': B3Scraper._parse_number(qtde)
+        }
+        for id_, participacao, qtde in pendentes
+    ]
+
+    for inicio in range(0, len(valores), chunk_size):
+        db.session.execute(db.update(IbovAtivo), valores[inicio:inicio + chunk_size])
+
+    db.session.commit()
+    logger.info(f"Migração: {len(valores)} linhas de ibov_ativos convertidas para colunas numéricas")
@@ -0,0 +1,145 @@
+"""
+Benchmark de leituras concorrentes no SQLite durante uma ingestão
+
+Em um banco temporário, um processo grava barras de StockData em lotes
+(como a coleta do yfinance) enquanto processos leitores chamam
+GET /api/stock-data/<symbol> pelo test client. Roda com os ajustes de
+app/utils/database.py (WAL, busy_timeout...) e com o SQLite padrão
+(SQLITE_AJUSTES=0) e compara vazão, latência e erros das leituras.
+
+Uso:
+    python benchmark_banco.py --leitores 4 --duracao 10 --lote 50000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from flask import Flask
+
+from app.utils.extensions import db
+from app.utils.database import configurar_banco
+from app.utils.db_utils import inserir_ignorando_conflitos
+from app.models.stock_data_model import StockData
+
+SYMBOL_LEITURA = 'LEIT.SA'
+
+
+def criar_app(database_uri: str) -> Flask:
+    from app.routes.routes import bp
+
+    app = Flask(__name__)
+    configurar_banco(app, database_uri)
+    db.init_app(app)
+    app.register_blueprint(bp)
+    return app
+
+
+def barras(symbol: str, inicio: date, quantidade: int) -> list:
+    precos = 10 + np.cumsum(np.random.normal(0, 0.2, quantidade))
+    return [
+        {
+            'symbol': symbol, 'date': inicio + timedelta(days=i),
+            'open': float(p), 'high': float(p), 'low': float(p), 'close': float(p),
+            'volume': 1000, 'adj_close': float(p)
+        }
+        for i, p in enumerate(precos)
+    ]
+
+
+def escritor(database_uri: str, ajustes: str, lote: int, parar, linhas):
+    os.environ['SQLITE_AJUSTES'] = ajustes
+    app = criar_app(database_uri)
+    with app.app_context():
+        n = 0
+        while not parar.is_set():
+            # Um "símbolo" novo por lote, gravado em uma única transação
+            inseridos = inserir_ignorando_conflitos(
+                StockData, barras(f'W{n:05d}', date(2000, 1, 1), lote), index_elements=['symbol', 'date']
+            )
+            db.session.commit()
+            linhas.value += inseridos
+            n += 1
+
+
+def leitor(database_uri: str, ajustes: str, duracao: float) -> tuple:
+    os.environ['SQLITE_AJUSTES'] = ajustes
+    app = criar_app(database_uri)
+    cliente = app.test_client()
+    latencias = []
+    erros = 0
+
+    # Primeira chamada fora da medição (import do controller, conexão)
+    cliente.get(f'/api/stock-data/{SYMBOL_LEITURA}')
+
+    fim = time.perf_counter() + duracao
+    while time.perf_counter() < fim:
+        inicio = time.perf_counter()
+        resposta = cliente.get(f'/api/stock-data/{SYMBOL_LEITURA}?limit={random.randint(50, 200)}')
+        latencias.append(time.perf_counter() - inicio)
+        if resposta.status_code != 200:
+            erros += 1
+
+    return latencias, erros
+
+
+def executar(ajustes: bool, leitores: int, duracao: float, lote: int) -> dict:
+    flag = '1' if ajustes else '0'
+    os.environ['SQLITE_AJUSTES'] = flag
+
+    with tempfile.TemporaryDirectory() as pasta:
+        database_uri = 'sqlite:///' + os.path.join(pasta, 'benchmark.db')
+        app = criar_app(database_uri)
+        with app.app_context():
+            db.create_all()
+            inserir_ignorando_conflitos(StockData, barras(SYMBOL_LEITURA, date(2015, 1, 1), 2000), ['symbol', 'date'])
+            db.session.commit()
+            db.engine.dispose()
+
+        contexto = multiprocessing.get_context('spawn')
+        parar = contexto.Event()
+        linhas = contexto.Value('q', 0)
+        processo_escritor = contexto.Process(target=escritor, args=(database_uri, flag, lote, parar, linhas))
+        processo_escritor.start()
+        time.sleep(1.0)
+
+        inicio = time.perf_counter()
+        with contexto.Pool(leitores) as pool:
+            resultados = pool.starmap(leitor, [(database_uri, flag, duracao)] * leitores)
+        tempo = time.perf_counter() - inicio
+
+        parar.set()
+        processo_escritor.join()
+
+    latencias = np.array([l for r in resultados for l in r[0]]) * 1000
+    return {
+        'modo': 'WAL + pragmas' if ajustes else 'SQLite padrão',
+        'leituras_por_segundo': len(latencias) / duracao,
+        'p50_ms': float(np.percentile(latencias, 50)),
+        'p95_ms': float(np.percentile(latencias, 95)),
+        'max_ms': float(latencias.max()),
+        'erros': sum(r[1] for r in resultados),
+        'linhas_escritas_por_segundo': linhas.value / tempo
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Leituras concorrentes durante ingestão no SQLite')
+    parser.add_argument('--leitores', type=int, default=4, help='Processos leitores')
+    parser.add_argument('--duracao', type=float, default=10.0, help='Segundos de leitura por modo')
+    parser.add_argument('--lote', type=int, default=50000, help='Barras gravadas por transação')
+    args = parser.parse_args()
+
+    print(f'{"modo":>15} {"leituras/s":>11} {"p50 ms":>8} {"p95 ms":>8} {"máx ms":>8} {"erros":>6} {"linhas/s":>10}')
+    for ajustes in (False, True):
+        r = executar(ajustes, args.leitores, args.duracao, args.lote)
+        print(f"{r['modo']:>15} {r['leituras_por_segundo']:>11.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['max_ms']:>8.1f} {r['erros']:>6} {r['linhas_escritas_por_segundo']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
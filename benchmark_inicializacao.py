@@ -0,0 +1,78 @@
+"""
+Mede o tempo e a memória de inicialização da API e falha em regressões
+
+Em um interpretador novo, carrega app.py, executa create_app() e responde
+GET / pelo test client. Sai com código 1 se algum módulo pesado
+(TensorFlow, scikit-learn, yfinance...) tiver sido importado na
+inicialização ou se o tempo passar do limite.
+
+Uso:
+    python benchmark_inicializacao.py
+    python benchmark_inicializacao.py --repeticoes 5 --limite-segundos 1.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODULOS_PESADOS = ('tensorflow', 'keras', 'sklearn', 'scipy', 'yfinance', 'pandas', 'h5py', 'tflite_runtime')
+
+# Executado em um processo separado para não herdar módulos já importados
+SCRIPT_MEDICAO = """
+import importlib.util, json, resource, sys, time
+inicio = time.perf_counter()
+spec = importlib.util.spec_from_file_location('app_main', 'app.py')
+modulo = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(modulo)
+app = modulo.create_app()
+tempo_create_app = time.perf_counter() - inicio
+status = app.test_client().get('/').status_code
+print(json.dumps({
+    'tempo_segundos': tempo_create_app,
+    'tempo_primeira_resposta_segundos': time.perf_counter() - inicio,
+    'status_raiz': status,
+    'memoria_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modulos_pesados': [m for m in %r if m in sys.modules]
+}))
+""" % (MODULOS_PESADOS,)
+
+
+def medir() -> dict:
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    saida = subprocess.run(
+        [sys.executable, '-c', SCRIPT_MEDICAO],
+        cwd=raiz, capture_output=True, text=True, check=True
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de inicialização da API')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--limite-segundos', type=float, default=2.0)
+    args = parser.parse_args()
+
+    medicoes = [medir() for _ in range(args.repeticoes)]
+    melhor = min(medicoes, key=lambda m: m['tempo_segundos'])
+
+    print(f"create_app: {melhor['tempo_segundos']:.2f} s "
+          f"(GET / respondido em {melhor['tempo_primeira_resposta_segundos']:.2f} s, status {melhor['status_raiz']})")
+    print(f"memória: {melhor['memoria_mb']:.0f} MB")
+    print(f"módulos pesados importados: {', '.join(melhor['modulos_pesados']) or 'nenhum'}")
+
+    falhas = []
+    if melhor['modulos_pesados']:
+        falhas.append(f"módulos pesados importados na inicialização: {', '.join(melhor['modulos_pesados'])}")
+    if melhor['tempo_segundos'] > args.limite_segundos:
+        falhas.append(f"inicialização levou {melhor['tempo_segundos']:.2f} s (limite {args.limite_segundos} s)")
+    if melhor['status_raiz'] != 200:
+        falhas.append(f"GET / respondeu {melhor['status_raiz']}")
+
+    for falha in falhas:
+        print(f'❌ {falha}')
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark dos motores do membro gb do ensemble do ML (exato x histograma)
+
+Com os dados de dados_refinados, na mesma divisão cronológica 80/20 e com o
+mesmo RobustScaler do treino, mede para cada motor o tempo de fit do gb
+sozinho e do VotingClassifier completo, e a acurácia/F1 no teste. No motor
+'exato' os nulos viram 0 (fillna); no 'histograma' o HistGradientBoosting
+recebe NaN.
+
+Uso:
+    python benchmark_ml.py --repeticoes 3
+    python benchmark_ml.py --database-uri sqlite:////caminho/dados.db
+"""
+import argparse
+import time
+
+import numpy as np
+from flask import Flask
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.preprocessing import RobustScaler
+
+from app.utils.extensions import db
+from app.utils.database import configurar_banco
+from app.services.ml_service import MLService, MOTORES_GB
+
+
+def criar_app(database_uri: str = None) -> Flask:
+    app = Flask(__name__)
+    configurar_banco(app, database_uri)
+    db.init_app(app)
+    return app
+
+
+def medir(service: MLService, motor_gb: str, repeticoes: int) -> dict:
+    X, y = service._carregar_dados_treino(motor_gb)
+    if len(X) < 10:
+        raise ValueError('Poucos dados refinados. Execute /ml/refinar primeiro.')
+
+    split_index = int(len(X) * 0.8)
+    scaler = RobustScaler()
+    X_train = scaler.fit_transform(X.iloc[:split_index])
+    X_test = scaler.transform(X.iloc[split_index:])
+    y_train, y_test = y.iloc[:split_index], y.iloc[split_index:]
+
+    tempos_gb, tempos_ensemble, acuracias, f1s = [], [], [], []
+    for semente in range(repeticoes):
+        modelo = service._criar_ensemble(semente, motor_gb=motor_gb)
+
+        gb = clone(dict(modelo.estimators)['gb'])
+        inicio = time.perf_counter()
+        gb.fit(X_train, y_train)
+        tempos_gb.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        modelo.fit(X_train, y_train)
+        tempos_ensemble.append(time.perf_counter() - inicio)
+
+        y_pred = modelo.predict(X_test)
+        acuracias.append(accuracy_score(y_test, y_pred))
+        f1s.append(f1_score(y_test, y_pred, average='weighted', zero_division=0))
+
+    return {
+        'motor_gb': motor_gb,
+        'amostras': len(X),
+        'nulos_pct': float(X.isna().to_numpy().mean() * 100),
+        'fit_gb_s': float(np.median(tempos_gb)),
+        'fit_ensemble_s': float(np.median(tempos_ensemble)),
+        'acuracia': float(np.mean(acuracias)),
+        'f1': float(np.mean(f1s))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de fit e acurácia dos motores do membro gb')
+    parser.add_argument('--motores', default=','.join(MOTORES_GB), help='Motores separados por vírgula')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Sementes por motor (tempo = mediana, métricas = média)')
+    parser.add_argument('--database-uri', default=None, help='Padrão: SQLALCHEMY_DATABASE_URI ou instance/dados.db')
+    args = parser.parse_args()
+
+    app = criar_app(args.database_uri)
+    with app.app_context():
+        service = MLService()
+        print(f'{"motor":>11} {"amostras":>9} {"nulos %":>8} {"fit gb s":>9} {"fit ens s":>10} {"acurácia":>9} {"F1":>7}')
+        for motor in [m.strip() for m in args.motores.split(',') if m.strip()]:
+            r = medir(service, motor, args.repeticoes)
+            print(f"{r['motor_gb']:>11} {r['amostras']:>9} {r['nulos_pct']:>8.1f} {r['fit_gb_s']:>9.3f} "
+                  f"{r['fit_ensemble_s']:>10.3f} {r['acuracia']:>9.4f} {r['f1']:>7.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark dos motores de previsão LSTM (keras, grafo, tflite, numpy)
+
+Para cada quantidade de previsões simultâneas (padrão 1, 10 e 100), monta
+janelas reais do histórico do símbolo, roda uma previsão autorregressiva em
+batch com cada motor e mede o tempo e a diferença máxima em relação ao Keras.
+
+Uso:
+    python benchmark_motores.py PETR4.SA --dias 5 --repeticoes 5
+    python benchmark_motores.py PETR4.SA --database-uri sqlite:////caminho/dados.db
+"""
+import argparse
+import time
+
+import numpy as np
+from flask import Flask
+
+from app.utils.extensions import db
+from app.utils.database import configurar_banco
+from app.models.stock_data_model import StockData
+from app.services.lstm_service import LSTMService
+
+
+def criar_app(database_uri: str = None) -> Flask:
+    app = Flask(__name__)
+    configurar_banco(app, database_uri)
+    db.init_app(app)
+    return app
+
+
+def montar_janelas(symbol: str, sequence_length: int, quantidade: int, scaler) -> np.ndarray:
+    """Janelas normalizadas terminando nos `quantidade` pregões mais recentes (reaproveitadas se faltar histórico)"""
+    dados = StockData.query.filter_by(symbol=symbol)\
+        .order_by(StockData.date.desc())\
+        .limit(sequence_length + quantidade - 1)\
+        .all()
+
+    if len(dados) < sequence_length:
+        raise ValueError(f'Dados históricos insuficientes para {symbol}')
+
+    precos = np.array([d.close for d in reversed(dados)]).reshape(-1, 1)
+    serie = scaler.transform(precos)[:, 0].astype(np.float32)
+    inicios = [i % (len(serie) - sequence_length + 1) for i in range(quantidade)]
+    return np.stack([serie[i:i + sequence_length] for i in inicios])
+
+
+def medir(service, model, janelas, dias, motor, indices, repeticoes) -> tuple:
+    # Primeira chamada fora da medição (traçado do grafo, alocação do interpretador)
+    previsoes = service.prever_sequencia(model, janelas, dias, motor=motor, indices=indices)
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        service.prever_sequencia(model, janelas, dias, motor=motor, indices=indices)
+        tempos.append(time.perf_counter() - inicio)
+
+    return float(np.median(tempos)), previsoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos motores de previsão LSTM')
+    parser.add_argument('symbol', help='Símbolo com modelo treinado (próprio ou global)')
+    parser.add_argument('--model-name', default=None, help='Modelo específico (padrão: o usado pela API)')
+    parser.add_argument('--dias', type=int, default=5, help='Passos autorregressivos por previsão')
+    parser.add_argument('--concorrencias', type=int, nargs='+', default=[1, 10, 100],
+                        help='Quantidades de previsões simultâneas')
+    parser.add_argument('--motores', nargs='+', default=list(LSTMService.MOTORES_PREVISAO))
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--database-uri', default=None,
+                        help='Padrão: SQLALCHEMY_DATABASE_URI do ambiente ou instance/dados.db')
+    args = parser.parse_args()
+
+    app = criar_app(args.database_uri)
+    with app.app_context():
+        service = LSTMService()
+        model_info, cobertura = service._buscar_modelo(args.symbol, args.model_name)
+        if model_info is None:
+            raise SystemExit(f'Nenhum modelo encontrado para {args.symbol}')
+
+        print(f'Modelo: {model_info.model_name} (sequence_length={model_info.sequence_length}, dias={args.dias})')
+        print(f'{"N":>5} {"motor":>8} {"tempo (ms)":>12} {"ms/previsão":>12} {"dif. máx. keras":>16}')
+
+        for quantidade in args.concorrencias:
+            referencia = None
+
+            for motor in ['keras'] + [m for m in args.motores if m != 'keras']:
+                try:
+                    model, scaler = service.carregar_modelo(model_info, motor=motor)
+                except FileNotFoundError as e:
+                    print(f'{quantidade:>5} {motor:>8} {"-":>12} {"-":>12} {"-":>16}  ({e})')
+                    continue
+
+                if cobertura is not None:
+                    scaler = scaler[args.symbol]
+
+                janelas = montar_janelas(args.symbol, model_info.sequence_length, quantidade, scaler)
+                indices = np.full(quantidade, cobertura.indice if cobertura is not None else 0, dtype=np.int32)
+
+                tempo, previsoes = medir(service, model, janelas, args.dias, motor, indices, args.repeticoes)
+                if referencia is None:
+                    referencia = previsoes
+
+                diferenca = float(np.max(np.abs(previsoes - referencia)))
+                print(f'{quantidade:>5} {motor:>8} {tempo * 1000:>12.1f} '
+                      f'{tempo * 1000 / quantidade:>12.2f} {diferenca:>16.2e}')
+
+
+if __name__ == '__main__':
+    main()
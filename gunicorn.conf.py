@@ -0,0 +1,39 @@
+"""
+Configuração do gunicorn para produção
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Variáveis de ambiente:
+    GUNICORN_BIND           Endereço (padrão 0.0.0.0:5000)
+    WEB_CONCURRENCY         Workers (padrão: núcleos da máquina)
+    GUNICORN_THREADS        Threads por worker (padrão 2)
+    GUNICORN_TIMEOUT        Timeout de request/inicialização do worker em segundos (padrão 120)
+    LSTM_MOTORES_PRECARGA   Motores cujo cache é aquecido em cada worker (padrão tflite, sem
+                            TensorFlow; grafo/keras importam o TensorFlow em cada worker)
+    ML_PRECARGA             0 desativa a carga do ensemble do ML no master (padrão 1)
+    SCHEDULER_LOCK_FILE     Lock que restringe o agendador a um worker
+"""
+import os
+import multiprocessing
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+worker_class = 'gthread'
+
+# wsgi.py cria tabelas, aplica migrações e trata jobs interrompidos uma única
+# vez no master; os workers herdam a aplicação pronta (sem TensorFlow importado)
+preload_app = True
+
+# O aquecimento do cache roda antes do worker aceitar requests
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_worker_init(worker):
+    import wsgi
+    wsgi.inicializar_worker()
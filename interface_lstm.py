@@ -4,6 +4,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 import requests
 import json
+import time
 from datetime import datetime
 
 API_BASE = "http://127.0.0.1:5000"
@@ -12,6 +13,27 @@ API_BASE = "http://127.0.0.1:5000"
 # FASE 4 - LSTM FUNCTIONS
 # ========================================
 
+def acompanhar_job(job_id, intervalo=2, timeout=3600):
+    """Consulta /api/jobs/<job_id> até o job terminar, gerando o estado a cada consulta"""
+    inicio = time.time()
+    while time.time() - inicio < timeout:
+        job = requests.get(f"{API_BASE}/api/jobs/{job_id}").json()
+        yield job
+        if job['status'] in ('concluido', 'erro'):
+            return
+        time.sleep(intervalo)
+    raise requests.Timeout()
+
+def resultado_job(response):
+    """Retorna (sucesso, dados) de uma resposta síncrona (201) ou de um job enfileirado (202)"""
+    data = response.json()
+    if response.status_code != 202:
+        return response.status_code == 201, data
+    
+    for job in acompanhar_job(data['job_id']):
+        pass
+    return job['status'] == 'concluido', job['resultado'] or {'erro': job['erro']}
+
 def coletar_dados_stock(symbol, period):
     """Coleta dados históricos de ações usando yfinance"""
     try:
@@ -31,8 +53,9 @@ def coletar_dados_stock(symbol, period):
             headers={'Content-Type': 'application/json'}
         )
         
-        if response.status_code == 201:
-            data = response.json()
+        sucesso, data = resultado_job(response)
+        
+        if sucesso:
             mensagem = f"""✅ **Dados coletados com sucesso!**
             
 📊 **Símbolo:** {data['symbol']}
@@ -45,7 +68,7 @@ def coletar_dados_stock(symbol, period):
 """
             return mensagem
         else:
-            error_data = response.json()
+            error_data = data
             mensagem_erro = f"❌ Erro: {error_data.get('erro', 'Erro desconhecido')}"
             if 'dica' in error_data:
                 mensagem_erro += f"\n\n💡 Dica: {error_data['dica']}"
@@ -116,9 +139,10 @@ def visualizar_dados_stock(symbol, limit):
         return None, f"❌ Erro: {str(e)}", None
 
 def treinar_modelo_lstm(symbol, epochs, batch_size, sequence_length, units):
-    """Treina modelo LSTM"""
+    """Treina modelo LSTM (gera mensagens de progresso enquanto o job roda)"""
     try:
         mensagem_inicial = f"🧠 Iniciando treinamento do modelo LSTM para {symbol}...\n⏳ Isso pode levar alguns minutos..."
+        yield mensagem_inicial
         
         response = requests.post(
             f"{API_BASE}/api/lstm/treinar",
@@ -133,9 +157,18 @@ def treinar_modelo_lstm(symbol, epochs, batch_size, sequence_length, units):
             timeout=600  # 10 minutos de timeout
         )
         
-        if response.status_code == 201:
-            data = response.json()
-            
+        data = response.json()
+        sucesso = response.status_code == 201
+        
+        if response.status_code == 202:
+            for job in acompanhar_job(data['job_id']):
+                progresso = job['progresso']
+                if progresso['atual'] is not None:
+                    yield f"{mensagem_inicial}\n\n📈 {progresso['descricao']} ({progresso['percentual']}%)"
+            sucesso = job['status'] == 'concluido'
+            data = job['resultado'] or {'erro': job['erro']}
+        
+        if sucesso:
             mensagem = f"""✅ **Modelo treinado com sucesso!**
 
 📊 **Modelo:** {data['model_name']}
@@ -158,14 +191,14 @@ def treinar_modelo_lstm(symbol, epochs, batch_size, sequence_length, units):
 
 💾 **Modelo salvo em:** {data['model_path']}
 """
-            return mensagem
+            yield mensagem
         else:
-            erro = response.json().get('erro', 'Erro desconhecido')
-            return f"❌ Erro: {erro}"
+            erro = data.get('erro', 'Erro desconhecido')
+            yield f"❌ Erro: {erro}"
     except requests.Timeout:
-        return "⏱️ Timeout: O treinamento está demorando muito. Tente com menos épocas."
+        yield "⏱️ Timeout: O treinamento está demorando muito. Tente com menos épocas."
     except Exception as e:
-        return f"❌ Erro: {str(e)}"
+        yield f"❌ Erro: {str(e)}"
 
 def fazer_previsao_lstm(symbol, dias):
     """Faz previsão com modelo LSTM"""
@@ -0,0 +1,19 @@
+import pytest
+from flask import Flask
+
+from app.utils.extensions import db
+from app.utils.database import configurar_banco
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App Flask mínima com um SQLite temporário e as tabelas criadas"""
+    app = Flask(__name__)
+    configurar_banco(app, 'sqlite:///' + str(tmp_path / 'teste.db'))
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
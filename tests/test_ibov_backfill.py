@@ -0,0 +1,120 @@
+"""
+Backfill histórico do IBOV contra um servidor local que imita o GetPortfolioDay da B3
+"""
+import base64
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.models.ibov_model import IbovAtivo
+from app.services.b3_scraper_service import B3Scraper
+from app.services.ibov_service import IbovService
+from app.utils.extensions import db
+
+TAXA = 10.0
+CAPACIDADE = 2
+
+CARTEIRA = [
+    {'cod': 'PETR4', 'asset': 'PETROBRAS', 'type': 'PN', 'theoricalQty': '4.566.445.852', 'part': '8,123'},
+    {'cod': 'VALE3', 'asset': 'VALE', 'type': 'ON', 'theoricalQty': '4.196.924.316', 'part': '10,456'},
+    {'cod': 'ITUB4', 'asset': 'ITAUUNIBANCO', 'type': 'PN', 'theoricalQty': '4.867.089.627', 'part': '7,890'},
+    # Linha repetida na resposta: o ON CONFLICT deve gravar só uma
+    {'cod': 'PETR4', 'asset': 'PETROBRAS', 'type': 'PN', 'theoricalQty': '4.566.445.852', 'part': '8,123'},
+]
+
+
+class _PortfolioDayHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        payload = json.loads(base64.b64decode(self.path.rsplit('/', 1)[-1]))
+        with self.server.lock:
+            self.server.requisicoes.append((time.monotonic(), payload.get('date')))
+
+        corpo = json.dumps({
+            'page': {'pageNumber': 1, 'pageSize': 120, 'totalRecords': len(CARTEIRA)},
+            'results': CARTEIRA
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor_b3():
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), _PortfolioDayHandler)
+    servidor.requisicoes = []
+    servidor.lock = threading.Lock()
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _dias_uteis(meses: int) -> list:
+    hoje = datetime.now().date()
+    return [
+        hoje - timedelta(days=d) for d in range(meses * 30)
+        if (hoje - timedelta(days=d)).weekday() < 5
+    ]
+
+
+def _backfill(servidor):
+    url = f'http://127.0.0.1:{servidor.server_address[1]}/indexProxy/indexCall/GetPortfolioDay'
+    return IbovService.backfill_historico(
+        meses=1, max_workers=CAPACIDADE, requisicoes_por_segundo=TAXA,
+        scraper_factory=lambda: B3Scraper(base_api=url)
+    )
+
+
+def test_backfill_descarta_datas_existentes_e_duplicatas(app, servidor_b3):
+    dias = _dias_uteis(1)
+    existentes = dias[:3]
+    for data in existentes:
+        db.session.add(IbovAtivo(codigo='PETR4', nome='PETROBRAS', tipo='PN', participacao='8,000',
+                                 theoricalQty='1', participacao_valor=8.0, qtde_teorica_valor=1.0, data=data))
+    db.session.commit()
+
+    resultado = _backfill(servidor_b3)
+
+    datas_pedidas = {datetime.strptime(d, '%d/%m/%y').date() for _, d in servidor_b3.requisicoes}
+    assert len(servidor_b3.requisicoes) == len(dias) - len(existentes)
+    assert datas_pedidas == set(dias) - set(existentes)
+
+    assert resultado['dias_ja_existentes'] == len(existentes)
+    assert resultado['dias_coletados'] == len(dias) - len(existentes)
+    assert resultado['erros'] == 0
+    # 3 códigos distintos por dia, apesar da linha repetida
+    assert resultado['total_registros'] == 3 * resultado['dias_coletados']
+    assert IbovAtivo.query.count() == resultado['total_registros'] + len(existentes)
+
+    petr4 = IbovAtivo.query.filter_by(codigo='PETR4', data=dias[-1]).one()
+    assert petr4.participacao_valor == pytest.approx(8.123)
+
+    # Segunda execução: tudo já existe, nenhuma requisição nova
+    servidor_b3.requisicoes.clear()
+    resultado = _backfill(servidor_b3)
+    assert servidor_b3.requisicoes == []
+    assert resultado['dias_ja_existentes'] == len(dias)
+    assert resultado['total_registros'] == 0
+
+
+def test_backfill_respeita_o_token_bucket(app, servidor_b3):
+    _backfill(servidor_b3)
+
+    instantes = sorted(t for t, _ in servidor_b3.requisicoes)
+    assert len(instantes) > CAPACIDADE + 5
+
+    # Depois da rajada inicial, no máximo TAXA requisições por segundo
+    for i, instante in enumerate(instantes):
+        minimo = (i + 1 - CAPACIDADE) / TAXA
+        assert instante - instantes[0] >= minimo - 0.05
@@ -0,0 +1,39 @@
+"""
+A API sobe e responde GET / sem importar TensorFlow nem outros módulos pesados
+"""
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS_PESADOS = ('tensorflow', 'keras', 'sklearn', 'yfinance', 'h5py', 'tflite_runtime')
+
+# Processo separado: o pytest (e outros testes) já podem ter importado esses módulos
+SCRIPT = """
+import importlib.util, json, sys
+spec = importlib.util.spec_from_file_location('app_main', 'app.py')
+modulo = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(modulo)
+app = modulo.create_app()
+resposta = app.test_client().get('/')
+print(json.dumps({
+    'status': resposta.status_code,
+    'modulos': [m for m in %r if m in sys.modules]
+}))
+""" % (MODULOS_PESADOS,)
+
+
+def test_create_app_e_raiz_sem_tensorflow(tmp_path):
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'teste.db'))
+    saida = subprocess.run(
+        [sys.executable, '-c', SCRIPT], cwd=RAIZ, env=env,
+        capture_output=True, text=True, timeout=120
+    )
+    assert saida.returncode == 0, saida.stderr
+
+    resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+    assert resultado['status'] == 200
+    assert 'tensorflow' not in resultado['modulos']
+    assert resultado['modulos'] == []
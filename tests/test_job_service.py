@@ -0,0 +1,67 @@
+"""
+Limite de concorrência das filas de jobs entre processos
+"""
+import threading
+import time
+
+import pytest
+
+from app.models.job_model import Job
+from app.services.job_service import JobManager, TAREFAS, STATUS_CONCLUIDO
+from app.utils.extensions import db
+
+
+@pytest.fixture
+def tarefa_lenta(monkeypatch):
+    """Tarefa da fila treino que registra quantas execuções ocorrem ao mesmo tempo"""
+    estado = {'atuais': 0, 'maximo': 0}
+    lock = threading.Lock()
+
+    def executar(progresso=None, duracao=0.3):
+        with lock:
+            estado['atuais'] += 1
+            estado['maximo'] = max(estado['maximo'], estado['atuais'])
+        time.sleep(duracao)
+        with lock:
+            estado['atuais'] -= 1
+        return {'ok': True}
+
+    monkeypatch.setitem(TAREFAS, 'teste_lento', {'fila': 'treino', 'func': executar})
+    return estado
+
+
+def _aguardar_jobs(app, ids: list, timeout: float = 10) -> list:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        with app.app_context():
+            status = [db.session.get(Job, i).status for i in ids]
+            db.session.remove()
+        if all(s == STATUS_CONCLUIDO for s in status):
+            return status
+        time.sleep(0.05)
+    return status
+
+
+def test_limite_da_fila_vale_para_varios_processos(app, tarefa_lenta):
+    # Dois JobManager com pools próprios simulam dois workers do gunicorn
+    workers = [JobManager(), JobManager()]
+    for manager in workers:
+        manager.init_app(app)
+    app.config['JOBS_WORKERS_TREINO'] = 1
+
+    ids = [workers[i % 2].submeter('teste_lento', {}).id for i in range(4)]
+
+    assert _aguardar_jobs(app, ids) == [STATUS_CONCLUIDO] * 4
+    assert tarefa_lenta['maximo'] == 1
+
+
+def test_limite_maior_permite_execucao_simultanea(app, tarefa_lenta):
+    workers = [JobManager(), JobManager()]
+    for manager in workers:
+        manager.init_app(app)
+    app.config['JOBS_WORKERS_TREINO'] = 2
+
+    ids = [workers[i % 2].submeter('teste_lento', {'duracao': 0.5}).id for i in range(2)]
+
+    assert _aguardar_jobs(app, ids) == [STATUS_CONCLUIDO] * 2
+    assert tarefa_lenta['maximo'] == 2
@@ -0,0 +1,68 @@
+"""
+Cache de modelos LSTM sob requisições simultâneas
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.services.lstm_cache_service import LSTMModelCache
+
+THREADS = 8
+
+
+class _Modelo:
+    nbytes = 1024
+
+
+def _carregar_em_paralelo(cache: LSTMModelCache, loader) -> list:
+    barreira = threading.Barrier(THREADS)
+
+    def obter():
+        barreira.wait()
+        return cache.obter('lstm_PETR4', loader, symbol='PETR4.SA')
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        futuros = [executor.submit(obter) for _ in range(THREADS)]
+    return futuros
+
+
+def test_miss_simultaneo_carrega_uma_vez():
+    cache = LSTMModelCache(max_bytes=1024 * 1024)
+    chamadas = []
+
+    def loader():
+        chamadas.append(threading.get_ident())
+        time.sleep(0.2)
+        return _Modelo(), np.zeros(1)
+
+    resultados = [f.result() for f in _carregar_em_paralelo(cache, loader)]
+
+    assert len(chamadas) == 1
+    assert all(r[0] is resultados[0][0] for r in resultados)
+    assert cache.misses == 1
+    assert cache.hits == THREADS - 1
+    assert cache.estatisticas()['modelos'] == ['lstm_PETR4']
+
+
+def test_falha_no_carregamento_chega_a_todos_e_permite_nova_tentativa():
+    cache = LSTMModelCache(max_bytes=1024 * 1024)
+    chamadas = []
+
+    def loader_com_erro():
+        chamadas.append(1)
+        time.sleep(0.2)
+        raise FileNotFoundError('modelo ausente')
+
+    futuros = _carregar_em_paralelo(cache, loader_com_erro)
+
+    assert len(chamadas) == 1
+    for futuro in futuros:
+        with pytest.raises(FileNotFoundError):
+            futuro.result()
+
+    model, _ = cache.obter('lstm_PETR4', lambda: (_Modelo(), None))
+    assert isinstance(model, _Modelo)
+    assert cache.misses == 2
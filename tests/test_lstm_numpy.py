@@ -0,0 +1,61 @@
+"""
+Paridade entre o forward pass em NumPy (pesos lidos do .h5) e o modelo Keras
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from app.services.lstm_service import LSTMService
+from app.services.lstm_inferencia_service import LSTMInferenciaService
+from app.services.lstm_numpy_service import ModeloNumPy
+
+SEQUENCE_LENGTH = 20
+TOTAL_SYMBOLS = 3
+TOLERANCIA = 1e-5
+
+
+def _treinar_e_salvar(pasta, nome: str, total_symbols: int = 0, embedding_dim: int = 0) -> tuple:
+    service = LSTMService()
+    model = service.criar_modelo_lstm(SEQUENCE_LENGTH, units=8, total_symbols=total_symbols,
+                                      embedding_dim=embedding_dim)
+
+    rng = np.random.default_rng(0)
+    X = rng.random((64, SEQUENCE_LENGTH, 1), dtype=np.float32)
+    indices = rng.integers(0, max(total_symbols, 1), 64).astype(np.int32)
+    entradas = [X, indices] if embedding_dim else X
+    model.fit(entradas, X[:, -1, 0], epochs=1, verbose=0)
+
+    caminho = str(pasta / f'{nome}.h5')
+    model.save(caminho)
+    return service, model, ModeloNumPy(caminho), X[:, :, 0], indices
+
+
+@pytest.fixture(scope='module', params=['sequencial', 'global'])
+def modelos(request, tmp_path_factory):
+    pasta = tmp_path_factory.mktemp('numpy')
+    if request.param == 'global':
+        return _treinar_e_salvar(pasta, 'global', total_symbols=TOTAL_SYMBOLS, embedding_dim=4)
+    return _treinar_e_salvar(pasta, 'sequencial')
+
+
+def test_prever_igual_ao_keras(modelos):
+    _, model, numpy_model, janelas, indices = modelos
+    com_embedding = len(model.inputs) > 1
+    x = janelas[:, :, np.newaxis]
+
+    esperado = model.predict([x, indices] if com_embedding else x, verbose=0)[:, 0]
+    obtido = numpy_model.prever(janelas, indices)
+
+    assert np.max(np.abs(esperado - obtido)) <= TOLERANCIA
+
+
+def test_rollout_numpy_igual_ao_keras(modelos):
+    service, model, numpy_model, janelas, indices = modelos
+    janelas, indices = janelas[:8], indices[:8]
+
+    esperado = service.prever_sequencia(model, janelas, 25, motor='keras', indices=indices)
+    obtido = LSTMInferenciaService().prever_sequencia(numpy_model, janelas, 25, indices=indices)
+
+    assert obtido.shape == (8, 25)
+    assert np.max(np.abs(esperado - obtido)) <= TOLERANCIA
@@ -0,0 +1,38 @@
+"""
+Rollout compilado (motor grafo) igual ao caminho de um model.predict por dia
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from app.services.lstm_service import LSTMService
+
+SEQUENCE_LENGTH = 20
+TOTAL_SYMBOLS = 3
+TOLERANCIA = 1e-5
+
+
+@pytest.fixture(scope='module', params=[0, 4], ids=['sequencial', 'global'])
+def modelo(request):
+    embedding_dim = request.param
+    service = LSTMService()
+    model = service.criar_modelo_lstm(SEQUENCE_LENGTH, units=8, total_symbols=TOTAL_SYMBOLS,
+                                      embedding_dim=embedding_dim)
+
+    rng = np.random.default_rng(0)
+    X = rng.random((8, SEQUENCE_LENGTH, 1), dtype=np.float32)
+    indices = rng.integers(0, TOTAL_SYMBOLS, 8).astype(np.int32)
+    model.fit([X, indices] if embedding_dim else X, X[:, -1, 0], epochs=1, verbose=0)
+    return service, model, X[:, :, 0], indices
+
+
+@pytest.mark.parametrize('dias', [1, SEQUENCE_LENGTH + 5])
+def test_rollout_grafo_igual_ao_keras(modelo, dias):
+    service, model, janelas, indices = modelo
+
+    esperado = service.prever_sequencia(model, janelas, dias, motor='keras', indices=indices)
+    obtido = service.prever_sequencia(model, janelas, dias, motor='grafo', indices=indices)
+
+    assert obtido.shape == (len(janelas), dias)
+    assert np.max(np.abs(esperado - obtido)) <= TOLERANCIA
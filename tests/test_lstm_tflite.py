@@ -0,0 +1,56 @@
+"""
+Paridade entre o artefato TFLite exportado e o modelo Keras
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from app.services.lstm_service import LSTMService
+from app.services.lstm_inferencia_service import LSTMInferenciaService, ModeloTFLite
+
+SEQUENCE_LENGTH = 20
+TOLERANCIA = 1e-5
+
+
+@pytest.fixture(scope='module')
+def modelo_exportado(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp('tflite')
+    service = LSTMService()
+    model = service.criar_modelo_lstm(SEQUENCE_LENGTH, units=8)
+
+    rng = np.random.default_rng(0)
+    X = rng.random((64, SEQUENCE_LENGTH, 1), dtype=np.float32)
+    model.fit(X, X[:, -1, 0], epochs=1, verbose=0)
+
+    exportacao = service.exportar_tflite(model, str(pasta / 'modelo.h5'), X)
+    return service, model, exportacao, X
+
+
+def test_exportacao_confere_paridade(modelo_exportado):
+    _, _, exportacao, _ = modelo_exportado
+
+    assert exportacao['exportado'], exportacao
+    assert exportacao['paridade_max_abs'] <= TOLERANCIA
+
+
+def test_previsao_nao_depende_das_chamadas_anteriores(modelo_exportado):
+    _, _, exportacao, X = modelo_exportado
+    tflite = ModeloTFLite(exportacao['tflite_path'])
+    janela = X[:1, :, 0]
+    indices = np.zeros(1, dtype=np.int32)
+
+    saidas = [tflite.prever(janela, indices)[0] for _ in range(4)]
+
+    assert max(saidas) - min(saidas) == 0
+
+
+def test_rollout_tflite_igual_ao_keras(modelo_exportado):
+    service, model, exportacao, X = modelo_exportado
+    tflite = ModeloTFLite(exportacao['tflite_path'])
+    janelas = X[:8, :, 0]
+
+    esperado = service.prever_sequencia(model, janelas, 25, motor='keras')
+    obtido = LSTMInferenciaService().prever_sequencia(tflite, janelas, 25)
+
+    assert np.max(np.abs(esperado - obtido)) <= TOLERANCIA
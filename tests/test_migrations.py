@@ -0,0 +1,63 @@
+"""
+Índices únicos criados pela migração em bancos com linhas duplicadas
+"""
+from datetime import date
+
+from sqlalchemy import inspect, text
+
+from app.models.ibov_model import IbovAtivo
+from app.utils.extensions import db
+from app.utils.migrations import _criar_indices_series_temporais
+
+
+def _linha(codigo: str, participacao: float) -> dict:
+    return {'codigo': codigo, 'nome': codigo, 'tipo': 'ON', 'participacao': str(participacao),
+            'theoricalQty': '1', 'participacao_valor': participacao, 'qtde_teorica_valor': 1.0,
+            'data': date(2025, 9, 25)}
+
+
+def test_duplicadas_vao_para_backup_antes_do_indice_unico(app):
+    # Banco anterior ao índice: mesmo (codigo, data) gravado mais de uma vez
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP INDEX uix_ibov_ativos_codigo_data'))
+    db.session.execute(db.insert(IbovAtivo.__table__), [
+        _linha('PETR4', 1.0), _linha('PETR4', 2.0), _linha('PETR4', 3.0), _linha('VALE3', 4.0)
+    ])
+    db.session.commit()
+
+    _criar_indices_series_temporais()
+
+    inspector = inspect(db.engine)
+    assert any(i['name'] == 'uix_ibov_ativos_codigo_data' and i['unique']
+               for i in inspector.get_indexes('ibov_ativos'))
+
+    restantes = {a.codigo: a.participacao_valor for a in IbovAtivo.query.all()}
+    assert restantes == {'PETR4': 1.0, 'VALE3': 4.0}
+
+    backups = [t for t in inspector.get_table_names() if t.startswith('ibov_ativos_duplicadas_')]
+    assert len(backups) == 1
+    movidas = db.session.execute(text(
+        f'SELECT codigo, participacao_valor FROM {backups[0]} ORDER BY participacao_valor'
+    )).fetchall()
+    assert [tuple(m) for m in movidas] == [('PETR4', 2.0), ('PETR4', 3.0)]
+
+
+def test_sem_duplicadas_nao_cria_backup(app):
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP INDEX uix_ibov_ativos_codigo_data'))
+    db.session.execute(db.insert(IbovAtivo.__table__), [_linha('PETR4', 1.0), _linha('VALE3', 4.0)])
+    db.session.commit()
+
+    _criar_indices_series_temporais()
+
+    assert IbovAtivo.query.count() == 2
+    assert not [t for t in inspect(db.engine).get_table_names() if '_duplicadas_' in t]
+
+
+def test_indice_lstm_models_declarado_no_model(app):
+    from app.models.lstm_model_info import LSTMModel
+
+    db.create_all()
+
+    indices = {i['name']: i['column_names'] for i in inspect(db.engine).get_indexes(LSTMModel.__tablename__)}
+    assert indices['ix_lstm_models_symbol_active_created'] == ['symbol', 'is_active', 'created_at']
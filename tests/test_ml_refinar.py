@@ -0,0 +1,109 @@
+"""
+Refinamento incremental de dados_refinados igual ao refinamento completo
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.models.ibov_model import IbovAtivo
+from app.models.dados_refinados_model import DadosRefinados
+from app.services.ml_service import MLService
+from app.utils.extensions import db
+
+CODIGOS = [f'ATV{i:02d}' for i in range(12)]
+INICIO = date(2025, 1, 1)
+
+
+def _inserir_dias(dias: range):
+    rng = np.random.default_rng(7)
+    participacoes = rng.uniform(0.2, 5.0, len(CODIGOS))
+    registros = []
+    for dia in range(max(dias) + 1):
+        variacoes = rng.normal(0, 0.05, len(CODIGOS))
+        participacoes = participacoes * (1 + variacoes)
+        if dia not in dias:
+            continue
+        for codigo, participacao, i in zip(CODIGOS, participacoes, range(len(CODIGOS))):
+            registros.append({
+                'codigo': codigo,
+                'nome': codigo,
+                'tipo': 'ON' if i % 2 else 'PN',
+                'participacao': f'{participacao:.3f}'.replace('.', ','),
+                'theoricalQty': '1.000.000',
+                'participacao_valor': round(float(participacao), 3),
+                'qtde_teorica_valor': 1000000.0,
+                'data': INICIO + timedelta(days=dia)
+            })
+    db.session.execute(db.insert(IbovAtivo.__table__), registros)
+    db.session.commit()
+
+
+def _recomendacoes() -> dict:
+    linhas = db.session.query(
+        DadosRefinados.codigo, DadosRefinados.data_referencia, DadosRefinados.recomendacao
+    ).all()
+    return {(codigo, data): recomendacao for codigo, data, recomendacao in linhas}
+
+
+@pytest.fixture
+def service(app, monkeypatch):
+    # Sem o ruído do score, dois refinamentos completos dão o mesmo resultado
+    monkeypatch.setattr(MLService, '_gerar_ruido', staticmethod(lambda n: np.zeros(n)))
+    return MLService()
+
+
+def test_incremental_igual_ao_completo(app, service):
+    _inserir_dias(range(0, 20))
+    assert 'erro' not in service.refinar_dados()
+
+    _inserir_dias(range(20, 30))
+    resultado = service.refinar_dados(incremental=True)
+    assert resultado['modo'] == 'incremental'
+    incremental = _recomendacoes()
+
+    assert service.refinar_dados()['modo'] == 'completo'
+    completo = _recomendacoes()
+
+    assert len(completo) == 30 * len(CODIGOS)
+    assert incremental == completo
+
+
+def test_incremental_sem_score_gravado_refaz_tudo(app, service):
+    _inserir_dias(range(0, 20))
+    service.refinar_dados()
+    db.session.execute(db.update(DadosRefinados).values(score=None))
+    db.session.commit()
+
+    _inserir_dias(range(20, 25))
+    resultado = service.refinar_dados(incremental=True)
+
+    assert resultado['modo'] == 'completo'
+    assert db.session.query(DadosRefinados.id).filter(DadosRefinados.score.is_(None)).count() == 0
+
+
+def test_incremental_refina_dias_antigos_do_backfill(app, service):
+    _inserir_dias(range(10, 30))
+    service.refinar_dados()
+
+    # Backfill histórico: dias anteriores à última data já refinada
+    _inserir_dias(range(0, 10))
+    resultado = service.refinar_dados(incremental=True)
+    assert resultado['modo'] == 'incremental'
+    incremental = _recomendacoes()
+
+    service.refinar_dados()
+    completo = _recomendacoes()
+
+    assert len(incremental) == 30 * len(CODIGOS)
+    assert incremental == completo
+
+
+def test_incremental_sem_pendencias(app, service):
+    _inserir_dias(range(0, 10))
+    service.refinar_dados()
+
+    resultado = service.refinar_dados(incremental=True)
+
+    assert resultado['total_salvos'] == 0
+    assert 'modo' not in resultado
@@ -0,0 +1,116 @@
+"""
+Coleta incremental de stock_data com um downloader falso no lugar do yfinance
+"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from app.models.stock_data_model import StockData
+from app.services.stock_data_service import StockDataService, OVERLAP_DIAS_PADRAO
+
+HOJE = datetime.now().date()
+
+
+class DownloaderFalso:
+    """Serve barras diárias de um dict {symbol: {data: close}} e registra as janelas pedidas"""
+
+    def __init__(self):
+        self.barras = {}
+        self.chamadas = []
+
+    def definir(self, symbol: str, inicio, fim, base: float = 10.0):
+        dias = pd.bdate_range(inicio, fim).date
+        self.barras.setdefault(symbol, {}).update({d: base + i for i, d in enumerate(dias)})
+
+    def __call__(self, symbol, start_date=None, end_date=None, period=None):
+        self.chamadas.append((symbol, start_date, end_date, period))
+        barras = self.barras.get(symbol, {})
+        datas = sorted(
+            d for d in barras
+            if (start_date is None or d >= datetime.strptime(start_date, '%Y-%m-%d').date())
+            and (end_date is None or d < datetime.strptime(end_date, '%Y-%m-%d').date())
+        )
+        closes = [barras[d] for d in datas]
+        return pd.DataFrame(
+            {'Open': closes, 'High': closes, 'Low': closes, 'Close': closes,
+             'Adj Close': closes, 'Volume': [1000] * len(datas)},
+            index=pd.DatetimeIndex(pd.to_datetime(datas), name='Date')
+        )
+
+
+def _closes(symbol: str) -> dict:
+    return {b.date: b.close for b in StockData.query.filter_by(symbol=symbol).all()}
+
+
+@pytest.fixture
+def downloader(app):
+    return DownloaderFalso()
+
+
+def test_incremental_baixa_so_a_janela_com_overlap(downloader):
+    downloader.definir('PETR4.SA', HOJE - timedelta(days=60), HOJE - timedelta(days=20))
+    StockDataService.coletar_dados_historicos('PETR4.SA', period='2y', downloader=downloader)
+    ultima_salva = max(_closes('PETR4.SA'))
+
+    # Dias novos e uma correção de preço nas barras já salvas
+    downloader.definir('PETR4.SA', HOJE - timedelta(days=19), HOJE, base=50.0)
+    corrigidas = [d for d in downloader.barras['PETR4.SA']
+                  if ultima_salva - timedelta(days=OVERLAP_DIAS_PADRAO) <= d <= ultima_salva]
+    for d in corrigidas:
+        downloader.barras['PETR4.SA'][d] += 0.5
+    fora_do_overlap = min(downloader.barras['PETR4.SA'])
+    downloader.barras['PETR4.SA'][fora_do_overlap] += 100  # não deve ser baixada de novo
+
+    resultado = StockDataService.coletar_dados_historicos('PETR4.SA', downloader=downloader, incremental=True)
+
+    assert downloader.chamadas[-1] == (
+        'PETR4.SA',
+        (ultima_salva - timedelta(days=OVERLAP_DIAS_PADRAO)).strftime('%Y-%m-%d'),
+        (HOJE + timedelta(days=1)).strftime('%Y-%m-%d'),
+        None
+    )
+    novas = [d for d in downloader.barras['PETR4.SA'] if d > ultima_salva]
+    assert resultado['incremental'] is True
+    assert resultado['estatisticas']['registros_atualizados'] == len(corrigidas)
+    assert resultado['estatisticas']['registros_inseridos'] == len(novas)
+    assert resultado['estatisticas']['registros_duplicados'] == 0
+
+    salvas = _closes('PETR4.SA')
+    assert len(salvas) == len(downloader.barras['PETR4.SA'])
+    for d in corrigidas + novas:
+        assert salvas[d] == downloader.barras['PETR4.SA'][d]
+    assert salvas[fora_do_overlap] == downloader.barras['PETR4.SA'][fora_do_overlap] - 100
+
+
+def test_incremental_sem_historico_usa_a_janela_pedida(downloader):
+    downloader.definir('VALE3.SA', HOJE - timedelta(days=30), HOJE)
+
+    resultado = StockDataService.coletar_dados_historicos(
+        'VALE3.SA', period='1mo', downloader=downloader, incremental=True
+    )
+
+    assert downloader.chamadas == [('VALE3.SA', None, None, '1mo')]
+    assert resultado['incremental'] is False
+    assert resultado['estatisticas']['registros_inseridos'] == len(downloader.barras['VALE3.SA'])
+
+
+def test_lote_incremental_usa_a_ultima_data_de_cada_symbol(downloader):
+    downloader.definir('PETR4.SA', HOJE - timedelta(days=40), HOJE - timedelta(days=10))
+    downloader.definir('ITUB4.SA', HOJE - timedelta(days=40), HOJE - timedelta(days=25))
+    StockDataService.coletar_dados_lote(['PETR4.SA', 'ITUB4.SA'], period='2y', downloader=downloader)
+    ultimas = {s: max(_closes(s)) for s in ('PETR4.SA', 'ITUB4.SA')}
+
+    downloader.definir('PETR4.SA', HOJE - timedelta(days=9), HOJE, base=80.0)
+    downloader.definir('ITUB4.SA', HOJE - timedelta(days=24), HOJE, base=80.0)
+    downloader.chamadas.clear()
+
+    resultado = StockDataService.coletar_dados_lote(
+        ['PETR4.SA', 'ITUB4.SA'], downloader=downloader, incremental=True
+    )
+
+    assert resultado['erros'] == []
+    inicios = {symbol: inicio for symbol, inicio, _, _ in downloader.chamadas}
+    for symbol, ultima in ultimas.items():
+        assert inicios[symbol] == (ultima - timedelta(days=OVERLAP_DIAS_PADRAO)).strftime('%Y-%m-%d')
+        assert _closes(symbol) == downloader.barras[symbol]
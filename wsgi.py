@@ -0,0 +1,79 @@
+"""
+Entrada WSGI de produção
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Com preload_app (gunicorn.conf.py) este módulo é importado uma única vez no
+processo master: cria as tabelas, aplica as migrações e marca como erro os
+jobs interrompidos antes de qualquer worker existir. Cada worker chama
+inicializar_worker() depois do fork.
+"""
+import os
+import time
+import importlib.util
+
+from app.utils.extensions import db
+from app.utils.migrations import aplicar_migracoes
+from app.services.job_service import job_manager
+from app.utils.dependencias import modulo_disponivel
+
+# A pasta app/ (pacote) tem precedência sobre app.py no import, por isso o carregamento pelo caminho
+_spec = importlib.util.spec_from_file_location('app_main', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'))
+app_main = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(app_main)
+
+app = app_main.create_app()
+
+with app.app_context():
+    db.create_all()
+    aplicar_migracoes()
+    job_manager.marcar_interrompidos()
+
+    # Ensemble do ML carregado antes do fork: os workers compartilham as
+    # páginas (copy-on-write) em vez de cada um ler o .pkl
+    if os.environ.get('ML_PRECARGA', '1') != '0' and modulo_disponivel('sklearn'):
+        from app.services.ml_service import MLService
+        _resultado_ml = MLService().aquecer_cache()
+        print(f"[wsgi] Ensemble ML: {_resultado_ml.get('erro') or 'versão ' + _resultado_ml['versao']}")
+
+
+def inicializar_worker():
+    """
+    Prepara um worker recém-criado: conexões próprias com o banco, agendador
+    (apenas no worker que obtiver o lock) e cache de modelos LSTM aquecido
+
+    O aquecimento usa os motores de LSTM_MOTORES_PRECARGA (separados por
+    vírgula; vazio desativa). O padrão é LSTMInferenciaService.MOTOR_PADRAO
+    (tflite), que não importa TensorFlow: incluir 'grafo' ou 'keras' carrega
+    o TensorFlow em cada worker (~4,5 s e ~450 MB de RSS por processo).
+    """
+    with app.app_context():
+        # Conexões abertas pelo master não podem ser compartilhadas entre processos
+        db.engine.dispose(close=False)
+
+    app_main.iniciar_agendador(app, reagendar_jobs=True)
+
+    from app.services.lstm_inferencia_service import LSTMInferenciaService
+
+    precarga = os.environ.get('LSTM_MOTORES_PRECARGA', LSTMInferenciaService.MOTOR_PADRAO)
+    motores = [m.strip() for m in precarga.split(',') if m.strip()]
+    if not motores:
+        return
+
+    if all(m in LSTMInferenciaService.MOTORES_PREVISAO for m in motores):
+        service = LSTMInferenciaService()
+    else:
+        from app.services.lstm_service import LSTMService
+        service = LSTMService()
+
+    inicio = time.perf_counter()
+    with app.app_context():
+        resultado = service.aquecer_cache(motores=motores)
+
+    if 'erro' in resultado:
+        print(f"[wsgi] Worker {os.getpid()}: cache LSTM não aquecido: {resultado['erro']}")
+    else:
+        print(
+            f"[wsgi] Worker {os.getpid()}: {resultado['modelos']} modelo(s) LSTM aquecido(s) "
+            f"({', '.join(motores)}) em {time.perf_counter() - inicio:.1f}s; erros: {len(resultado['erros'])}"
+        )